@@ -5,14 +5,36 @@ AI GitHub Daily Tracker - AI项目每日追踪器
 """
 
 import os
+import re
+import sys
 import json
 import time
+import random
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+import hashlib
+import sqlite3
+import smtplib
+import threading
+from array import array
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import formatdate
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+from typing import List, Dict, Any, Callable, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
 from dateutil import parser as date_parser
 
+try:
+    import fcntl
+except ImportError:  # Windows没有fcntl，退化为不加锁
+    fcntl = None
+
 # 加载.env文件中的环境变量（用于本地测试）
 try:
     from load_env import load_env
@@ -21,18 +43,489 @@ except ImportError:
     pass
 
 
+@lru_cache(maxsize=8192)
+def _parse_timestamp(value: str) -> Optional[datetime]:
+    try:
+        # GitHub时间戳固定为YYYY-MM-DDTHH:MM:SSZ，fromisoformat可直接解析（Python 3.11以前不认识'Z'）
+        parsed = datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except ValueError:
+        try:
+            parsed = date_parser.parse(value)
+        except (ValueError, TypeError, OverflowError):
+            return None
+    if parsed.tzinfo is None:
+        # 不带时区的时间（如本地写入的sent_date）按本地时间处理
+        parsed = parsed.astimezone()
+    return parsed.astimezone(timezone.utc)
+
+
+def parse_github_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """
+    将ISO-8601时间戳解析为UTC时区的datetime，无法解析时返回None
+    同一字符串只解析一次，非标准格式才交给dateutil
+    """
+    if not value or not isinstance(value, str):
+        return None
+    return _parse_timestamp(value)
+
+
+def _timestamp_to_epoch(value: Optional[str]) -> Optional[float]:
+    """将时间戳解析为epoch秒"""
+    parsed = parse_github_timestamp(value)
+    return parsed.timestamp() if parsed is not None else None
+
+
+@contextmanager
+def _exclusive_file_lock(lock_file: str):
+    """持有lock_file上的进程间排他锁（fcntl），没有fcntl的平台不加锁"""
+    if fcntl is None:
+        yield
+        return
+    directory = os.path.dirname(lock_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(lock_file, 'a') as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+class RepoRecord:
+    """
+    精简的仓库记录，在获取搜索结果时构建一次
+    只保留流水线实际用到的字段，created_at/pushed_at同时解析为epoch秒；
+    支持repo['name']、repo.get('name')等字典式访问，因此各处理阶段可同时接受dict和RepoRecord
+    """
+
+    __slots__ = (
+        'id', 'name', 'full_name', 'description', 'html_url', 'language', 'topics',
+        'stargazers_count', 'forks_count', 'created_at', 'updated_at', 'pushed_at',
+        'created_ts', 'pushed_ts', 'trend_score', 'search_text'
+    )
+
+    def __init__(self, **fields: Any):
+        for field in self.__slots__:
+            setattr(self, field, fields.get(field))
+        if self.topics is None:
+            self.topics = ()
+        if self.created_ts is None:
+            self.created_ts = _timestamp_to_epoch(self.created_at)
+        if self.pushed_ts is None:
+            self.pushed_ts = _timestamp_to_epoch(self.pushed_at)
+
+    @classmethod
+    def from_github(cls, item: Dict) -> 'RepoRecord':
+        """从GitHub搜索结果（或to_dict的输出）构建记录"""
+        return cls(
+            id=item.get('id'),
+            name=item.get('name') or '',
+            full_name=item.get('full_name') or '',
+            description=item.get('description') or '',
+            html_url=item.get('html_url') or '',
+            language=item.get('language'),
+            topics=tuple(item.get('topics') or ()),
+            stargazers_count=item.get('stargazers_count') or 0,
+            forks_count=item.get('forks_count') or 0,
+            created_at=item.get('created_at'),
+            updated_at=item.get('updated_at'),
+            pushed_at=item.get('pushed_at'),
+            created_ts=item.get('created_ts'),
+            pushed_ts=item.get('pushed_ts'),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典（不含trend_score等派生字段）"""
+        data = {field: getattr(self, field) for field in self.__slots__ if field not in ('trend_score', 'search_text')}
+        data['topics'] = list(self.topics)
+        return data
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__ and getattr(self, str(key)) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """字典式读取，字段不存在或为None时返回默认值"""
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __repr__(self) -> str:
+        return f"RepoRecord(id={self.id!r}, full_name={self.full_name!r}, stars={self.stargazers_count!r})"
+
+
+class RateLimitExceededError(requests.exceptions.RequestException):
+    """GitHub API配额耗尽且等待时间超过允许上限"""
+
+
+class RateLimitScheduler:
+    """
+    GitHub API限额调度器
+    按资源类型（search/core/graphql）分别维护配额桶，根据响应头
+    X-RateLimit-Remaining、X-RateLimit-Reset和Retry-After决定是否需要等待
+    """
+
+    def __init__(self, max_wait: Optional[float] = None):
+        # 单次最长等待时间（秒），超过则放弃请求而不是长时间阻塞
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv('GH_RATE_LIMIT_MAX_WAIT', '120'))
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Dict[str, Any]] = {}
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def classify(url: str) -> str:
+        """根据请求地址判断所属的资源类型"""
+        if '/search/' in url:
+            return 'search'
+        if url.rstrip('/').endswith('/graphql'):
+            return 'graphql'
+        return 'core'
+
+    def _bucket(self, resource: str) -> Dict[str, Any]:
+        if resource not in self._buckets:
+            self._buckets[resource] = {'limit': None, 'remaining': None, 'reset': 0.0, 'blocked_until': 0.0}
+        return self._buckets[resource]
+
+    def acquire(self, resource: str):
+        """在发送请求前调用，配额不足时等待到重置时间"""
+        while True:
+            with self._lock:
+                bucket = self._bucket(resource)
+                now = time.time()
+                if bucket['remaining'] is not None and bucket['reset'] <= now:
+                    # 时间窗口已重置，等待下一个响应头刷新配额
+                    bucket['remaining'] = None
+
+                if bucket['blocked_until'] > now:
+                    wait = bucket['blocked_until'] - now
+                elif bucket['remaining'] is not None and bucket['remaining'] <= 0:
+                    wait = bucket['reset'] - now
+                else:
+                    # 预占一个配额，避免并发请求同时透支
+                    if bucket['remaining'] is not None:
+                        bucket['remaining'] -= 1
+                    return
+
+            if wait > self.max_wait:
+                raise RateLimitExceededError(f"{resource} 配额已耗尽，需要等待 {wait:.0f} 秒")
+            self.logger.info(f"{resource} 配额不足，等待 {wait:.1f} 秒")
+            time.sleep(wait)
+
+    def update(self, resource: str, response: requests.Response) -> float:
+        """
+        根据响应头更新配额状态
+        返回需要等待后重试的秒数，0表示无需重试
+        """
+        headers = response.headers
+        retry_after = 0.0
+
+        with self._lock:
+            bucket = self._bucket(resource)
+            now = time.time()
+            try:
+                if 'X-RateLimit-Remaining' in headers:
+                    remaining = int(headers['X-RateLimit-Remaining'])
+                    reset = float(headers.get('X-RateLimit-Reset', now + 60))
+                    if bucket['remaining'] is not None and reset == bucket['reset']:
+                        # 同一时间窗口内，保留已预占的配额
+                        remaining = min(remaining, bucket['remaining'])
+                    bucket['remaining'] = remaining
+                    bucket['reset'] = reset
+                    bucket['limit'] = int(headers.get('X-RateLimit-Limit', bucket['limit'] or 0)) or None
+            except ValueError:
+                pass
+
+            if response.status_code in (403, 429):
+                if 'Retry-After' in headers:
+                    try:
+                        retry_after = float(headers['Retry-After'])
+                    except ValueError:
+                        retry_after = 60.0
+                elif bucket['remaining'] == 0:
+                    retry_after = max(bucket['reset'] - now, 1.0)
+                if retry_after:
+                    bucket['blocked_until'] = max(bucket['blocked_until'], now + retry_after)
+
+        return retry_after
+
+    def get_budget(self) -> Dict[str, Dict[str, Any]]:
+        """返回各资源类型当前的剩余配额"""
+        with self._lock:
+            return {
+                resource: {'limit': bucket['limit'], 'remaining': bucket['remaining'], 'reset': bucket['reset']}
+                for resource, bucket in self._buckets.items()
+            }
+
+
+class ConditionalRequestCache:
+    """
+    基于ETag的条件请求缓存
+    按URL+参数在磁盘上保存响应体和ETag，服务端返回304时直接复用缓存的响应体
+    """
+
+    def __init__(self, cache_dir: str, max_age_days: int = 7):
+        self.cache_dir = cache_dir
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict] = None) -> str:
+        """根据URL和排序后的参数生成缓存键"""
+        raw = json.dumps([url, sorted((params or {}).items())], ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, url: str, params: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+        """读取缓存条目，包含etag和body字段"""
+        key = self.make_key(url, params)
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (IOError, json.JSONDecodeError):
+            return None
+
+        with self._lock:
+            self._memory[key] = entry
+        return entry
+
+    def put(self, url: str, params: Optional[Dict], etag: str, body: str, links: Optional[Dict[str, str]] = None):
+        """保存响应体、ETag和分页链接，先写临时文件再原子替换"""
+        key = self.make_key(url, params)
+        entry = {'url': url, 'params': params or {}, 'etag': etag, 'body': body, 'links': links or {},
+                 'saved_at': time.time()}
+        with self._lock:
+            self._memory[key] = entry
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f'{self._path(key)}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except (IOError, OSError) as e:
+            self.logger.warning(f"保存ETag缓存失败: {e}")
+
+    def prune(self):
+        """删除超过max_age_days未更新的缓存文件"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        cutoff = time.time() - self.max_age_days * 86400
+        removed = 0
+        for filename in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            self.logger.info(f"清理了 {removed} 个过期的ETag缓存")
+
+
+class ResponseCache:
+    """
+    基于SQLite的搜索结果TTL缓存
+    按规范化后的查询条件缓存结果列表，超过TTL即失效，超出条目数或总大小时按最近访问时间（LRU）淘汰
+    """
+
+    def __init__(self, db_path: str, ttl: int = 3600, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时才创建数据库文件"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS search_cache ('
+                'key TEXT PRIMARY KEY, body TEXT NOT NULL, created_at REAL NOT NULL, '
+                'last_access REAL NOT NULL, size INTEGER NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_search_cache_access ON search_cache(last_access)')
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(query: str, sort: str, order: str, per_page: int, page: int = 1) -> str:
+        """规范化查询条件（合并空白、统一小写）生成缓存键"""
+        normalized_query = ' '.join(query.split()).lower()
+        return json.dumps([normalized_query, sort, order, int(per_page), int(page)], ensure_ascii=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取未过期的缓存结果"""
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute('SELECT body, created_at FROM search_cache WHERE key = ?', (key,)).fetchone()
+                if row and now - row[1] <= self.ttl:
+                    conn.execute('UPDATE search_cache SET last_access = ? WHERE key = ?', (now, key))
+                    conn.commit()
+                    self.hits += 1
+                    return json.loads(row[0])
+                self.misses += 1
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            self.logger.warning(f"读取响应缓存失败: {e}")
+        return None
+
+    def put(self, key: str, value: Any):
+        """写入缓存并执行淘汰"""
+        body = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    'INSERT OR REPLACE INTO search_cache (key, body, created_at, last_access, size) VALUES (?, ?, ?, ?, ?)',
+                    (key, body, now, now, len(body))
+                )
+                self._evict(conn, now)
+                conn.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"写入响应缓存失败: {e}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """删除过期条目，再按LRU淘汰直到满足条目数和大小上限"""
+        conn.execute('DELETE FROM search_cache WHERE created_at < ?', (now - self.ttl,))
+        count, total_size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM search_cache').fetchone()
+        if count <= self.max_entries and total_size <= self.max_bytes:
+            return
+
+        for key, size in conn.execute('SELECT key, size FROM search_cache ORDER BY last_access').fetchall():
+            if count <= self.max_entries and total_size <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM search_cache WHERE key = ?', (key,))
+            count -= 1
+            total_size -= size
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取命中统计"""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
 class GitHubAPIClient:
     """GitHub API客户端，负责获取项目数据"""
 
-    def __init__(self, token: Optional[str] = None):
+    # GitHub搜索API单个查询最多返回的结果数
+    search_result_cap = 1000
+
+    def __init__(self, token: Optional[str] = None, max_concurrency: Optional[int] = None,
+                 cache_dir: Optional[str] = None, cache_ttl: int = 3600):
         self.token = token or os.getenv('GH_TOKEN')
         self.base_url = 'https://api.github.com'
+        # 并发查询上限，设为1时退回串行模式
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv('GH_MAX_CONCURRENCY', '4')))
         self.session = requests.Session()
+        # 连接池大小与并发上限一致，所有线程共享同一个session
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('https://', adapter)
         if self.token:
             self.session.headers.update({'Authorization': f'token {self.token}'})
 
+        self.rate_limiter = RateLimitScheduler()
+        self.max_retries = 3
+        # 条件请求缓存，cache_dir为空字符串时禁用
+        self.cache_dir = cache_dir if cache_dir is not None else os.getenv('TRACKER_CACHE_DIR', '.cache')
+        self.etag_cache = ConditionalRequestCache(os.path.join(self.cache_dir, 'etag')) if self.cache_dir else None
+        if self.etag_cache:
+            self.etag_cache.prune()
+        # 搜索结果TTL缓存，cache_ttl<=0时禁用
+        self.response_cache = (ResponseCache(os.path.join(self.cache_dir, 'responses.sqlite'), ttl=cache_ttl)
+                               if self.cache_dir and cache_ttl > 0 else None)
         self.logger = logging.getLogger(__name__)
 
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """发送请求，由限额调度器控制节奏，触发限流时按响应头等待后重试"""
+        resource = self.rate_limiter.classify(url)
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(resource)
+            response = self.session.request(method, url, **kwargs)
+            retry_after = self.rate_limiter.update(resource, response)
+            if not retry_after or attempt == self.max_retries:
+                return response
+            self.logger.warning(f"GitHub API触发限流，{retry_after:.0f} 秒后重试")
+        return response
+
+    def _get_json(self, url: str, params: Optional[Dict] = None) -> Tuple[Dict, Dict[str, str]]:
+        """
+        发送GET请求并解析JSON，返回 (响应数据, Link头中的分页链接)
+        带上缓存的ETag作为If-None-Match，返回304时复用缓存的响应体（304不计入配额）
+        """
+        cached = self.etag_cache.get(url, params) if self.etag_cache else None
+        headers = {'If-None-Match': cached['etag']} if cached else {}
+
+        response = self._request('GET', url, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            self.logger.info("GitHub API返回304，使用缓存的响应")
+            return json.loads(cached['body']), cached.get('links', {})
+
+        response.raise_for_status()
+        data = response.json()
+        links = {rel: link['url'] for rel, link in response.links.items() if 'url' in link}
+        etag = response.headers.get('ETag')
+        if self.etag_cache and etag:
+            self.etag_cache.put(url, params, etag, response.text, links)
+        return data, links
+
+    def get_rate_limit_budget(self) -> Dict[str, Dict[str, Any]]:
+        """获取各资源类型（search/core/graphql）的剩余配额"""
+        return self.rate_limiter.get_budget()
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """获取响应缓存的命中/未命中次数"""
+        return self.response_cache.get_stats() if self.response_cache else {'hits': 0, 'misses': 0}
+
+    def _search_page(self, url: str, params: Optional[Dict], cache_key: str) -> Tuple[List[RepoRecord], Optional[str]]:
+        """获取单页搜索结果，返回 (项目列表, 下一页地址)，优先使用响应缓存"""
+        if self.response_cache:
+            cached = self.response_cache.get(cache_key)
+            if isinstance(cached, dict):
+                self.logger.info(f"命中响应缓存，返回 {len(cached['items'])} 个项目")
+                return [RepoRecord.from_github(item) for item in cached['items']], cached.get('next')
+
+        data, links = self._get_json(url, params=params)
+        self.logger.info(f"GitHub API请求成功，找到 {data.get('total_count', 0)} 个项目")
+        # 入库时即转换为精简记录，丢弃不使用的URL模板等字段
+        items = [RepoRecord.from_github(item) for item in data.get('items', [])]
+        next_url = links.get('next')
+        if self.response_cache:
+            self.response_cache.put(cache_key, {'items': [item.to_dict() for item in items], 'next': next_url})
+        return items, next_url
+
     def search_repositories(self, query: str, sort: str = 'stars', order: str = 'desc', per_page: int = 50) -> List[Dict]:
         """搜索GitHub仓库"""
         url = f'{self.base_url}/search/repositories'
@@ -44,17 +537,167 @@ class GitHubAPIClient:
         }
 
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            self.logger.info(f"GitHub API请求成功，找到 {data.get('total_count', 0)} 个项目")
-            return data.get('items', [])
+            items, _ = self._search_page(url, params, ResponseCache.make_key(query, sort, order, per_page))
+            return items
         except requests.exceptions.RequestException as e:
             self.logger.error(f"GitHub API请求失败: {e}")
             return []
 
-    def get_popular_ai_projects(self) -> List[Dict]:
-        """获取最受欢迎的AI项目（按star数排序）"""
+    def iter_search(self, query: str, max_results: int = 1000, sort: str = 'stars', order: str = 'desc',
+                    per_page: int = 100) -> Iterator[Dict]:
+        """
+        流式分页搜索GitHub仓库
+        跟随响应Link头中的rel="next"逐页获取，每页到达即逐个产出项目；
+        调用方停止迭代或达到max_results后不再请求后续页面
+        """
+        per_page = max(1, min(per_page, max_results, 100))
+        url: Optional[str] = f'{self.base_url}/search/repositories'
+        params: Optional[Dict] = {
+            'q': query,
+            'sort': sort,
+            'order': order,
+            'per_page': per_page
+        }
+        page = 1
+        yielded = 0
+
+        while url and yielded < max_results:
+            cache_key = ResponseCache.make_key(query, sort, order, per_page, page)
+            try:
+                items, url = self._search_page(url, params, cache_key)
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"GitHub API请求失败（第{page}页）: {e}")
+                return
+
+            for item in items:
+                yield item
+                yielded += 1
+                if yielded >= max_results:
+                    return
+
+            # 下一页地址已包含全部查询参数
+            params = None
+            page += 1
+
+    def search_many(self, queries: List[str], sort: str = 'stars', per_page: int = 25,
+                    max_results: Optional[int] = None,
+                    take: Optional[Callable[[Iterator[Dict]], List[Dict]]] = None) -> List[Dict]:
+        """
+        并发执行多个搜索查询，按查询顺序合并结果并去重
+        同时在途的请求数不超过max_concurrency，请求节奏由限额调度器控制
+        max_results超过单页数量时，每个查询会分页获取至多max_results个项目
+        take: 提供时把每个查询的流式分页结果（至多max_results个，默认为搜索上限）交给take消费，
+              take停止迭代后不再请求后续页面，如去重器的take_new_projects
+        """
+        def run_query(query: str) -> List[Dict]:
+            if take is not None:
+                return take(self.iter_search(query, max_results=max_results or self.search_result_cap, sort=sort))
+            if max_results and max_results > per_page:
+                return list(self.iter_search(query, max_results=max_results, sort=sort))
+            return self.search_repositories(query, sort=sort, per_page=per_page)
+
+        return self._merge_unique(self._map_concurrently(run_query, queries))
+
+    def _map_concurrently(self, func: Callable[[Any], Any], items: List[Any]) -> List[Any]:
+        """在共享session上并发执行func，保持输入顺序，并发数不超过max_concurrency"""
+        if self.max_concurrency == 1 or len(items) <= 1:
+            return [func(item) for item in items]
+
+        workers = min(self.max_concurrency, len(items))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # executor.map保持输入顺序，去重结果与串行模式一致
+            return list(executor.map(func, items))
+
+    @staticmethod
+    def _merge_unique(results: List[List[Dict]]) -> List[Dict]:
+        """合并多个结果列表并去除重复项目（基于ID），保留首次出现的顺序"""
+        seen_ids = set()
+        unique_projects = []
+        for projects in results:
+            for project in projects:
+                if project['id'] not in seen_ids:
+                    seen_ids.add(project['id'])
+                    unique_projects.append(project)
+
+        return unique_projects
+
+    def count_search_results(self, query: str) -> int:
+        """只请求1条结果来获取查询的total_count，失败时返回-1"""
+        url = f'{self.base_url}/search/repositories'
+        cache_key = ResponseCache.make_key(query, 'total_count', '', 1)
+        if self.response_cache:
+            cached = self.response_cache.get(cache_key)
+            if isinstance(cached, int):
+                return cached
+
+        try:
+            data, _ = self._get_json(url, params={'q': query, 'per_page': 1})
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"GitHub API计数请求失败: {e}")
+            return -1
+
+        total_count = int(data.get('total_count', 0))
+        if self.response_cache:
+            self.response_cache.put(cache_key, total_count)
+        return total_count
+
+    def plan_query_shards(self, query: str, start: date, end: date, field: str = 'created') -> List[str]:
+        """
+        将查询按created/pushed日期窗口拆分成若干分片，使每个分片的结果数不超过搜索上限
+        total_count超过上限的窗口会被二分，直到满足上限或窗口只剩一天；同一轮的窗口并发探测
+        """
+        if field not in ('created', 'pushed'):
+            raise ValueError(f"不支持的分片字段: {field}")
+
+        def shard_query(window: Tuple[date, date]) -> str:
+            return f'{query} {field}:{window[0].isoformat()}..{window[1].isoformat()}'
+
+        shards: List[Tuple[date, date]] = []
+        pending = [(start, end)]
+        while pending:
+            counts = self._map_concurrently(lambda window: self.count_search_results(shard_query(window)), pending)
+            next_pending = []
+            for window, count in zip(pending, counts):
+                window_start, window_end = window
+                if count == 0:
+                    continue
+                if count <= self.search_result_cap or window_start >= window_end:
+                    if count > self.search_result_cap:
+                        self.logger.warning(f"单日窗口 {window_start} 仍有 {count} 个结果，超出上限的部分将被截断")
+                    shards.append(window)
+                else:
+                    middle = window_start + (window_end - window_start) // 2
+                    next_pending.append((window_start, middle))
+                    next_pending.append((middle + timedelta(days=1), window_end))
+            pending = next_pending
+
+        shards.sort()
+        self.logger.info(f"查询被拆分为 {len(shards)} 个{field}日期分片")
+        return [shard_query(window) for window in shards]
+
+    def search_sharded(self, query: str, start: Optional[date] = None, end: Optional[date] = None,
+                       field: str = 'created', sort: str = 'stars', order: str = 'desc') -> List[Dict]:
+        """
+        按日期分片完整获取查询的全部结果，突破单个查询1000条的上限
+        各分片在限额调度下并发获取，结果按ID合并去重
+        """
+        start = start or date(2008, 1, 1)  # GitHub上线时间
+        end = end or datetime.now().date()
+        shards = self.plan_query_shards(query, start, end, field)
+        results = self._map_concurrently(
+            lambda shard: list(self.iter_search(shard, max_results=self.search_result_cap, sort=sort, order=order)),
+            shards
+        )
+        unique_projects = self._merge_unique(results)
+        self.logger.info(f"分片搜索共获取 {len(unique_projects)} 个项目")
+        return unique_projects
+
+    def get_popular_ai_projects(self, max_results_per_query: int = 25,
+                                take: Optional[Callable[[Iterator[Dict]], List[Dict]]] = None) -> List[Dict]:
+        """
+        获取最受欢迎的AI项目（按star数排序）
+        take: 流式消费每个查询的分页结果，此时每个查询最多翻到搜索上限，由take决定何时停止
+        """
         # 分多次查询不同的AI领域，避免查询过长
         queries = [
             'machine learning OR "artificial intelligence" OR "deep learning"',
@@ -63,24 +706,15 @@ class GitHubAPIClient:
             '"computer vision" OR opencv OR yolo'
         ]
 
-        all_projects = []
-        for query in queries:
-            projects = self.search_repositories(query, sort='stars', per_page=25)
-            all_projects.extend(projects)
-            time.sleep(1)  # 避免API限制
-
-        # 去除重复项目（基于ID）
-        seen_ids = set()
-        unique_projects = []
-        for project in all_projects:
-            if project['id'] not in seen_ids:
-                seen_ids.add(project['id'])
-                unique_projects.append(project)
-
-        return unique_projects
+        return self.search_many(queries, sort='stars', per_page=25,
+                                max_results=None if take else max_results_per_query, take=take)
 
-    def get_trending_ai_projects(self) -> List[Dict]:
-        """获取趋势AI项目（按更新时间排序）"""
+    def get_trending_ai_projects(self, max_results_per_query: int = 25,
+                                 take: Optional[Callable[[Iterator[Dict]], List[Dict]]] = None) -> List[Dict]:
+        """
+        获取趋势AI项目（按更新时间排序）
+        take: 同get_popular_ai_projects
+        """
         # 获取最近30天内更新的项目
         date_30_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
 
@@ -92,21 +726,226 @@ class GitHubAPIClient:
             f'"computer vision" pushed:>{date_30_days_ago}'
         ]
 
-        all_projects = []
-        for query in queries:
-            projects = self.search_repositories(query, sort='updated', per_page=25)
-            all_projects.extend(projects)
-            time.sleep(1)  # 避免API限制
+        return self.search_many(queries, sort='updated', per_page=25,
+                                max_results=None if take else max_results_per_query, take=take)
+
+
+class GitHubGraphQLClient:
+    """
+    GitHub GraphQL批量查询客户端，负责补充搜索结果之外的仓库详情
+    每次请求通过别名的repository(owner:, name:)节点批量查询多个仓库，并记录rateLimit消耗
+    """
+
+    REPOSITORY_FIELDS = """
+fragment RepoDetails on Repository {
+  databaseId
+  nameWithOwner
+  releases { totalCount }
+  latestRelease { tagName publishedAt }
+  defaultBranchRef { target { ... on Commit { history { totalCount } } } }
+  mentionableUsers { totalCount }
+  readme: object(expression: "HEAD:README.md") { ... on Blob { byteSize } }
+}
+"""
 
-        # 去除重复项目（基于ID）
-        seen_ids = set()
-        unique_projects = []
-        for project in all_projects:
-            if project['id'] not in seen_ids:
-                seen_ids.add(project['id'])
-                unique_projects.append(project)
+    def __init__(self, api_client: Optional[GitHubAPIClient] = None, endpoint: Optional[str] = None,
+                 batch_size: int = 50):
+        # 复用REST客户端的session和限额调度器
+        self.api_client = api_client or GitHubAPIClient()
+        self.endpoint = endpoint or os.getenv('GH_GRAPHQL_URL', f'{self.api_client.base_url}/graphql')
+        self.batch_size = max(1, batch_size)
+        self.total_cost = 0
+        self.remaining: Optional[int] = None
+        self.logger = logging.getLogger(__name__)
 
-        return unique_projects
+    def build_query(self, full_names: List[str]) -> Tuple[str, Dict[str, str]]:
+        """构造批量查询语句和变量，仓库名通过变量传入"""
+        declarations = []
+        nodes = []
+        variables = {}
+        for index, full_name in enumerate(full_names):
+            owner, name = full_name.split('/', 1)
+            variables[f'o{index}'] = owner
+            variables[f'n{index}'] = name
+            declarations.append(f'$o{index}: String!, $n{index}: String!')
+            nodes.append(f'  r{index}: repository(owner: $o{index}, name: $n{index}) {{ ...RepoDetails }}')
+
+        query = (
+            f"query({', '.join(declarations)}) {{\n"
+            "  rateLimit { cost remaining resetAt }\n"
+            + '\n'.join(nodes)
+            + "\n}\n"
+            + self.REPOSITORY_FIELDS
+        )
+        return query, variables
+
+    @staticmethod
+    def parse_repository(node: Dict) -> Dict[str, Any]:
+        """将GraphQL仓库节点整理为扁平的详情字典"""
+        latest_release = node.get('latestRelease') or {}
+        target = (node.get('defaultBranchRef') or {}).get('target') or {}
+        readme = node.get('readme') or {}
+        return {
+            'id': node.get('databaseId'),
+            'full_name': node.get('nameWithOwner'),
+            'release_count': (node.get('releases') or {}).get('totalCount', 0),
+            'latest_release': latest_release.get('tagName'),
+            'latest_release_at': latest_release.get('publishedAt'),
+            'commit_count': (target.get('history') or {}).get('totalCount'),
+            'contributor_count': (node.get('mentionableUsers') or {}).get('totalCount'),
+            'readme_size': readme.get('byteSize')
+        }
+
+    def _fetch_batch(self, full_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """执行一次批量查询"""
+        query, variables = self.build_query(full_names)
+        response = self.api_client._request('POST', self.endpoint, json={'query': query, 'variables': variables})
+        response.raise_for_status()
+        payload = response.json()
+
+        for error in payload.get('errors') or []:
+            # 单个仓库不存在或无权限时GraphQL仍返回其余结果
+            self.logger.warning(f"GraphQL查询部分失败: {error.get('message')}")
+
+        data = payload.get('data') or {}
+        rate_limit = data.get('rateLimit') or {}
+        self.total_cost += rate_limit.get('cost', 0)
+        self.remaining = rate_limit.get('remaining', self.remaining)
+
+        details = {}
+        for index, full_name in enumerate(full_names):
+            node = data.get(f'r{index}')
+            if node:
+                details[full_name] = self.parse_repository(node)
+        return details
+
+    def enrich_repositories(self, repos: List[Dict]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取仓库详情（release、默认分支提交数、贡献者数、README大小）
+        返回以full_name为键的详情字典
+        """
+        full_names = []
+        for repo in repos:
+            full_name = repo.get('full_name')
+            if full_name and '/' in full_name and full_name not in full_names:
+                full_names.append(full_name)
+
+        details: Dict[str, Dict[str, Any]] = {}
+        last_cost = 1
+        for offset in range(0, len(full_names), self.batch_size):
+            if self.remaining is not None and self.remaining < last_cost:
+                self.logger.warning(f"GraphQL配额不足（剩余 {self.remaining}），停止补充仓库详情")
+                break
+
+            batch = full_names[offset:offset + self.batch_size]
+            cost_before = self.total_cost
+            try:
+                details.update(self._fetch_batch(batch))
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"GraphQL批量查询失败: {e}")
+                continue
+            # 用上一批的消耗估算下一批所需配额
+            last_cost = max(1, self.total_cost - cost_before)
+
+        self.logger.info(f"通过GraphQL补充了 {len(details)}/{len(full_names)} 个仓库的详情，"
+                         f"累计消耗 {self.total_cost} 点，剩余 {self.remaining}")
+        return details
+
+
+def _repo_search_text(repo: Dict) -> str:
+    """拼接项目名称、描述和topics并统一小写，作为关键词匹配的文本（RepoRecord只构建一次）"""
+    if isinstance(repo, RepoRecord) and repo.search_text is not None:
+        return repo.search_text
+
+    # 安全地处理可能为None的字段
+    name = repo.get('name') or ''
+    description = repo.get('description') or ''
+    topics = repo.get('topics') or []
+    text = ' '.join([name.lower(), description.lower(), ' '.join(topics).lower()])
+    if isinstance(repo, RepoRecord):
+        repo.search_text = text
+    return text
+
+
+class KeywordMatcher:
+    """
+    预编译的多关键词匹配器
+    全部关键词按前缀树合并为一个正则，扫描一遍文本即可得到所有命中的关键词；
+    boundary_keywords中的关键词要求前后不是字母或数字（避免'ai'匹配到'email'、'maintain'）
+    """
+
+    WORD_CHARS = '0-9a-z'
+
+    def __init__(self, keywords: Iterable[str], boundary_keywords: Iterable[str] = (), word_boundary: bool = False):
+        self.keywords = list(dict.fromkeys(keyword.lower() for keyword in keywords))
+        boundary_set = {keyword.lower() for keyword in boundary_keywords}
+        self.bounded = set(self.keywords) if word_boundary else boundary_set & set(self.keywords)
+
+        # 共享前缀的关键词合并到同一分支，正则引擎无需对每个位置逐个尝试全部关键词
+        trie: Dict[str, Any] = {}
+        for keyword in self.keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = keyword
+        self._pattern = re.compile(self._trie_pattern(trie))
+
+        # 与较长关键词起点相同的较短关键词（如'social media'之于'social media management'）
+        self._prefixes = {
+            keyword: [other for other in self.keywords if other != keyword and keyword.startswith(other)]
+            for keyword in self.keywords
+        }
+
+    def _trie_pattern(self, node: Dict[str, Any]) -> str:
+        """由前缀树生成正则，更长的分支在前，保证同一起点优先取最长匹配"""
+        alternatives = [re.escape(char) + self._trie_pattern(node[char]) for char in sorted(node) if char]
+        if '' in node:
+            # 边界关键词在结尾处同时检查前后：前面不是字母或数字（定长后顾）、后面也不是，
+            # 分支仍以字面字符开头，正则引擎的首字符预筛选不受影响
+            keyword = node['']
+            alternatives.append(f'(?<![{self.WORD_CHARS}]{re.escape(keyword)})(?![{self.WORD_CHARS}])'
+                                if keyword in self.bounded else '')
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return '(?:' + '|'.join(alternatives) + ')'
+
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        return 'a' <= char <= 'z' or '0' <= char <= '9'
+
+    def _matches_at(self, text: str, start: int, keyword: str) -> bool:
+        """检查已知出现在start处的较短关键词是否满足边界要求"""
+        if keyword not in self.bounded:
+            return True
+        end = start + len(keyword)
+        before_ok = start == 0 or not self._is_word_char(text[start - 1])
+        after_ok = end >= len(text) or not self._is_word_char(text[end])
+        return before_ok and after_ok
+
+    def _iter_hits(self, text: str) -> Iterator[str]:
+        """按出现位置依次产出命中的关键词，同一起点的较短关键词紧随其后"""
+        position = 0
+        while True:
+            match = self._pattern.search(text, position)
+            if match is None:
+                return
+            start = match.start()
+            keyword = match.group()
+            # 正则已检查匹配到的关键词的边界，同一起点的较短关键词需要单独检查
+            yield keyword
+            for shorter in self._prefixes[keyword]:
+                if self._matches_at(text, start, shorter):
+                    yield shorter
+            # 从下一个字符继续，重叠出现的关键词也能命中
+            position = start + 1
+
+    def search(self, text: str) -> bool:
+        """文本中是否包含任意关键词，一次正则搜索即可判定"""
+        return self._pattern.search(text) is not None
+
+    def find_all(self, text: str) -> Set[str]:
+        """一次扫描返回文本中命中的全部关键词"""
+        return set(self._iter_hits(text))
 
 
 class AIProjectFilter:
@@ -122,29 +961,28 @@ class AIProjectFilter:
         'clustering', 'recommendation', 'speech recognition', 'text mining', 'sentiment analysis'
     ]
 
+    # 容易作为其他单词一部分出现的短关键词，需要完整单词匹配
+    BOUNDARY_KEYWORDS = ['ai', 'gan', 'vae', 'cnn', 'rnn', 'bert']
+
+    _matcher: Optional[KeywordMatcher] = None
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
+    @classmethod
+    def get_matcher(cls) -> KeywordMatcher:
+        """获取按类缓存的关键词匹配器，只在首次使用时编译"""
+        if cls.__dict__.get('_matcher') is None:
+            cls._matcher = KeywordMatcher(cls.AI_KEYWORDS, cls.BOUNDARY_KEYWORDS)
+        return cls._matcher
+
     def is_ai_project(self, repo: Dict) -> bool:
         """判断项目是否为AI相关项目"""
-        # 安全地处理可能为None的字段
-        name = repo.get('name') or ''
-        description = repo.get('description') or ''
-        topics = repo.get('topics') or []
-
-        text_fields = [
-            name.lower(),
-            description.lower(),
-            ' '.join(topics).lower()
-        ]
-
-        full_text = ' '.join(text_fields)
-
-        for keyword in self.AI_KEYWORDS:
-            if keyword in full_text:
-                return True
+        return self.get_matcher().search(_repo_search_text(repo))
 
-        return False
+    def match_ai_keywords(self, repo: Dict) -> Set[str]:
+        """返回项目命中的全部AI关键词"""
+        return self.get_matcher().find_all(_repo_search_text(repo))
 
     def filter_ai_projects(self, projects: List[Dict]) -> List[Dict]:
         """过滤出AI相关项目"""
@@ -157,6 +995,67 @@ class AIProjectFilter:
         return ai_projects
 
 
+class CommercialScore(NamedTuple):
+    """单个项目的商用评分结果"""
+    is_ai: bool
+    is_commercial: bool
+    score: int
+    matched_terms: Dict[str, int]  # 命中的商用关键词及其权重
+
+
+class CommercialScoringEngine:
+    """
+    商用AI项目评分引擎
+    每个项目只构建一次规范化文本：先用AI关键词匹配器判定（命中第一个关键词即停止），
+    再扫描一遍加权的商用关键词和商业指标，返回得分和命中的关键词便于解释
+    """
+
+    def __init__(self, ai_matcher: KeywordMatcher, commercial_keywords: List[str], business_indicators: List[str],
+                 boundary_keywords: Iterable[str] = (), threshold: int = 3):
+        self.ai_matcher = ai_matcher
+        self.threshold = threshold
+        # 商用关键词每次出现计2分，商业指标计1分（两个列表中重复出现的关键词按次数累加）
+        self.weights: Dict[str, int] = {}
+        for keyword in commercial_keywords:
+            self.weights[keyword] = self.weights.get(keyword, 0) + 2
+        for keyword in business_indicators:
+            self.weights[keyword] = self.weights.get(keyword, 0) + 1
+        self.matcher = KeywordMatcher(self.weights, boundary_keywords)
+
+    def score(self, repo: Dict) -> CommercialScore:
+        """计算单个项目的商用评分"""
+        text = _repo_search_text(repo)
+        if not self.ai_matcher.search(text):
+            return CommercialScore(False, False, 0, {})
+
+        weights = self.weights
+        matched_terms = {keyword: weights[keyword] for keyword in self.matcher.find_all(text)}
+        commercial_score = sum(matched_terms.values())
+
+        # 额外的商用性评估
+        stars = repo.get('stargazers_count', 0)
+        forks = repo.get('forks_count', 0)
+
+        # 高star数的实用工具更可能是商用项目
+        if stars > 1000:
+            commercial_score += 1
+        if stars > 5000:
+            commercial_score += 1
+
+        # 高fork率通常表示实用性
+        if forks > 0 and stars > 0:
+            fork_ratio = forks / stars
+            if fork_ratio > 0.1:  # 10%以上的fork率
+                commercial_score += 2
+
+        # 商用性评分阈值
+        return CommercialScore(True, commercial_score >= self.threshold, commercial_score, matched_terms)
+
+    def score_batch(self, repos: List[Dict]) -> List[CommercialScore]:
+        """批量计算商用评分，结果与输入顺序一致"""
+        return [self.score(repo) for repo in repos]
+
+
 class CommercialAIProjectFilter:
     """商用实用性AI项目识别和过滤器"""
 
@@ -216,133 +1115,564 @@ class CommercialAIProjectFilter:
         'hosting', 'server', 'microservice', 'rest api', 'graphql'
     ]
 
+    BOUNDARY_KEYWORDS = ['api', 'crm', 'kpi', 'seo', 'gui', 'aws', 'mcp']
+
+    _engine: Optional[CommercialScoringEngine] = None
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
+    @classmethod
+    def get_engine(cls) -> CommercialScoringEngine:
+        """获取按类缓存的评分引擎，只在首次使用时编译关键词"""
+        if cls.__dict__.get('_engine') is None:
+            cls._engine = CommercialScoringEngine(
+                AIProjectFilter.get_matcher(), cls.COMMERCIAL_KEYWORDS, cls.BUSINESS_INDICATORS,
+                boundary_keywords=cls.BOUNDARY_KEYWORDS
+            )
+        return cls._engine
+
+    def score_projects(self, projects: List[Dict]) -> List[CommercialScore]:
+        """批量评分，返回每个项目的得分和命中的关键词"""
+        return self.get_engine().score_batch(projects)
+
     def is_commercial_ai_project(self, repo: Dict) -> bool:
         """判断项目是否为商用实用性AI项目"""
-        # 首先必须是AI项目
-        ai_filter = AIProjectFilter()
-        if not ai_filter.is_ai_project(repo):
-            return False
+        return self.get_engine().score(repo).is_commercial
 
-        # 安全地处理可能为None的字段
-        name = repo.get('name') or ''
-        description = repo.get('description') or ''
-        topics = repo.get('topics') or []
+    def filter_commercial_ai_projects(self, projects: List[Dict]) -> List[Dict]:
+        """过滤出商用实用性AI项目"""
+        scores = self.score_projects(projects)
+        commercial_projects = [project for project, score in zip(projects, scores) if score.is_commercial]
 
-        # 额外考虑readme内容（如果有的话）
-        text_fields = [
-            name.lower(),
-            description.lower(),
-            ' '.join(topics).lower()
-        ]
+        self.logger.info(f"从 {len(projects)} 个项目中筛选出 {len(commercial_projects)} 个商用实用性AI项目")
+        return commercial_projects
 
-        full_text = ' '.join(text_fields)
 
-        # 检查商用关键词
-        commercial_score = 0
-        for keyword in self.COMMERCIAL_KEYWORDS:
-            if keyword in full_text:
-                commercial_score += 2
+class JSONDedupStore:
+    """已推送项目的JSON文件存储：启动时整体加载到内存，保存时整体重写"""
 
-        # 检查商业指标关键词
-        for keyword in self.BUSINESS_INDICATORS:
-            if keyword in full_text:
-                commercial_score += 1
+    # 内存中的记录可能落后于其他进程写入的文件，加锁修改前需要重新加载
+    reload_on_lock = True
 
-        # 额外的商用性评估
-        stars = repo.get('stargazers_count', 0)
-        forks = repo.get('forks_count', 0)
+    def __init__(self, path: str):
+        self.path = path
+        self.records: Dict[str, Dict] = {}
+        self.logger = logging.getLogger(__name__)
 
-        # 高star数的实用工具更可能是商用项目
-        if stars > 1000:
-            commercial_score += 1
-        if stars > 5000:
-            commercial_score += 1
+    def load(self):
+        """加载已推送项目记录"""
+        self.records = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.records = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                self.logger.error(f"读取已推送项目记录失败: {e}")
 
-        # 高fork率通常表示实用性
-        if forks > 0 and stars > 0:
-            fork_ratio = forks / stars
-            if fork_ratio > 0.1:  # 10%以上的fork率
-                commercial_score += 2
+    def contains(self, repo_id: str) -> bool:
+        return repo_id in self.records
 
-        # 商用性评分阈值
-        return commercial_score >= 3
+    def add_many(self, records: Dict[str, Dict]):
+        self.records.update(records)
 
-    def filter_commercial_ai_projects(self, projects: List[Dict]) -> List[Dict]:
-        """过滤出商用实用性AI项目"""
-        commercial_projects = []
-        for project in projects:
-            if self.is_commercial_ai_project(project):
-                commercial_projects.append(project)
+    def expire(self, cutoff_ts: float) -> int:
+        """删除推送时间早于cutoff_ts或无法解析的记录，返回删除条数"""
+        to_remove = []
+        for repo_id, project_info in self.records.items():
+            sent_ts = _timestamp_to_epoch(project_info.get('sent_date'))
+            if sent_ts is None or sent_ts < cutoff_ts:
+                to_remove.append(repo_id)
+        for repo_id in to_remove:
+            del self.records[repo_id]
+        return len(to_remove)
 
-        self.logger.info(f"从 {len(projects)} 个项目中筛选出 {len(commercial_projects)} 个商用实用性AI项目")
-        return commercial_projects
+    def clear(self):
+        self.records = {}
 
+    def ids(self) -> List[str]:
+        return list(self.records)
 
-class ProjectDeduplicator:
-    """项目去重器，管理已推送项目记录"""
+    def count(self) -> int:
+        return len(self.records)
+
+    def latest_sent(self) -> Optional[str]:
+        return max(info['sent_date'] for info in self.records.values()) if self.records else None
+
+    def recent(self, limit: int) -> List[Dict]:
+        return sorted(self.records.values(), key=lambda info: info.get('sent_date', ''), reverse=True)[:limit]
 
-    def __init__(self, storage_file: str = 'sent_projects.json'):
-        self.storage_file = storage_file
+    def flush(self):
+        """保存已推送项目记录，先写临时文件再原子替换，写入中途崩溃不会损坏原文件"""
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.records, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            self.logger.error(f"保存已推送项目记录失败: {e}")
+
+    def close(self):
+        pass
+
+
+class SQLiteDedupStore:
+    """
+    已推送项目的SQLite存储
+    repo_id为主键、sent_date（epoch秒）建索引，查询和过期清理都走索引，无需把全部历史加载到内存；
+    数据库为空时从旧的JSON记录文件一次性迁移
+    """
+
+    # 每次查询都直接读数据库，无需重新加载
+    reload_on_lock = False
+
+    def __init__(self, path: str, legacy_json: Optional[str] = None):
+        self.path = path
+        self.legacy_json = legacy_json
+        self._conn: Optional[sqlite3.Connection] = None
         self.logger = logging.getLogger(__name__)
-        self.sent_projects = self._load_sent_projects()
 
-    def _load_sent_projects(self) -> Dict:
-        """加载已推送项目记录"""
-        if os.path.exists(self.storage_file):
-            try:
-                with open(self.storage_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
-                self.logger.error(f"读取已推送项目记录失败: {e}")
-                return {}
-        return {}
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # 并发搜索的各线程会通过take_new_projects查询记录；写入只在主线程进行，多线程只读是安全的
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS sent_projects ('
+                'repo_id TEXT PRIMARY KEY, name TEXT, full_name TEXT, '
+                'sent_date REAL NOT NULL, stars INTEGER, url TEXT)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_sent_projects_sent_date ON sent_projects(sent_date)')
+            self._conn.commit()
+        return self._conn
+
+    def load(self):
+        """打开数据库，首次使用时迁移旧的JSON记录（通过user_version记录已迁移）"""
+        conn = self._connect()
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= 1:
+            return
+        if self.legacy_json and os.path.exists(self.legacy_json):
+            legacy = JSONDedupStore(self.legacy_json)
+            legacy.load()
+            self.add_many(legacy.records)
+            self.logger.info(f"从 {self.legacy_json} 迁移了 {len(legacy.records)} 条已推送记录")
+        conn.execute('PRAGMA user_version = 1')
+        conn.commit()
+
+    def contains(self, repo_id: str) -> bool:
+        return self._connect().execute(
+            'SELECT 1 FROM sent_projects WHERE repo_id = ?', (repo_id,)).fetchone() is not None
+
+    def add_many(self, records: Dict[str, Dict]):
+        rows = []
+        for repo_id, info in records.items():
+            sent_ts = _timestamp_to_epoch(info.get('sent_date'))
+            if sent_ts is None:
+                continue
+            rows.append((repo_id, info.get('name'), info.get('full_name'), sent_ts, info.get('stars'), info.get('url')))
+        self._connect().executemany(
+            'INSERT OR REPLACE INTO sent_projects (repo_id, name, full_name, sent_date, stars, url) '
+            'VALUES (?, ?, ?, ?, ?, ?)', rows
+        )
+
+    def expire(self, cutoff_ts: float) -> int:
+        # 立即提交：没有过期记录时调用方不会再flush，未提交的DELETE会一直占着写锁，其他进程只能等到超时
+        conn = self._connect()
+        removed = conn.execute('DELETE FROM sent_projects WHERE sent_date < ?', (cutoff_ts,)).rowcount
+        conn.commit()
+        return removed
 
-    def _save_sent_projects(self):
-        """保存已推送项目记录"""
+    def clear(self):
+        self._connect().execute('DELETE FROM sent_projects')
+
+    def ids(self) -> List[str]:
+        return [row[0] for row in self._connect().execute('SELECT repo_id FROM sent_projects')]
+
+    def count(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM sent_projects').fetchone()[0]
+
+    def latest_sent(self) -> Optional[str]:
+        latest = self._connect().execute('SELECT MAX(sent_date) FROM sent_projects').fetchone()[0]
+        return datetime.fromtimestamp(latest).isoformat() if latest is not None else None
+
+    def recent(self, limit: int) -> List[Dict]:
+        rows = self._connect().execute(
+            'SELECT name, full_name, sent_date, stars, url FROM sent_projects ORDER BY sent_date DESC LIMIT ?', (limit,))
+        return [{'name': name, 'full_name': full_name, 'sent_date': datetime.fromtimestamp(sent_ts).isoformat(),
+                 'stars': stars, 'url': url} for name, full_name, sent_ts, stars, url in rows]
+
+    def flush(self):
         try:
-            with open(self.storage_file, 'w', encoding='utf-8') as f:
-                json.dump(self.sent_projects, f, ensure_ascii=False, indent=2)
-        except IOError as e:
+            self._connect().commit()
+        except sqlite3.Error as e:
             self.logger.error(f"保存已推送项目记录失败: {e}")
 
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class JournalDedupStore(JSONDedupStore):
+    """
+    已推送项目的追加式JSONL日志存储
+    每次标记、过期、重置各追加一行事件，加载时按顺序回放到内存；
+    文件超过compact_bytes时改写为只含当前记录的快照。日常写入只追加新行，git提交的差异也只有新增行
+    """
+
+    def __init__(self, path: str, legacy_json: Optional[str] = None, compact_bytes: int = 256 * 1024):
+        super().__init__(path)
+        self.legacy_json = legacy_json
+        self.compact_bytes = compact_bytes
+        self._pending: List[Dict] = []
+        # 文件末尾是否有崩溃留下的不完整行，下次追加需先换行
+        self._torn_tail = False
+
+    def load(self):
+        """回放日志事件，日志不存在时从旧的JSON记录文件导入"""
+        self.records = {}
+        self._pending = []
+        self._torn_tail = False
+        if not os.path.exists(self.path):
+            if self.legacy_json and os.path.exists(self.legacy_json):
+                legacy = JSONDedupStore(self.legacy_json)
+                legacy.load()
+                self.records = legacy.records
+                self.compact()
+                self.logger.info(f"从 {self.legacy_json} 导入了 {len(self.records)} 条已推送记录")
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    self._torn_tail = not line.endswith('\n')
+                    if not line.strip():
+                        continue
+                    try:
+                        self._apply(json.loads(line))
+                    except (json.JSONDecodeError, KeyError, TypeError) as e:
+                        # 写入中途崩溃只会损坏最后一行，跳过即可
+                        self.logger.warning(f"跳过无法解析的日志行 {line_number}: {e}")
+        except IOError as e:
+            self.logger.error(f"读取已推送项目日志失败: {e}")
+
+    def _apply(self, event: Dict):
+        op = event['op']
+        if op == 'mark':
+            self.records[event['id']] = event['info']
+        elif op == 'expire':
+            for repo_id in event['ids']:
+                self.records.pop(repo_id, None)
+        elif op == 'reset':
+            self.records = {}
+
+    def add_many(self, records: Dict[str, Dict]):
+        super().add_many(records)
+        self._pending.extend({'op': 'mark', 'id': repo_id, 'info': info} for repo_id, info in records.items())
+
+    def expire(self, cutoff_ts: float) -> int:
+        before = set(self.records)
+        removed = super().expire(cutoff_ts)
+        if removed:
+            self._pending.append({'op': 'expire', 'ids': sorted(before - set(self.records))})
+        return removed
+
+    def clear(self):
+        super().clear()
+        self._pending = [{'op': 'reset'}]
+
+    def flush(self):
+        """追加未写入的事件，文件超过阈值时压缩"""
+        if self._pending:
+            lines = ''.join(json.dumps(event, ensure_ascii=False) + '\n' for event in self._pending)
+            if self._torn_tail:
+                lines = '\n' + lines
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._pending = []
+                self._torn_tail = False
+            except (IOError, OSError) as e:
+                self.logger.error(f"追加已推送项目日志失败: {e}")
+                return
+
+        try:
+            if os.path.getsize(self.path) > self.compact_bytes:
+                self.compact()
+        except OSError:
+            pass
+
+    def compact(self):
+        """把日志改写为每条当前记录一行的快照，先写临时文件再原子替换"""
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for repo_id, info in self.records.items():
+                    f.write(json.dumps({'op': 'mark', 'id': repo_id, 'info': info}, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._pending = []
+            self._torn_tail = False
+            self.logger.info(f"已压缩推送日志，保留 {len(self.records)} 条记录")
+        except (IOError, OSError) as e:
+            self.logger.error(f"压缩已推送项目日志失败: {e}")
+
+
+class SentHistory:
+    """
+    长期已推送项目集合：排好序的repo id数组（每个id 8字节），二分查找判断是否推送过
+    不保存推送详情也从不过期，以小端序二进制文件持久化
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ids = array('q')
+        self.logger = logging.getLogger(__name__)
+
+    def load(self):
+        self.ids = array('q')
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as f:
+                    self.ids.frombytes(f.read())
+                if sys.byteorder != 'little':
+                    self.ids.byteswap()
+            except (IOError, ValueError) as e:
+                self.logger.error(f"读取长期推送记录失败: {e}")
+                self.ids = array('q')
+
+    def __contains__(self, repo_id: int) -> bool:
+        position = bisect_left(self.ids, repo_id)
+        return position < len(self.ids) and self.ids[position] == repo_id
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add_many(self, repo_ids: Iterable[int]):
+        new_ids = {repo_id for repo_id in repo_ids if repo_id not in self}
+        if len(new_ids) <= 64:
+            # 日常每次只新增几个id，逐个插入即可
+            for repo_id in new_ids:
+                insort(self.ids, repo_id)
+        else:
+            self.ids = array('q', sorted(new_ids.union(self.ids)))
+
+    def clear(self):
+        self.ids = array('q')
+
+    def flush(self):
+        """先写临时文件再原子替换"""
+        data = array('q', self.ids)
+        if sys.byteorder != 'little':
+            data.byteswap()
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            self.logger.error(f"保存长期推送记录失败: {e}")
+
+
+class ProjectDeduplicator:
+    """
+    项目去重器，管理已推送项目记录
+    所有修改都在记录文件旁的.lock文件上加fcntl排他锁后进行：先重新读取其他进程写入的记录，修改后再保存，
+    多个追踪进程并行运行也不会互相覆盖
+    """
+
+    BACKENDS = ('json', 'sqlite', 'jsonl')
+
+    # 命名空间的每一段只允许字母、数字、下划线和连字符，如'ai/lifetime'
+    NAMESPACE_PATTERN = re.compile(r'^[A-Za-z0-9_-]+(/[A-Za-z0-9_-]+)*$')
+
+    def __init__(self, storage_file: str = 'sent_projects.json', backend: Optional[str] = None,
+                 never_resend: bool = False, parent: Optional['ProjectDeduplicator'] = None,
+                 history_file: Optional[str] = None):
+        """
+        storage_file: JSON记录文件路径；sqlite/jsonl后端分别使用同名的.db/.jsonl文件，并在首次使用时从该JSON文件迁移
+        backend: 'json', 'sqlite', 'jsonl'，未指定时读取环境变量DEDUP_BACKEND（默认json），所有入口共用同一份记录
+        never_resend: 启用长期记录（默认为同目录下的sent_history.bin），推送过的项目在详细记录过期后也不再推送
+        parent: 分片的全局去重器，设置后判断和标记都会同时作用于全局记录
+        history_file: 长期记录文件路径，与记录文件受同一把锁保护
+        """
+        self.logger = logging.getLogger(__name__)
+        backend = backend or os.getenv('DEDUP_BACKEND', 'json')
+        self.backend = backend
+        self.parent = parent
+        self.store = self._create_store(storage_file, backend)
+        self.storage_file = self.store.path
+        self.lock_file = f'{self.storage_file}.lock'
+        # batch()嵌套层数及期间是否有未写入的修改
+        self._batch_depth = 0
+        self._dirty = False
+
+        self.history: Optional[SentHistory] = None
+        if never_resend:
+            self.history = SentHistory(history_file or os.path.join(os.path.dirname(self.storage_file), 'sent_history.bin'))
+
+        with self._file_lock():
+            self.store.load()
+            if self.history is not None:
+                self.history.load()
+                if not os.path.exists(self.history.path):
+                    # 首次启用时用现有的详细记录初始化
+                    self.history.add_many(self._int_ids(self.store.ids()))
+                    self.history.flush()
+
+    @staticmethod
+    def _create_store(storage_file: str, backend: str):
+        if backend == 'json':
+            return JSONDedupStore(storage_file)
+        if backend == 'sqlite':
+            root, ext = os.path.splitext(storage_file)
+            if ext == '.db':
+                return SQLiteDedupStore(storage_file)
+            return SQLiteDedupStore(root + '.db', legacy_json=storage_file)
+        if backend == 'jsonl':
+            root, ext = os.path.splitext(storage_file)
+            if ext == '.jsonl':
+                return JournalDedupStore(storage_file)
+            return JournalDedupStore(root + '.jsonl', legacy_json=storage_file)
+        raise ValueError(f"不支持的去重存储后端: {backend}")
+
+    def shard(self, namespace: str, shared: bool = True) -> 'ProjectDeduplicator':
+        """
+        创建命名空间分片（如'ai/lifetime'），记录保存在以本存储文件名为目录的独立文件中
+        shared=True：判断和标记同时作用于本去重器的记录，各分片之间不会重复推送
+        shared=False：分片完全独立，不同分片可能推送同一项目，但可以并行运行互不等待锁
+        启用长期记录时，共享分片通过全局去重器的长期记录判断；独立分片使用自己的长期记录文件（如lifetime.history.bin）
+        """
+        if not self.NAMESPACE_PATTERN.match(namespace):
+            raise ValueError(f"无效的去重命名空间: {namespace}")
+        root, ext = os.path.splitext(self.storage_file)
+        shard_root = os.path.join(root, *namespace.split('/'))
+        os.makedirs(os.path.dirname(shard_root), exist_ok=True)
+        if shared:
+            return ProjectDeduplicator(shard_root + ext, backend=self.backend, parent=self)
+        return ProjectDeduplicator(shard_root + ext, backend=self.backend, never_resend=self.history is not None,
+                                   history_file=f'{shard_root}.history.bin')
+
+    @staticmethod
+    def _int_ids(repo_ids: Iterable[Any]) -> List[int]:
+        """长期记录只保存整数id"""
+        result = []
+        for repo_id in repo_ids:
+            try:
+                result.append(int(repo_id))
+            except (TypeError, ValueError):
+                continue
+        return result
+
+    def _file_lock(self):
+        """持有记录文件的进程间排他锁"""
+        return _exclusive_file_lock(self.lock_file)
+
+    def _flush(self):
+        self.store.flush()
+        if self.history is not None:
+            self.history.flush()
+        self._dirty = False
+
+    @contextmanager
+    def batch(self):
+        """
+        在进程间锁内批量修改记录：进入时重新加载最新记录，期间的修改只在退出时写一次
+        即使中途抛出异常，已做的修改也会保存
+        """
+        if self._batch_depth:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+            return
+
+        with ExitStack() as stack:
+            # 与全局记录联动时先锁全局再锁分片，加锁顺序固定，不会死锁
+            if self.parent is not None:
+                stack.enter_context(self.parent.batch())
+            stack.enter_context(self._file_lock())
+            if self.store.reload_on_lock:
+                self.store.load()
+            if self.history is not None:
+                self.history.load()
+            self._batch_depth = 1
+            try:
+                yield self
+            finally:
+                self._batch_depth = 0
+                if self._dirty:
+                    self._flush()
+
     def is_project_sent(self, repo_id: str) -> bool:
-        """检查项目是否已推送"""
-        return str(repo_id) in self.sent_projects
+        """检查项目是否已推送：先查近期详细记录，启用长期记录时再查长期记录"""
+        if self.store.contains(str(repo_id)):
+            return True
+        if self.history is not None:
+            int_ids = self._int_ids([repo_id])
+            if int_ids and int_ids[0] in self.history:
+                return True
+        return self.parent is not None and self.parent.is_project_sent(repo_id)
 
     def mark_project_as_sent(self, repo: Dict):
         """标记项目为已推送"""
-        repo_id = str(repo['id'])
-        self.sent_projects[repo_id] = {
-            'name': repo['name'],
-            'full_name': repo['full_name'],
-            'sent_date': datetime.now().isoformat(),
-            'stars': repo['stargazers_count'],
-            'url': repo['html_url']
-        }
-        self._save_sent_projects()
+        self.mark_projects_as_sent([repo])
+
+    def mark_projects_as_sent(self, repos: List[Dict]):
+        """批量标记项目为已推送，只写一次"""
+        if not repos:
+            return
+        sent_date = datetime.now().isoformat()
+        with self.batch():
+            self.store.add_many({
+                str(repo['id']): {
+                    'name': repo['name'],
+                    'full_name': repo['full_name'],
+                    'sent_date': sent_date,
+                    'stars': repo['stargazers_count'],
+                    'url': repo['html_url']
+                }
+                for repo in repos
+            })
+            if self.history is not None:
+                self.history.add_many(self._int_ids(repo['id'] for repo in repos))
+            if self.parent is not None:
+                self.parent.mark_projects_as_sent(repos)
+            self._dirty = True
+
+    def claim_projects(self, repos: Iterable[Dict], limit: Optional[int] = None) -> List[Dict]:
+        """
+        按顺序认领至多limit个未推送项目并立即标记为已推送，返回认领到的项目
+        检查和标记在同一把进程间锁内完成，并行运行的进程不会认领到同一个项目
+        """
+        with self.batch():
+            claimed = []
+            for repo in repos:
+                if limit is not None and len(claimed) >= limit:
+                    break
+                if not self.is_project_sent(repo['id']):
+                    claimed.append(repo)
+            self.mark_projects_as_sent(claimed)
+        return claimed
 
     def clean_old_records(self, days: int = 30):
         """清理旧记录"""
-        cutoff_date = datetime.now() - timedelta(days=days)
-        to_remove = []
-
-        for repo_id, project_info in self.sent_projects.items():
-            try:
-                sent_date = date_parser.parse(project_info['sent_date'])
-                if sent_date < cutoff_date:
-                    to_remove.append(repo_id)
-            except (ValueError, TypeError):
-                to_remove.append(repo_id)
-
-        for repo_id in to_remove:
-            del self.sent_projects[repo_id]
-
-        if to_remove:
-            self._save_sent_projects()
-            self.logger.info(f"清理了 {len(to_remove)} 条旧记录")
+        with self.batch():
+            removed = self.store.expire(time.time() - days * 86400)
+            if removed:
+                self._dirty = True
+        if removed:
+            self.logger.info(f"清理了 {removed} 条旧记录")
 
     def filter_new_projects(self, projects: List[Dict]) -> List[Dict]:
         """过滤出未推送的项目"""
@@ -354,19 +1684,44 @@ class ProjectDeduplicator:
         self.logger.info(f"从 {len(projects)} 个项目中过滤出 {len(new_projects)} 个未推送项目")
         return new_projects
 
+    def take_new_projects(self, projects: Iterable[Dict], limit: int) -> List[Dict]:
+        """
+        从（可能是惰性的）项目流中取出至多limit个未推送项目
+        取够后立即停止消费，配合iter_search可避免请求多余的分页
+        """
+        new_projects = []
+        if limit <= 0:
+            return new_projects
+        for project in projects:
+            if not self.is_project_sent(project['id']):
+                new_projects.append(project)
+                if len(new_projects) >= limit:
+                    break
+        return new_projects
+
     def reset_sent_projects(self):
         """重置已推送项目记录，清空所有记录"""
-        self.sent_projects = {}
-        self._save_sent_projects()
+        with self.batch():
+            self.store.clear()
+            if self.history is not None:
+                self.history.clear()
+            self._dirty = True
         self.logger.info("已重置所有推送记录，下次将推送最热门的项目")
 
     def get_stats(self) -> Dict:
         """获取推送统计信息"""
-        return {
-            'total_sent': len(self.sent_projects),
-            'latest_sent': max([proj['sent_date'] for proj in self.sent_projects.values()]) if self.sent_projects else None,
+        stats = {
+            'total_sent': self.store.count(),
+            'latest_sent': self.store.latest_sent(),
             'storage_file': self.storage_file
         }
+        if self.history is not None:
+            stats['lifetime_sent'] = len(self.history)
+        return stats
+
+    def recent_projects(self, limit: int = 5) -> List[Dict]:
+        """按推送时间倒序返回最近推送的项目记录"""
+        return self.store.recent(limit)
 
 
 class ProjectSummarizer:
@@ -384,17 +1739,6 @@ class ProjectSummarizer:
             forks = repo.get('forks_count', 0)
             language = repo.get('language', 'Unknown')
             topics = repo.get('topics', [])
-            created_at = repo.get('created_at', '')
-            updated_at = repo.get('updated_at', '')
-
-            # 计算项目年龄
-            try:
-                created_date = date_parser.parse(created_at)
-                days_since_creation = max((datetime.now().replace(tzinfo=None) -
-                                         created_date.replace(tzinfo=None)).days, 1)
-                years = days_since_creation / 365.25
-            except:
-                years = 0
 
             # 只使用技术亮点和内容描述，避免数字重复
             technical_highlights = self._generate_technical_highlights(name, description, language, topics)
@@ -503,264 +1847,1285 @@ class ProjectSummarizer:
             return "正在建立社区基础，展现出良好的发展前景。"
 
 
-class TrendAnalyzer:
-    """趋势分析器，计算项目趋势分数"""
+class StarHistoryStore:
+    """
+    本地star历史快照存储（列式、只追加）
+    每列一个二进制文件：repo_ids/stars/forks/timestamps，每次运行为每个候选项目追加一行（每天至多一行），
+    内存中维护repo_id到行号的索引，用于计算真实的7天/30天star增量；
+    追加在目录旁的.lock文件上加进程间排他锁后进行，并行运行的追踪器不会让各列错位
+    """
 
-    def __init__(self):
+    COLUMNS = (('repo_ids', 'q'), ('stars', 'q'), ('forks', 'q'), ('timestamps', 'q'))
+
+    def __init__(self, directory: str = 'star_history'):
+        self.directory = directory
         self.logger = logging.getLogger(__name__)
+        self.lock_file = f'{os.path.normpath(directory)}.lock'
+        self._columns: Optional[Dict[str, array]] = None
+        self._index: Dict[int, List[int]] = {}
+
+    def _path(self, column: str) -> str:
+        return os.path.join(self.directory, f'{column}.bin')
+
+    def _load(self, reload: bool = False) -> Dict[str, array]:
+        """首次使用（或reload时）加载各列并构建索引"""
+        if self._columns is not None and not reload:
+            return self._columns
+
+        columns = {}
+        for column, typecode in self.COLUMNS:
+            data = array(typecode)
+            path = self._path(column)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                # 丢弃写入中断留下的不完整值
+                data.frombytes(raw[:len(raw) - len(raw) % data.itemsize])
+                if sys.byteorder != 'little':
+                    data.byteswap()
+            columns[column] = data
+
+        # 写入中途中断可能导致各列长度不一致，按最短列截断
+        rows = min(len(data) for data in columns.values())
+        for column, data in columns.items():
+            if len(data) > rows:
+                self.logger.warning(f"star历史列 {column} 长度不一致，截断到 {rows} 行")
+                del data[rows:]
+
+        self._index = {}
+        for offset, repo_id in enumerate(columns['repo_ids']):
+            self._index.setdefault(repo_id, []).append(offset)
+        self._columns = columns
+        return columns
+
+    def __len__(self) -> int:
+        return len(self._load()['repo_ids'])
+
+    def record_snapshot(self, repos: Iterable[Dict], timestamp: Optional[float] = None) -> int:
+        """
+        追加本次看到的项目快照，同一项目同一天（UTC）只记录一次，返回新增行数
+        读取、检查和追加都在进程间锁内完成：先重新加载其他进程追加的行，并把长度不一致的列文件截断到最短列
+        """
+        with _exclusive_file_lock(self.lock_file):
+            columns = self._load(reload=True)
+            rows = len(columns['repo_ids'])
+            for column, data in columns.items():
+                path = self._path(column)
+                if os.path.exists(path) and os.path.getsize(path) != rows * data.itemsize:
+                    os.truncate(path, rows * data.itemsize)
+            return self._append_snapshot(columns, repos, timestamp)
+
+    def _append_snapshot(self, columns: Dict[str, array], repos: Iterable[Dict], timestamp: Optional[float]) -> int:
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        day = timestamp // 86400
+        new_rows: Dict[str, array] = {column: array(typecode) for column, typecode in self.COLUMNS}
+        pending_ids = set()
+
+        for repo in repos:
+            repo_id = repo.get('id')
+            if repo_id is None:
+                continue
+            repo_id = int(repo_id)
+            offsets = self._index.get(repo_id)
+            if repo_id in pending_ids or (offsets and columns['timestamps'][offsets[-1]] // 86400 == day):
+                continue
 
-    def calculate_trend_score(self, repo: Dict, timeframe: str = 'lifetime') -> float:
+            pending_ids.add(repo_id)
+            new_rows['repo_ids'].append(repo_id)
+            new_rows['stars'].append(int(repo.get('stargazers_count', 0)))
+            new_rows['forks'].append(int(repo.get('forks_count', 0)))
+            new_rows['timestamps'].append(timestamp)
+
+        if not new_rows['repo_ids']:
+            return 0
+
+        first_offset = len(columns['repo_ids'])
+        for offset, repo_id in enumerate(new_rows['repo_ids'], first_offset):
+            self._index.setdefault(repo_id, []).append(offset)
+
+        os.makedirs(self.directory, exist_ok=True)
+        for column, data in new_rows.items():
+            columns[column].extend(data)
+            if sys.byteorder != 'little':
+                data.byteswap()
+            with open(self._path(column), 'ab') as f:
+                data.tofile(f)
+
+        self.logger.info(f"记录了 {len(new_rows['repo_ids'])} 个项目的star快照")
+        return len(new_rows['repo_ids'])
+
+    def get_delta(self, repo_id: int, days: int, now: Optional[float] = None) -> Optional[Tuple[int, int, float]]:
         """
-        计算项目趋势分数
-        timeframe: 'lifetime', '30days', '7days'
+        计算最近days天内的star/fork增量，返回 (star增量, fork增量, 实际跨度天数)
+        基准取窗口起点之前最近的一行；历史不足窗口长度时取最早一行，跨度不足1天时返回None
         """
-        try:
-            created_at = date_parser.parse(repo['created_at'])
-            # 确保两个datetime都是naive类型
-            if created_at.tzinfo is not None:
-                created_at = created_at.replace(tzinfo=None)
+        columns = self._load()
+        offsets = self._index.get(int(repo_id))
+        if not offsets or len(offsets) < 2:
+            return None
+
+        timestamps = columns['timestamps']
+        latest = offsets[-1]
+        window_start = (now if now is not None else timestamps[latest]) - days * 86400
+
+        # 二分查找时间戳不晚于窗口起点的最后一行
+        low, high = 0, len(offsets)
+        while low < high:
+            middle = (low + high) // 2
+            if timestamps[offsets[middle]] <= window_start:
+                low = middle + 1
+            else:
+                high = middle
+        baseline = offsets[low - 1] if low > 0 else offsets[0]
 
-            stars = repo.get('stargazers_count', 0)
-            forks = repo.get('forks_count', 0)
+        span_days = (timestamps[latest] - timestamps[baseline]) / 86400
+        if span_days < 1:
+            return None
+        return (columns['stars'][latest] - columns['stars'][baseline],
+                columns['forks'][latest] - columns['forks'][baseline],
+                span_days)
 
-            if timeframe == 'lifetime':
-                # 原有逻辑：基于项目整个生命周期
-                days_since_creation = max((datetime.now() - created_at).days, 1)
-                daily_stars = stars / days_since_creation
-                daily_forks = forks / days_since_creation
-                trend_score = daily_stars * 0.7 + daily_forks * 0.3
-
-            elif timeframe == '30days':
-                # 30天趋势：假设最近30天获得的stars/forks比例更高
-                # 使用更激进的增长假设来识别近期热门项目
-                days_since_creation = max((datetime.now() - created_at).days, 1)
-
-                # 对于较新的项目（<30天），使用实际天数
-                if days_since_creation <= 30:
-                    effective_days = days_since_creation
-                else:
-                    # 对于老项目，假设30%的stars来自最近30天
-                    effective_days = 30
-                    stars = int(stars * 0.3)  # 估算最近30天的增长
-                    forks = int(forks * 0.3)
 
-                daily_stars = stars / effective_days
-                daily_forks = forks / effective_days
-                trend_score = daily_stars * 0.7 + daily_forks * 0.3
+class TrendScoreTable:
+    """一批候选项目在各时间框架下的趋势分数，可按项目id取出任意子集的分数"""
 
-            elif timeframe == '7days':
-                # 7天趋势：更激进的近期增长估算
-                days_since_creation = max((datetime.now() - created_at).days, 1)
+    def __init__(self, projects: List[Dict], scores: Dict[str, np.ndarray]):
+        self.scores = scores
+        self._positions = {project.get('id'): i for i, project in enumerate(projects)}
 
-                if days_since_creation <= 7:
-                    effective_days = days_since_creation
-                else:
-                    # 对于老项目，假设15%的stars来自最近7天
-                    effective_days = 7
-                    stars = int(stars * 0.15)
-                    forks = int(forks * 0.15)
+    def get(self, projects: List[Dict], timeframe: str) -> np.ndarray:
+        """按projects的顺序取出指定时间框架的分数"""
+        return self.scores[timeframe][[self._positions[project.get('id')] for project in projects]]
 
-                daily_stars = stars / effective_days
-                daily_forks = forks / effective_days
-                trend_score = daily_stars * 0.7 + daily_forks * 0.3
 
-            else:
+class TrendAnalyzer:
+    """趋势分析器，计算项目趋势分数"""
+
+    TIMEFRAMES = ('lifetime', '30days', '7days')
+
+    # 各时间框架对应的窗口天数
+    TIMEFRAME_DAYS = {'30days': 30, '7days': 7}
+
+    # 老项目估算窗口内star/fork增长所占的比例：30天取30%，7天取15%
+    RECENT_SHARE = {'30days': 0.3, '7days': 0.15}
+
+    def __init__(self, history: Optional[StarHistoryStore] = None):
+        self.history = history
+        self.logger = logging.getLogger(__name__)
+
+    def score_all_timeframes(self, projects: List[Dict], timeframes: Iterable[str] = TIMEFRAMES,
+                             now: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """
+        一次计算一批项目在多个时间框架下的趋势分数
+        返回 {timeframe: 分数数组}，数组顺序与projects一致；创建时间无法解析的项目分数为0
+        """
+        timeframes = list(timeframes)
+        for timeframe in timeframes:
+            if timeframe != 'lifetime' and timeframe not in self.TIMEFRAME_DAYS:
                 raise ValueError(f"不支持的时间框架: {timeframe}")
 
-            return trend_score
+        now = time.time() if now is None else now
+        count = len(projects)
+        created = np.empty(count)
+        stars = np.empty(count)
+        forks = np.empty(count)
+        for i, repo in enumerate(projects):
+            # RepoRecord在入库时已解析好创建时间，普通dict则现场解析
+            created_ts = repo.get('created_ts')
+            if created_ts is None:
+                created_ts = _timestamp_to_epoch(repo.get('created_at'))
+            created[i] = np.nan if created_ts is None else created_ts
+            stars[i] = repo.get('stargazers_count', 0)
+            forks[i] = repo.get('forks_count', 0)
+
+        invalid = np.isnan(created)
+        if invalid.any():
+            self.logger.error(f"计算趋势分数失败: {int(invalid.sum())} 个项目的创建时间无法解析")
+        days_since_creation = np.maximum(np.floor((now - np.where(invalid, now, created)) / 86400), 1)
+
+        scores = {}
+        for timeframe in timeframes:
+            if timeframe == 'lifetime':
+                # 原有逻辑：基于项目整个生命周期
+                score = (stars * 0.7 + forks * 0.3) / days_since_creation
+            else:
+                # 近期趋势：窗口内创建的新项目使用实际天数，
+                # 老项目假设一定比例的stars/forks来自最近窗口内（向下取整）
+                window = self.TIMEFRAME_DAYS[timeframe]
+                share = self.RECENT_SHARE[timeframe]
+                is_new = days_since_creation <= window
+                effective_days = np.where(is_new, days_since_creation, window)
+                recent_stars = np.where(is_new, stars, np.floor(stars * share))
+                recent_forks = np.where(is_new, forks, np.floor(forks * share))
+                score = (recent_stars * 0.7 + recent_forks * 0.3) / effective_days
+
+                # 有本地star历史时使用真实增量，否则保留估算值
+                if self.history is not None:
+                    for i, repo in enumerate(projects):
+                        if repo.get('id') is None:
+                            continue
+                        delta = self.history.get_delta(repo['id'], window, now=now)
+                        if delta is not None:
+                            star_delta, fork_delta, span_days = delta
+                            score[i] = (star_delta / span_days) * 0.7 + (fork_delta / span_days) * 0.3
+
+            score[invalid] = 0.0
+            scores[timeframe] = score
+        return scores
+
+    def score_table(self, projects: List[Dict], timeframes: Iterable[str] = TIMEFRAMES,
+                    now: Optional[float] = None) -> TrendScoreTable:
+        """计算一批候选项目在各时间框架下的分数，供后续按子集选取"""
+        return TrendScoreTable(projects, self.score_all_timeframes(projects, timeframes, now))
+
+    def calculate_trend_score(self, repo: Dict, timeframe: str = 'lifetime') -> float:
+        """
+        计算项目趋势分数
+        timeframe: 'lifetime', '30days', '7days'
+        """
+        try:
+            return float(self.score_all_timeframes([repo], (timeframe,))[timeframe][0])
         except Exception as e:
             self.logger.error(f"计算趋势分数失败: {e}")
             return 0.0
 
+    @staticmethod
+    def _rank(scores: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+        """返回分数从高到低的前k个下标，分数相同时保持原有顺序"""
+        if k is None or k >= len(scores):
+            return np.argsort(-scores, kind='stable')
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        # argpartition找出第k大的分数，只对不低于它的候选排序
+        kth_score = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        candidates = np.flatnonzero(scores >= kth_score)
+        return candidates[np.argsort(-scores[candidates], kind='stable')][:k]
+
+    def top_k(self, projects: List[Dict], timeframe: str = 'lifetime', k: int = 2,
+              table: Optional[TrendScoreTable] = None) -> List[Dict]:
+        """选出趋势分数最高的k个项目（不对全部项目排序），并写入其trend_score"""
+        if not projects:
+            return []
+        scores = table.get(projects, timeframe) if table is not None else \
+            self.score_all_timeframes(projects, (timeframe,))[timeframe]
+        selected = []
+        for i in self._rank(scores, k):
+            projects[i]['trend_score'] = float(scores[i])
+            selected.append(projects[i])
+        return selected
+
     def sort_by_trend_score(self, projects: List[Dict], timeframe: str = 'lifetime') -> List[Dict]:
         """按趋势分数排序项目"""
-        for project in projects:
-            project['trend_score'] = self.calculate_trend_score(project, timeframe)
+        scores = self.score_all_timeframes(projects, (timeframe,))[timeframe] if projects else np.empty(0)
+        for project, score in zip(projects, scores.tolist()):
+            project['trend_score'] = score
 
-        sorted_projects = sorted(projects, key=lambda x: x['trend_score'], reverse=True)
+        sorted_projects = [projects[i] for i in self._rank(scores)]
         self.logger.info(f"按{timeframe}趋势分数排序了 {len(sorted_projects)} 个项目")
         return sorted_projects
 
 
-class DiscordNotifier:
-    """Discord消息推送器"""
+class DeliveryResult(NamedTuple):
+    """单个webhook的投递结果"""
+    url: str
+    ok: bool
+    status: Optional[int]
+    attempts: int
+    latency: float  # 从开始投递到结束的秒数（含限额等待和重试）
+    error: Optional[str] = None
+
+
+class WebhookDeliveryClient:
+    """
+    Webhook投递客户端
+    复用带连接池的会话并设置超时；按webhook地址根据X-RateLimit-Remaining和X-RateLimit-Reset-After维护限额桶，
+    429时按retry_after等待后重试，5xx和连接失败按带抖动的指数退避重试；
+    读取响应超时或连接中途断开时服务器可能已收到消息，不立即重试，由发件箱保留
+    """
+
+    def __init__(self, timeout: float = 10.0, max_retries: int = 4, backoff: float = 1.0,
+                 max_wait: Optional[float] = None, max_concurrency: Optional[int] = None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # 单次最长等待时间（秒），超过则放弃投递而不是长时间阻塞
+        self.max_wait = max_wait if max_wait is not None else float(os.getenv('WEBHOOK_RATE_LIMIT_MAX_WAIT', '60'))
+        # 同时投递的webhook数上限，连接池大小与之匹配
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv('WEBHOOK_MAX_CONCURRENCY', '4')))
 
-    def __init__(self, webhook_url: Optional[str] = None, summarizer: Optional['ProjectSummarizer'] = None):
-        self.webhook_url = webhook_url or os.getenv('DISCORD_WEBHOOK_URL')
-        self.summarizer = summarizer or ProjectSummarizer()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_concurrency, pool_maxsize=self.max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Dict[str, Any]] = {}
+        self._global_blocked_until = 0.0
         self.logger = logging.getLogger(__name__)
 
-    def format_project_info(self, repo: Dict, rank: int) -> str:
-        """格式化项目信息（包含智能总结）"""
-        name = repo['name']
-        stars = repo['stargazers_count']
-        forks = repo['forks_count']
-        url = repo['html_url']
-        language = repo.get('language', 'Unknown')
+    def _bucket(self, url: str) -> Dict[str, Any]:
+        if url not in self._buckets:
+            self._buckets[url] = {'remaining': None, 'reset': 0.0}
+        return self._buckets[url]
+
+    def _acquire(self, url: str):
+        """发送前调用，限额桶耗尽或被全局限流时等待到重置时间"""
+        while True:
+            with self._lock:
+                bucket = self._bucket(url)
+                now = time.time()
+                if bucket['remaining'] is not None and bucket['reset'] <= now:
+                    bucket['remaining'] = None
+
+                if self._global_blocked_until > now:
+                    wait = self._global_blocked_until - now
+                elif bucket['remaining'] is not None and bucket['remaining'] <= 0:
+                    wait = bucket['reset'] - now
+                else:
+                    # 预占一个配额，避免并发投递同时透支
+                    if bucket['remaining'] is not None:
+                        bucket['remaining'] -= 1
+                    return
+
+            if wait > self.max_wait:
+                raise RateLimitExceededError(f"webhook限流，需要等待 {wait:.0f} 秒")
+            self.logger.info(f"webhook限流，等待 {wait:.1f} 秒")
+            time.sleep(wait)
+
+    def _update(self, url: str, response: requests.Response) -> float:
+        """根据响应头更新限额桶，429时返回需要等待的秒数"""
+        headers = response.headers
+        with self._lock:
+            bucket = self._bucket(url)
+            now = time.time()
+            try:
+                if 'X-RateLimit-Remaining' in headers:
+                    bucket['remaining'] = int(headers['X-RateLimit-Remaining'])
+                    bucket['reset'] = now + float(headers.get('X-RateLimit-Reset-After', 1))
+            except ValueError:
+                pass
 
-        # 生成智能总结
-        summary = self.summarizer.generate_summary(repo)
+            if response.status_code != 429:
+                return 0.0
 
-        # 限制总结长度，确保Discord消息不会太长
-        if len(summary) > 120:
-            summary = summary[:120] + '...'
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            if not isinstance(body, dict):
+                body = {}
+            try:
+                retry_after = float(body.get('retry_after') or headers.get('Retry-After') or 1)
+            except (TypeError, ValueError):
+                retry_after = 1.0
 
-        return f"{rank}. **{name}** - ⭐{stars:,} 🍴{forks:,} 📝{language}\n   💡 {summary}\n   [🔗 查看项目]({url})"
+            if body.get('global') or headers.get('X-RateLimit-Global', '').lower() == 'true':
+                self._global_blocked_until = max(self._global_blocked_until, now + retry_after)
+            else:
+                bucket['remaining'] = 0
+                bucket['reset'] = max(bucket['reset'], now + retry_after)
+            return retry_after
+
+    def _sleep_backoff(self, attempt: int):
+        """带抖动的指数退避"""
+        delay = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+        time.sleep(min(delay, self.max_wait))
+
+    @staticmethod
+    def _failed_before_sending(error: requests.exceptions.RequestException) -> bool:
+        """请求是否在建立连接时就失败（消息一定没有发出），只有这类网络错误可以放心重试"""
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+            # 连接被拒绝、域名解析失败等：MaxRetryError.reason为NewConnectionError（ConnectTimeoutError的子类）
+            return isinstance(getattr(error.args[0], 'reason', None), ConnectTimeoutError)
+        return False
 
-    def create_discord_embed(self, popular_projects: List[Dict], trending_projects: List[Dict], trend_timeframe: str = 'lifetime') -> Dict:
-        """创建Discord Embed消息"""
-        # 根据时间框架生成标题和描述
-        timeframe_titles = {
-            'lifetime': '最值得关注的AI开源项目',
-            '30days': '最近30天上升最快的AI项目',
-            '7days': '最近7天上升最快的AI项目'
-        }
+    @staticmethod
+    def _encode(payload: Dict) -> bytes:
+        return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+    def deliver(self, url: str, payload: Dict) -> DeliveryResult:
+        """投递一条消息，返回投递结果（不抛出网络异常）"""
+        return self._send(url, self._encode(payload))
+
+    def deliver_all(self, urls: List[str], payload: Dict) -> List[DeliveryResult]:
+        """把同一条消息只序列化一次，并发投递到多个webhook，结果顺序与urls一致"""
+        body = self._encode(payload)
+        if len(urls) <= 1:
+            return [self._send(url, body) for url in urls]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(urls))) as executor:
+            return list(executor.map(lambda url: self._send(url, body), urls))
+
+    def _send(self, url: str, body: bytes) -> DeliveryResult:
+        start = time.perf_counter()
+        attempts = 0
+        status = None
+        error = None
+
+        while attempts <= self.max_retries:
+            try:
+                self._acquire(url)
+            except RateLimitExceededError as e:
+                error = str(e)
+                break
 
-        trending_field_names = {
-            'lifetime': '📈 趋势上升最快的AI项目',
-            '30days': '📈 最近30天上升最快的AI项目',
-            '7days': '🚀 最近7天上升最快的AI项目'
-        }
+            attempts += 1
+            try:
+                response = self.session.post(url, data=body, headers={'Content-Type': 'application/json'},
+                                             timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                status, error = None, str(e)
+                if not self._failed_before_sending(e):
+                    # 立即重试可能重复推送，保留在发件箱中，由下次运行决定是否重新投递
+                    error = f"投递结果未知（服务器可能已收到消息）: {e}"
+                    self.logger.warning(f"webhook{error}，不再立即重试")
+                    break
+                self.logger.warning(f"webhook连接失败（第{attempts}次）: {e}")
+                if attempts <= self.max_retries:
+                    self._sleep_backoff(attempts)
+                continue
 
-        embed = {
-            "title": "🤖 AI项目日报",
-            "description": f"{datetime.now().strftime('%Y年%m月%d日')} {timeframe_titles.get(trend_timeframe, timeframe_titles['lifetime'])}",
-            "color": 5814783,  # 蓝色
-            "fields": [],
-            "timestamp": datetime.now().isoformat()
+            status = response.status_code
+            retry_after = self._update(url, response)
+            if response.ok:
+                return DeliveryResult(url, True, status, attempts, time.perf_counter() - start)
+
+            error = f"HTTP {status}: {response.text[:200]}"
+            if status == 429:
+                if retry_after > self.max_wait:
+                    error = f"webhook限流，需要等待 {retry_after:.0f} 秒"
+                    break
+                # 等待由下一次_acquire完成
+                self.logger.warning(f"webhook返回429，{retry_after:.1f} 秒后重试")
+                continue
+            if status >= 500:
+                self.logger.warning(f"webhook返回{status}（第{attempts}次）")
+                if attempts <= self.max_retries:
+                    self._sleep_backoff(attempts)
+                continue
+            # 其他4xx错误重试也不会成功
+            break
+
+        return DeliveryResult(url, False, status, attempts, time.perf_counter() - start, error)
+
+
+class NotificationOutbox:
+    """
+    基于SQLite的通知发件箱
+    渲染好的消息在发送前按目标逐条入队，目标确认送达后才删除；
+    未送达的消息保留到下次运行（或--flush-outbox）时重新投递，超过max_age_days的消息不再投递
+    """
+
+    def __init__(self, db_path: str, max_age_days: int = 7):
+        self.db_path = db_path
+        self.max_age_days = max_age_days
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时才创建数据库文件"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, label TEXT NOT NULL, '
+                'payload TEXT NOT NULL, created_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, '
+                'last_error TEXT)'
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _exists(self) -> bool:
+        """数据库尚未创建时说明没有待投递的消息，读操作无需创建文件"""
+        return self._conn is not None or os.path.exists(self.db_path)
+
+    def enqueue(self, urls: List[str], payload: Dict, label: str) -> List[int]:
+        """为每个目标写入一条待投递记录，返回记录id（顺序与urls一致）"""
+        body = json.dumps(payload, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            ids = [conn.execute('INSERT INTO outbox (url, label, payload, created_at) VALUES (?, ?, ?, ?)',
+                                (url, label, body, now)).lastrowid for url in urls]
+            conn.commit()
+        return ids
+
+    def ack(self, ids: Iterable[int]):
+        """目标确认送达后删除记录"""
+        ids = list(ids)
+        if not ids:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany('DELETE FROM outbox WHERE id = ?', [(message_id,) for message_id in ids])
+            conn.commit()
+
+    def record_failure(self, message_id: int, error: Optional[str]):
+        """记录一次投递失败，消息保留在队列中"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute('UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?', (error, message_id))
+            conn.commit()
+
+    def settle(self, ids: List[int], results: List[DeliveryResult]):
+        """送达的目标从发件箱删除，失败的目标记录错误后保留"""
+        self.ack(message_id for message_id, result in zip(ids, results) if result.ok)
+        for message_id, result in zip(ids, results):
+            if not result.ok:
+                self.record_failure(message_id, result.error)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """删除超过保留期限的消息（日报过期后再推送已无意义），返回删除数量"""
+        if not self._exists():
+            return 0
+        cutoff = (now if now is not None else time.time()) - self.max_age_days * 86400
+        with self._lock:
+            conn = self._connect()
+            removed = conn.execute('DELETE FROM outbox WHERE created_at < ?', (cutoff,)).rowcount
+            conn.commit()
+        if removed:
+            self.logger.warning(f"发件箱中 {removed} 条消息超过 {self.max_age_days} 天未送达，已丢弃")
+        return removed
+
+    def pending(self) -> List[Tuple[int, str, str, Dict]]:
+        """按入队顺序返回待投递的消息：(id, url, label, payload)"""
+        if not self._exists():
+            return []
+        with self._lock:
+            rows = self._connect().execute('SELECT id, url, label, payload FROM outbox ORDER BY id').fetchall()
+        return [(message_id, url, label, json.loads(payload)) for message_id, url, label, payload in rows]
+
+    def count(self) -> int:
+        if not self._exists():
+            return 0
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class DiscordDigest:
+    """
+    Discord消息汇总
+    收集一次运行中各模式的embed，按Discord限制（每条消息最多10个embed、总字符数6000、字段值1024字符、
+    描述4096字符、标题和字段名256字符）按顺序装入尽量少的webhook消息；
+    超长的字段值在项目边界处拆到续字段，超长的描述和标题截断，超长的embed拆成多个续篇
+    """
+
+    MAX_EMBEDS = 10
+    MAX_MESSAGE_CHARS = 6000
+    MAX_FIELDS = 25
+    MAX_FIELD_CHARS = 1024
+    MAX_FIELD_NAME_CHARS = 256
+    MAX_TITLE_CHARS = 256
+    MAX_DESCRIPTION_CHARS = 4096
+    PROJECT_SEPARATOR = '\n\n'
+
+    def __init__(self, embeds: Optional[Iterable[Dict]] = None):
+        self.embeds: List[Dict] = []
+        for embed in embeds or []:
+            self.add(embed)
+
+    def __len__(self) -> int:
+        return len(self.embeds)
+
+    def add(self, embed: Dict):
+        """加入一个embed，先使各部分符合长度限制，超出单条消息限制时再拆分"""
+        self.embeds.extend(self._split_embed(self._fit_limits(embed)))
+
+    @staticmethod
+    def _truncate(text: str, limit: int) -> str:
+        return text if len(text) <= limit else text[:limit - 3] + '...'
+
+    @classmethod
+    def _fit_limits(cls, embed: Dict) -> Dict:
+        """截断超长的标题和描述，超长的字段值按项目边界拆成续字段（不修改传入的embed）"""
+        embed = dict(embed)
+        if 'title' in embed:
+            embed['title'] = cls._truncate(embed['title'], cls.MAX_TITLE_CHARS)
+        if 'description' in embed:
+            embed['description'] = cls._truncate(embed['description'], cls.MAX_DESCRIPTION_CHARS)
+        if 'fields' in embed:
+            fields = []
+            for field in embed['fields']:
+                field = dict(field, name=cls._truncate(field['name'], cls.MAX_FIELD_NAME_CHARS))
+                if len(field['value']) <= cls.MAX_FIELD_CHARS:
+                    fields.append(field)
+                    continue
+                for part in cls.pack_fields(field['name'], field['value'].split(cls.PROJECT_SEPARATOR)):
+                    fields.append(dict(field, name=part['name'], value=part['value']))
+            embed['fields'] = fields
+        return embed
+
+    @staticmethod
+    def embed_length(embed: Dict) -> int:
+        """按Discord的规则统计embed计入总字符数限制的长度"""
+        length = len(embed.get('title', '')) + len(embed.get('description', ''))
+        length += len(embed.get('footer', {}).get('text', '')) + len(embed.get('author', {}).get('name', ''))
+        return length + sum(len(field['name']) + len(field['value']) for field in embed.get('fields', []))
+
+    @classmethod
+    def pack_fields(cls, name: str, blocks: List[str]) -> List[Dict]:
+        """把项目文本块装入字段，超过字段长度限制时在项目边界处拆到续字段"""
+        fields = []
+        current: List[str] = []
+        continued_name = f"{cls._truncate(name, cls.MAX_FIELD_NAME_CHARS - 3)}（续）"
+        name = cls._truncate(name, cls.MAX_FIELD_NAME_CHARS)
+
+        def flush():
+            if current:
+                fields.append({"name": continued_name if fields else name,
+                               "value": cls.PROJECT_SEPARATOR.join(current), "inline": False})
+
+        for block in blocks:
+            block = cls._truncate(block, cls.MAX_FIELD_CHARS)
+            if current and len(cls.PROJECT_SEPARATOR.join(current + [block])) > cls.MAX_FIELD_CHARS:
+                flush()
+                current = []
+            current.append(block)
+        flush()
+        return fields
+
+    def _split_embed(self, embed: Dict) -> List[Dict]:
+        """字段过多或总长度超过单条消息限制时，把字段分到多个同标题的续篇embed中"""
+        if len(embed.get('fields', [])) <= self.MAX_FIELDS and self.embed_length(embed) <= self.MAX_MESSAGE_CHARS:
+            return [embed]
+
+        parts = [dict(embed, fields=[])]
+        for field in embed['fields']:
+            part = parts[-1]
+            field_length = len(field['name']) + len(field['value'])
+            if part['fields'] and (len(part['fields']) >= self.MAX_FIELDS or
+                                   self.embed_length(part) + field_length > self.MAX_MESSAGE_CHARS):
+                part = {key: value for key, value in embed.items() if key in ('title', 'color', 'timestamp')}
+                part['title'] = f"{self._truncate(embed.get('title', ''), self.MAX_TITLE_CHARS - 3)}（续）"
+                part['fields'] = []
+                parts.append(part)
+            part['fields'].append(field)
+        return parts
+
+    def payloads(self) -> List[Dict]:
+        """
+        按加入顺序依次装入消息，当前消息放不下时才开始下一条，
+        各模式/时间框架的报告在频道中按原顺序出现
+        """
+        messages: List[List[Dict]] = []
+        total = 0
+        for embed in self.embeds:
+            length = self.embed_length(embed)
+            if not messages or len(messages[-1]) >= self.MAX_EMBEDS or total + length > self.MAX_MESSAGE_CHARS:
+                messages.append([])
+                total = 0
+            messages[-1].append(embed)
+            total += length
+        return [{"embeds": embeds} for embeds in messages]
+
+
+class ProjectEntry(NamedTuple):
+    """中间模型中的单个项目，各渠道基于它渲染"""
+    rank: int
+    name: str
+    full_name: str
+    url: str
+    stars: int
+    forks: int
+    language: str
+    summary: str
+
+
+class ReportSection(NamedTuple):
+    """报告中的一个段落：项目列表或说明文字"""
+    title: str
+    projects: List[ProjectEntry]
+    text: Optional[str] = None
+
+
+class Report(NamedTuple):
+    """与渠道无关的推送报告，选中的项目只渲染一次，由各渠道转换为自己的格式"""
+    mode: str
+    timeframe: str
+    title: str
+    description: str
+    color: int
+    sections: List[ReportSection]
+    created_at: datetime
+
+    def to_dict(self) -> Dict:
+        return {
+            'mode': self.mode,
+            'timeframe': self.timeframe,
+            'title': self.title,
+            'description': self.description,
+            'created_at': self.created_at.isoformat(),
+            'sections': [{'title': section.title, 'text': section.text,
+                          'projects': [entry._asdict() for entry in section.projects]}
+                         for section in self.sections],
         }
 
-        # 添加热门项目
-        if popular_projects:
-            popular_text = "\n\n".join([
-                self.format_project_info(repo, i+1)
-                for i, repo in enumerate(popular_projects[:2])
-            ])
-            embed["fields"].append({
-                "name": "⭐ 收藏最多的AI项目",
-                "value": popular_text,
-                "inline": False
-            })
 
-        # 添加趋势项目
-        if trending_projects:
-            trending_text = "\n\n".join([
-                self.format_project_info(repo, i+1)
-                for i, repo in enumerate(trending_projects[:2])
-            ])
-            embed["fields"].append({
-                "name": trending_field_names.get(trend_timeframe, trending_field_names['lifetime']),
-                "value": trending_text,
-                "inline": False
-            })
+class ReportBuilder:
+    """把选中的项目渲染为中间模型，普通AI和商用AI两种模式只在文案和配色上不同"""
+
+    STYLES = {
+        'ai': {
+            'title': '🤖 AI项目日报',
+            'color': 5814783,  # 蓝色
+            'timeframe_titles': {
+                'lifetime': '最值得关注的AI开源项目',
+                '30days': '最近30天上升最快的AI项目',
+                '7days': '最近7天上升最快的AI项目'
+            },
+            'popular_title': '⭐ 收藏最多的AI项目',
+            'trending_titles': {
+                'lifetime': '📈 趋势上升最快的AI项目',
+                '30days': '📈 最近30天上升最快的AI项目',
+                '7days': '🚀 最近7天上升最快的AI项目'
+            },
+            'note': None,
+        },
+        'commercial': {
+            'title': '💼 商用实用性AI项目日报',
+            'color': 3447003,  # 深蓝色，更商务感
+            'timeframe_titles': {
+                'lifetime': '最具商用价值的AI开源项目',
+                '30days': '最近30天商用热门的AI项目',
+                '7days': '最近7天商用爆火的AI项目'
+            },
+            'popular_title': '🏆 收藏最多的商用AI项目',
+            'trending_titles': {
+                'lifetime': '💼 商用趋势上升最快的AI项目',
+                '30days': '💼 最近30天商用热门的AI项目',
+                '7days': '🚀 最近7天商用爆火的AI项目'
+            },
+            'note': ('💡 商用价值说明',
+                     "这些项目具有以下特点：\n• 🛠️ 即开即用的实用工具\n• 💰 明确的商业应用场景\n"
+                     "• 🔧 完善的部署和集成方案\n• 📈 活跃的社区和维护团队"),
+        },
+    }
+
+    def __init__(self, summarizer: Optional['ProjectSummarizer'] = None):
+        self.summarizer = summarizer or ProjectSummarizer()
 
-        return {"embeds": [embed]}
+    def project_entry(self, repo: Dict, rank: int) -> ProjectEntry:
+        """提取项目的展示信息并生成智能总结"""
+        return ProjectEntry(
+            rank=rank,
+            name=repo['name'],
+            full_name=repo.get('full_name') or repo['name'],
+            url=repo['html_url'],
+            stars=repo['stargazers_count'],
+            forks=repo['forks_count'],
+            language=repo.get('language', 'Unknown'),
+            summary=self.summarizer.generate_summary(repo),
+        )
 
-    def send_notification(self, popular_projects: List[Dict], trending_projects: List[Dict], trend_timeframe: str = 'lifetime') -> bool:
-        """发送Discord通知"""
-        if not self.webhook_url:
-            self.logger.error("Discord Webhook URL未配置")
-            return False
+    def build(self, mode: str, popular_projects: List[Dict], trending_projects: List[Dict],
+              trend_timeframe: str = 'lifetime') -> Report:
+        """每类最多展示2个项目"""
+        style = self.STYLES[mode]
+        now = datetime.now()
+        sections = []
+        if popular_projects:
+            sections.append(ReportSection(style['popular_title'], [
+                self.project_entry(repo, i + 1) for i, repo in enumerate(popular_projects[:2])
+            ]))
+        if trending_projects:
+            trending_title = style['trending_titles'].get(trend_timeframe, style['trending_titles']['lifetime'])
+            sections.append(ReportSection(trending_title, [
+                self.project_entry(repo, i + 1) for i, repo in enumerate(trending_projects[:2])
+            ]))
+        if style['note']:
+            sections.append(ReportSection(style['note'][0], [], style['note'][1]))
+
+        description = style['timeframe_titles'].get(trend_timeframe, style['timeframe_titles']['lifetime'])
+        return Report(mode, trend_timeframe, style['title'], f"{now.strftime('%Y年%m月%d日')} {description}",
+                      style['color'], sections, now)
+
+
+def render_markdown(reports: List[Report]) -> str:
+    """把报告渲染为Markdown文本（文件和邮件使用）"""
+    lines = []
+    for report in reports:
+        lines.append(f"# {report.title}")
+        lines.append('')
+        lines.append(report.description)
+        for section in report.sections:
+            lines.append('')
+            lines.append(f"## {section.title}")
+            lines.append('')
+            if section.text:
+                lines.append(section.text)
+            for entry in section.projects:
+                lines.append(f"{entry.rank}. **[{entry.full_name}]({entry.url})** - "
+                             f"⭐{entry.stars:,} 🍴{entry.forks:,} 📝{entry.language}")
+                lines.append(f"   💡 {entry.summary}")
+        lines.append('')
+    return '\n'.join(lines)
+
+
+class NotificationSink:
+    """通知渠道接口：把中间模型渲染为渠道自己的格式并发送，全部送达才返回True"""
+
+    name = '通知'
+
+    def send(self, reports: List[Report], label: str) -> bool:
+        raise NotImplementedError
+
+
+class WebhookSink(NotificationSink):
+    """
+    通过HTTP POST JSON投递的渠道
+    共享投递客户端（连接池、限额桶、重试）和发件箱，同一条消息并发投递到全部目标
+    """
+
+    def __init__(self, urls: List[str], delivery: Optional[WebhookDeliveryClient] = None,
+                 outbox: Optional[NotificationOutbox] = None):
+        self.urls = list(dict.fromkeys(url for url in urls if url))
+        self.delivery = delivery or WebhookDeliveryClient()
+        self.outbox = outbox
+        # 最近一次发送在各目标上的投递结果
+        self.last_results: List[DeliveryResult] = []
+        self.logger = logging.getLogger(__name__)
 
-        payload = self.create_discord_embed(popular_projects, trending_projects, trend_timeframe)
+    def render(self, reports: List[Report]) -> List[Dict]:
+        """把报告渲染为一条或多条消息"""
+        raise NotImplementedError
+
+    def send(self, reports: List[Report], label: str) -> bool:
+        payloads = self.render(reports)
+        if len(payloads) > 1:
+            self.logger.info(f"{label}：{len(reports)} 份报告合并为 {len(payloads)} 条消息")
+        results = []
+        success = True
+        for index, payload in enumerate(payloads, 1):
+            part_label = f"{label}（{index}/{len(payloads)}）" if len(payloads) > 1 else label
+            success = self._deliver(payload, part_label) and success
+            results.extend(self.last_results)
+        self.last_results = results
+        return success
+
+    def _deliver(self, payload: Dict, label: str) -> bool:
+        """并发投递到全部目标，全部成功才返回True，部分失败记录在last_results中"""
+        # 先写入发件箱，即使投递过程中进程退出消息也不会丢失
+        outbox_ids = self.outbox.enqueue(self.urls, payload, label) if self.outbox else []
+        self.last_results = self.delivery.deliver_all(self.urls, payload)
+        if self.outbox:
+            self.outbox.settle(outbox_ids, self.last_results)
+
+        succeeded = 0
+        for index, result in enumerate(self.last_results, 1):
+            if result.ok:
+                succeeded += 1
+                self.logger.info(f"{label}发送成功（目标{index}，{result.attempts}次尝试，耗时{result.latency:.2f}秒）")
+            else:
+                self.logger.error(f"{label}发送失败（目标{index}）: {result.error}")
+        if len(self.last_results) > 1:
+            self.logger.info(f"{label}已送达 {succeeded}/{len(self.last_results)} 个目标")
+        return succeeded == len(self.last_results)
 
-        try:
-            response = requests.post(self.webhook_url, json=payload)
-            response.raise_for_status()
-            self.logger.info("Discord消息发送成功")
-            return True
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Discord消息发送失败: {e}")
-            return False
 
-    def create_commercial_discord_embed(self, popular_projects: List[Dict], trending_projects: List[Dict], trend_timeframe: str = 'lifetime') -> Dict:
-        """创建商用实用性AI项目的Discord Embed消息"""
-        # 根据时间框架生成标题和描述
-        timeframe_titles = {
-            'lifetime': '最具商用价值的AI开源项目',
-            '30days': '最近30天商用热门的AI项目',
-            '7days': '最近7天商用爆火的AI项目'
-        }
+class DiscordSink(WebhookSink):
+    """Discord webhook：每份报告一个embed，通过汇总装箱合并为尽量少的消息"""
 
-        trending_field_names = {
-            'lifetime': '💼 商用趋势上升最快的AI项目',
-            '30days': '💼 最近30天商用热门的AI项目',
-            '7days': '🚀 最近7天商用爆火的AI项目'
-        }
+    name = 'Discord'
+
+    @staticmethod
+    def format_entry(entry: ProjectEntry) -> str:
+        # 限制总结长度，确保Discord消息不会太长
+        summary = entry.summary if len(entry.summary) <= 120 else entry.summary[:120] + '...'
+        return (f"{entry.rank}. **{entry.name}** - ⭐{entry.stars:,} 🍴{entry.forks:,} 📝{entry.language}\n"
+                f"   💡 {summary}\n   [🔗 查看项目]({entry.url})")
 
+    @classmethod
+    def render_embed(cls, report: Report) -> Dict:
         embed = {
-            "title": "💼 商用实用性AI项目日报",
-            "description": f"{datetime.now().strftime('%Y年%m月%d日')} {timeframe_titles.get(trend_timeframe, timeframe_titles['lifetime'])}",
-            "color": 3447003,  # 深蓝色，更商务感
+            "title": report.title,
+            "description": report.description,
+            "color": report.color,
             "fields": [],
-            "timestamp": datetime.now().isoformat()
+            "timestamp": report.created_at.isoformat()
         }
+        for section in report.sections:
+            if section.text:
+                embed["fields"].append({"name": section.title, "value": section.text, "inline": False})
+            if section.projects:
+                embed["fields"].extend(DiscordDigest.pack_fields(
+                    section.title, [cls.format_entry(entry) for entry in section.projects]))
+        return embed
+
+    def render(self, reports: List[Report]) -> List[Dict]:
+        return DiscordDigest(self.render_embed(report) for report in reports).payloads()
+
+
+class SlackSink(WebhookSink):
+    """Slack incoming webhook：使用Block Kit，每条消息最多50个block"""
+
+    name = 'Slack'
+    MAX_BLOCKS = 50
+    MAX_TEXT_CHARS = 3000
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+    @classmethod
+    def render_blocks(cls, report: Report) -> List[Dict]:
+        blocks = [
+            {"type": "header", "text": {"type": "plain_text", "text": report.title[:150], "emoji": True}},
+            {"type": "context", "elements": [{"type": "mrkdwn", "text": cls._escape(report.description)}]},
+        ]
+        for section in report.sections:
+            text = f"*{cls._escape(section.title)}*"
+            if section.text:
+                text += '\n' + cls._escape(section.text)
+            blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": text[:cls.MAX_TEXT_CHARS]}})
+            for entry in section.projects:
+                summary = entry.summary if len(entry.summary) <= 120 else entry.summary[:120] + '...'
+                text = (f"{entry.rank}. *<{entry.url}|{cls._escape(entry.name)}>* - "
+                        f"⭐{entry.stars:,} 🍴{entry.forks:,} 📝{cls._escape(str(entry.language))}\n"
+                        f"💡 {cls._escape(summary)}")
+                blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": text[:cls.MAX_TEXT_CHARS]}})
+        return blocks
+
+    def render(self, reports: List[Report]) -> List[Dict]:
+        """按报告顺序装入消息，单份报告不跨消息拆分（除非它本身超过block上限）"""
+        messages: List[Tuple[List[Dict], List[str]]] = []
+        for report in reports:
+            blocks = self.render_blocks(report)
+            if messages and len(messages[-1][0]) + 1 + len(blocks) <= self.MAX_BLOCKS:
+                messages[-1][0].extend([{"type": "divider"}] + blocks)
+                messages[-1][1].append(report.title)
+                continue
+            for start in range(0, len(blocks), self.MAX_BLOCKS):
+                messages.append((blocks[start:start + self.MAX_BLOCKS], [report.title]))
+        # text作为通知预览和不支持block时的后备内容
+        return [{"text": ' | '.join(titles), "blocks": blocks} for blocks, titles in messages]
+
+
+class JSONWebhookSink(WebhookSink):
+    """通用JSON webhook：一次请求投递全部报告的结构化数据，便于接入自建服务"""
+
+    name = 'Webhook'
+
+    def render(self, reports: List[Report]) -> List[Dict]:
+        return [{
+            'source': 'ai-github-tracker',
+            'generated_at': datetime.now().isoformat(),
+            'reports': [report.to_dict() for report in reports],
+        }]
+
+
+class EmailSink(NotificationSink):
+    """SMTP邮件：正文为Markdown文本，security可选starttls、ssl或none"""
+
+    name = '邮件'
+
+    def __init__(self, host: str, recipients: List[str], port: int = 587, sender: Optional[str] = None,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 security: str = 'starttls', timeout: float = 30.0):
+        if security not in ('starttls', 'ssl', 'none'):
+            raise ValueError(f"不支持的SMTP加密方式: {security}")
+        self.host = host
+        self.port = port
+        self.recipients = recipients
+        self.sender = sender or username or 'ai-github-tracker@localhost'
+        self.username = username
+        self.password = password
+        self.security = security
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
 
-        # 添加热门商用项目
-        if popular_projects:
-            popular_text = "\n\n".join([
-                self.format_project_info(repo, i+1)
-                for i, repo in enumerate(popular_projects[:2])
-            ])
-            embed["fields"].append({
-                "name": "🏆 收藏最多的商用AI项目",
-                "value": popular_text,
-                "inline": False
-            })
+    def render(self, reports: List[Report]) -> EmailMessage:
+        message = EmailMessage()
+        titles = list(dict.fromkeys(report.title for report in reports))
+        message['Subject'] = f"{' / '.join(titles)} {datetime.now().strftime('%Y-%m-%d')}"
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message['Date'] = formatdate(localtime=True)
+        message.set_content(render_markdown(reports))
+        return message
+
+    def send(self, reports: List[Report], label: str) -> bool:
+        smtp_class = smtplib.SMTP_SSL if self.security == 'ssl' else smtplib.SMTP
+        try:
+            with smtp_class(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.security == 'starttls':
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password or '')
+                smtp.send_message(self.render(reports))
+        except (smtplib.SMTPException, OSError) as e:
+            self.logger.error(f"{label}发送失败: {e}")
+            return False
+        self.logger.info(f"{label}发送成功（{len(self.recipients)} 个收件人）")
+        return True
 
-        # 添加商用趋势项目
-        if trending_projects:
-            trending_text = "\n\n".join([
-                self.format_project_info(repo, i+1)
-                for i, repo in enumerate(trending_projects[:2])
-            ])
-            embed["fields"].append({
-                "name": trending_field_names.get(trend_timeframe, trending_field_names['lifetime']),
-                "value": trending_text,
-                "inline": False
-            })
 
-        # 添加商用价值说明
-        embed["fields"].append({
-            "name": "💡 商用价值说明",
-            "value": "这些项目具有以下特点：\n• 🛠️ 即开即用的实用工具\n• 💰 明确的商业应用场景\n• 🔧 完善的部署和集成方案\n• 📈 活跃的社区和维护团队",
-            "inline": False
-        })
+class FileSink(NotificationSink):
+    """
+    写入本地文件：每天一个文件，markdown格式追加内容，json格式保存报告列表
+    适合把推送内容随仓库一起归档
+    """
 
-        return {"embeds": [embed]}
+    name = '文件'
+    FORMATS = ('markdown', 'json')
 
-    def send_commercial_notification(self, popular_projects: List[Dict], trending_projects: List[Dict], trend_timeframe: str = 'lifetime') -> bool:
-        """发送商用实用性AI项目Discord通知"""
-        if not self.webhook_url:
-            self.logger.error("Discord Webhook URL未配置")
-            return False
+    def __init__(self, directory: str = 'reports', formats: Iterable[str] = ('markdown',)):
+        self.directory = directory
+        self.formats = list(formats)
+        for fmt in self.formats:
+            if fmt not in self.FORMATS:
+                raise ValueError(f"不支持的报告文件格式: {fmt}")
+        self.logger = logging.getLogger(__name__)
+
+    def path(self, fmt: str, day: Optional[date] = None) -> str:
+        day = day or date.today()
+        return os.path.join(self.directory, f"{day.strftime('%Y-%m-%d')}.{'md' if fmt == 'markdown' else 'json'}")
+
+    def send(self, reports: List[Report], label: str) -> bool:
+        os.makedirs(self.directory, exist_ok=True)
+        for fmt in self.formats:
+            path = self.path(fmt)
+            if fmt == 'markdown':
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(render_markdown(reports) + '\n')
+            else:
+                existing = []
+                if os.path.exists(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        existing = json.load(f)
+                # 先写临时文件再原子替换，避免中途失败留下损坏的文件
+                tmp_path = f'{path}.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(existing + [report.to_dict() for report in reports], f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, path)
+            self.logger.info(f"{label}已写入 {path}")
+        return True
 
-        payload = self.create_commercial_discord_embed(popular_projects, trending_projects, trend_timeframe)
 
+class DiscordNotifier:
+    """
+    消息推送器
+    Discord支持多个webhook目标：DISCORD_WEBHOOK_URL、DISCORD_WEBHOOK_URLS（逗号或空白分隔）
+    以及DISCORD_WEBHOOKS_FILE指向的配置文件（JSON数组、{"webhooks": [...]}或每行一个地址）；
+    其他渠道（Slack、通用JSON webhook、邮件、本地文件）通过环境变量启用，见load_sinks。
+    选中的项目只渲染一次中间模型，各渠道并发发送；webhook渠道配置了发件箱时，
+    消息先入队再发送，未送达的目标留待下次重新投递
+    """
+
+    def __init__(self, webhook_url: Optional[str] = None, summarizer: Optional['ProjectSummarizer'] = None,
+                 delivery: Optional[WebhookDeliveryClient] = None, webhook_urls: Optional[List[str]] = None,
+                 outbox: Optional[NotificationOutbox] = None, sinks: Optional[List[NotificationSink]] = None):
+        if webhook_urls is None:
+            webhook_urls = [webhook_url] if webhook_url else self.load_webhook_urls()
+        self.webhook_urls = list(dict.fromkeys(url for url in webhook_urls if url))
+        self.webhook_url = self.webhook_urls[0] if self.webhook_urls else None
+        self.summarizer = summarizer or ProjectSummarizer()
+        self.report_builder = ReportBuilder(self.summarizer)
+        self.delivery = delivery or WebhookDeliveryClient()
+        self.outbox = outbox
+        self.logger = logging.getLogger(__name__)
+        # Discord之外的渠道，未指定时从环境变量读取
+        extra_sinks = self.load_sinks() if sinks is None else list(sinks)
+        self.sinks: List[NotificationSink] = (
+            [DiscordSink(self.webhook_urls, self.delivery, outbox)] if self.webhook_urls else []) + extra_sinks
+        # 最近一次发送在各webhook目标上的投递结果
+        self.last_results: List[DeliveryResult] = []
+
+    @staticmethod
+    def load_webhook_urls(config_file: Optional[str] = None) -> List[str]:
+        """从环境变量和配置文件读取webhook目标列表"""
+        urls = []
+        if os.getenv('DISCORD_WEBHOOK_URL'):
+            urls.append(os.getenv('DISCORD_WEBHOOK_URL').strip())
+        urls.extend(os.getenv('DISCORD_WEBHOOK_URLS', '').replace(',', ' ').split())
+
+        config_file = config_file or os.getenv('DISCORD_WEBHOOKS_FILE')
+        if config_file and os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                content = f.read()
+            try:
+                config = json.loads(content)
+            except json.JSONDecodeError:
+                config = [line.strip() for line in content.splitlines()
+                          if line.strip() and not line.strip().startswith('#')]
+            if isinstance(config, dict):
+                config = config.get('webhooks', [])
+            if isinstance(config, list):
+                urls.extend(str(url).strip() for url in config)
+        return list(dict.fromkeys(url for url in urls if url))
+
+    def load_sinks(self) -> List[NotificationSink]:
+        """
+        根据环境变量创建Discord之外的渠道：
+        SLACK_WEBHOOK_URLS、NOTIFY_WEBHOOK_URLS（逗号或空白分隔）；
+        SMTP_HOST、SMTP_PORT、SMTP_USER、SMTP_PASSWORD、SMTP_FROM、SMTP_TO、SMTP_SECURITY；
+        REPORT_DIR、REPORT_FORMATS（markdown,json）
+        某个渠道的配置有误时记录警告并跳过该渠道，不影响其他渠道
+        """
+        sinks: List[NotificationSink] = []
+        slack_urls = os.getenv('SLACK_WEBHOOK_URLS', '').replace(',', ' ').split()
+        if slack_urls:
+            sinks.append(SlackSink(slack_urls, self.delivery, self.outbox))
+        json_urls = os.getenv('NOTIFY_WEBHOOK_URLS', '').replace(',', ' ').split()
+        if json_urls:
+            sinks.append(JSONWebhookSink(json_urls, self.delivery, self.outbox))
+
+        recipients = os.getenv('SMTP_TO', '').replace(',', ' ').split()
+        if os.getenv('SMTP_HOST') and recipients:
+            try:
+                sinks.append(EmailSink(os.getenv('SMTP_HOST'), recipients, port=int(os.getenv('SMTP_PORT', '587')),
+                                       sender=os.getenv('SMTP_FROM'), username=os.getenv('SMTP_USER'),
+                                       password=os.getenv('SMTP_PASSWORD'),
+                                       security=os.getenv('SMTP_SECURITY', 'starttls')))
+            except ValueError as e:
+                self.logger.warning(f"邮件渠道配置无效，已跳过: {e}")
+
+        if os.getenv('REPORT_DIR'):
+            formats = os.getenv('REPORT_FORMATS', 'markdown').replace(',', ' ').split()
+            try:
+                sinks.append(FileSink(os.getenv('REPORT_DIR'), formats))
+            except ValueError as e:
+                self.logger.warning(f"文件渠道配置无效，已跳过: {e}")
+        return sinks
+
+    def build_report(self, mode: str, popular_projects: List[Dict], trending_projects: List[Dict],
+                     trend_timeframe: str = 'lifetime') -> Report:
+        """把选中的项目渲染为中间模型，mode: 'ai', 'commercial'"""
+        return self.report_builder.build(mode, popular_projects, trending_projects, trend_timeframe)
+
+    def _send_to_sink(self, sink: NotificationSink, reports: List[Report], label_prefix: str) -> bool:
+        label = f"{label_prefix}{sink.name}消息"
         try:
-            response = requests.post(self.webhook_url, json=payload)
-            response.raise_for_status()
-            self.logger.info("商用项目Discord消息发送成功")
-            return True
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"商用项目Discord消息发送失败: {e}")
+            return sink.send(reports, label)
+        except Exception as e:
+            # 单个渠道出错不影响其他渠道
+            self.logger.error(f"{label}发送出错: {e}")
+            return False
+
+    def send_reports(self, reports: List[Report], label_prefix: str = '') -> bool:
+        """并发发送到全部渠道，全部成功才返回True"""
+        if not self.sinks:
+            self.logger.error("未配置任何通知渠道（Discord Webhook URL未配置）")
+            self.last_results = []
             return False
 
+        if len(self.sinks) == 1:
+            outcomes = [self._send_to_sink(self.sinks[0], reports, label_prefix)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(self.sinks)) as executor:
+                outcomes = list(executor.map(lambda sink: self._send_to_sink(sink, reports, label_prefix), self.sinks))
+
+        self.last_results = [result for sink in self.sinks if isinstance(sink, WebhookSink)
+                             for result in sink.last_results]
+        return all(outcomes)
+
+    def flush_outbox(self) -> Tuple[int, int]:
+        """重新投递发件箱中未送达的消息，返回(本次送达数, 仍待投递数)"""
+        if not self.outbox:
+            return 0, 0
+        self.outbox.expire()
+        pending = self.outbox.pending()
+        if not pending:
+            return 0, 0
+
+        self.logger.info(f"发件箱中有 {len(pending)} 条未送达的消息，开始重新投递")
+        # 同一条消息的多个目标合并为一次并发投递
+        groups: Dict[str, Tuple[str, Dict, List[Tuple[int, str]]]] = {}
+        for message_id, url, label, payload in pending:
+            key = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+            groups.setdefault(key, (label, payload, []))[2].append((message_id, url))
+
+        delivered = 0
+        for label, payload, targets in groups.values():
+            results = self.delivery.deliver_all([url for _, url in targets], payload)
+            self.outbox.settle([message_id for message_id, _ in targets], results)
+            delivered += sum(result.ok for result in results)
+            for result in results:
+                if not result.ok:
+                    self.logger.warning(f"{label}重新投递失败: {result.error}")
+
+        remaining = len(pending) - delivered
+        self.logger.info(f"发件箱重新投递完成：送达 {delivered} 条，仍待投递 {remaining} 条")
+        return delivered, remaining
+
+    def format_project_info(self, repo: Dict, rank: int) -> str:
+        """格式化项目信息（包含智能总结）"""
+        return DiscordSink.format_entry(self.report_builder.project_entry(repo, rank))
+
+    def create_discord_embed(self, popular_projects: List[Dict], trending_projects: List[Dict],
+                             trend_timeframe: str = 'lifetime') -> Dict:
+        """创建Discord Embed消息"""
+        report = self.build_report('ai', popular_projects, trending_projects, trend_timeframe)
+        return {"embeds": [DiscordSink.render_embed(report)]}
+
+    def send_notification(self, popular_projects: List[Dict], trending_projects: List[Dict],
+                          trend_timeframe: str = 'lifetime') -> bool:
+        """发送AI项目通知"""
+        return self.send_reports([self.build_report('ai', popular_projects, trending_projects, trend_timeframe)])
+
+    def create_commercial_discord_embed(self, popular_projects: List[Dict], trending_projects: List[Dict],
+                                        trend_timeframe: str = 'lifetime') -> Dict:
+        """创建商用实用性AI项目的Discord Embed消息"""
+        report = self.build_report('commercial', popular_projects, trending_projects, trend_timeframe)
+        return {"embeds": [DiscordSink.render_embed(report)]}
+
+    def send_commercial_notification(self, popular_projects: List[Dict], trending_projects: List[Dict],
+                                     trend_timeframe: str = 'lifetime') -> bool:
+        """发送商用实用性AI项目通知"""
+        report = self.build_report('commercial', popular_projects, trending_projects, trend_timeframe)
+        return self.send_reports([report], '商用项目')
+
 
 class AIGitHubTracker:
     """AI GitHub追踪器主控制器"""
 
-    def __init__(self):
+    # 去重分片策略：off 所有模式共用一份记录；shared 每个模式/时间框架一个分片并同时检查全局记录；
+    # independent 各分片完全独立，可并行运行，不同模式可能推送同一项目
+    DEDUP_SHARD_MODES = ('off', 'shared', 'independent')
+
+    # 每个搜索查询流式翻页，取够这么多未推送项目后停止
+    CANDIDATES_PER_QUERY = 25
+
+    def __init__(self, cache_ttl: int = 3600, use_cache: bool = True, dedup_backend: Optional[str] = None,
+                 never_resend: bool = False, dedup_shards: str = 'off'):
         self.setup_logging()
-        self.github_client = GitHubAPIClient()
+        self.github_client = GitHubAPIClient(cache_dir=None if use_cache else '', cache_ttl=cache_ttl)
         self.ai_filter = AIProjectFilter()
         self.commercial_filter = CommercialAIProjectFilter()
-        self.deduplicator = ProjectDeduplicator()
-        self.trend_analyzer = TrendAnalyzer()
+        self.deduplicator = ProjectDeduplicator(backend=dedup_backend, never_resend=never_resend)
+        if dedup_shards not in self.DEDUP_SHARD_MODES:
+            raise ValueError(f"不支持的去重分片策略: {dedup_shards}")
+        self.dedup_shards = dedup_shards
+        self._dedup_shards: Dict[str, ProjectDeduplicator] = {}
+        self.star_history = StarHistoryStore()
+        self.trend_analyzer = TrendAnalyzer(history=self.star_history)
         self.summarizer = ProjectSummarizer()
-        self.notifier = DiscordNotifier(summarizer=self.summarizer)
+        # 发件箱放在缓存目录下（禁用API缓存时仍使用默认目录），工作流会在多次运行之间保留该目录
+        outbox_dir = self.github_client.cache_dir or '.cache'
+        self.notifier = DiscordNotifier(summarizer=self.summarizer,
+                                        outbox=NotificationOutbox(os.path.join(outbox_dir, 'outbox.sqlite')))
         self.logger = logging.getLogger(__name__)
 
+    def _log_api_stats(self):
+        """记录GitHub API各资源类型的剩余配额和响应缓存命中情况"""
+        for resource, budget in self.github_client.get_rate_limit_budget().items():
+            if budget['remaining'] is not None:
+                reset_time = datetime.fromtimestamp(budget['reset']).strftime('%H:%M:%S')
+                self.logger.info(f"GitHub API {resource} 剩余配额: {budget['remaining']}/{budget['limit']}（{reset_time} 重置）")
+
+        if self.github_client.response_cache:
+            cache_stats = self.github_client.get_cache_stats()
+            self.logger.info(f"响应缓存统计: 命中 {cache_stats['hits']} 次，未命中 {cache_stats['misses']} 次")
+
     def setup_logging(self):
         """设置日志"""
         logging.basicConfig(
@@ -772,6 +3137,98 @@ class AIGitHubTracker:
             ]
         )
 
+    # 各推送模式的日志用语：(项目类别, 热门项目, 趋势项目)
+    MODE_LABELS = {
+        'ai': ('AI项目', '热门项目', '趋势项目'),
+        'commercial': ('商用实用性AI项目', '热门商用项目', '商用趋势项目'),
+    }
+
+    def flush_outbox(self) -> Tuple[int, int]:
+        """重新投递上次未送达的消息，发件箱出错不影响本次的项目选取"""
+        try:
+            return self.notifier.flush_outbox()
+        except sqlite3.Error as e:
+            self.logger.error(f"读取发件箱失败: {e}")
+            return 0, 0
+
+    def _take_unsent_candidates(self, projects: Iterable[Dict]) -> List[Dict]:
+        """从单个查询的流式分页结果中取出未推送的候选项目，取够后不再请求后续页面"""
+        return self.deduplicator.take_new_projects(projects, self.CANDIDATES_PER_QUERY)
+
+    def _fetch_candidates(self) -> Tuple[List[Dict], List[Dict]]:
+        """获取热门和趋势候选项目，已推送的项目不占用候选名额"""
+        self.logger.info("正在获取GitHub项目数据...")
+        popular_repos = self.github_client.get_popular_ai_projects(take=self._take_unsent_candidates)
+        trending_repos = self.github_client.get_trending_ai_projects(take=self._take_unsent_candidates)
+        self._log_api_stats()
+        # 记录本次看到的所有候选项目的star快照，供趋势分析计算真实增量
+        self.star_history.record_snapshot(popular_repos + trending_repos)
+        return popular_repos, trending_repos
+
+    def _deduplicator_for(self, mode: str, trend_timeframe: str) -> ProjectDeduplicator:
+        """按分片策略返回该模式/时间框架使用的去重器，分片首次使用时清理其旧记录"""
+        if self.dedup_shards == 'off':
+            return self.deduplicator
+        namespace = f'{mode}/{trend_timeframe}'
+        if namespace not in self._dedup_shards:
+            shard = self.deduplicator.shard(namespace, shared=self.dedup_shards == 'shared')
+            shard.clean_old_records()
+            self._dedup_shards[namespace] = shard
+        return self._dedup_shards[namespace]
+
+    def _push_mode(self, mode: str, popular_projects: List[Dict], trending_projects: List[Dict],
+                   trend_timeframe: str = 'lifetime', trend_table: Optional[TrendScoreTable] = None,
+                   reports: Optional[List[Report]] = None):
+        """
+        对已按模式过滤的候选项目去重、按趋势分数选取、推送并标记
+        mode: 'ai', 'commercial'
+        trend_table: 预先批量计算的趋势分数，未提供时现场计算
+        reports: 提供时只把渲染好的报告加入列表，由调用方合并发送
+        """
+        category, popular_label, trending_label = self.MODE_LABELS[mode]
+
+        # 去重过滤
+        deduplicator = self._deduplicator_for(mode, trend_timeframe)
+        new_popular_projects = deduplicator.filter_new_projects(popular_projects)
+        new_trending_projects = deduplicator.filter_new_projects(trending_projects)
+
+        # 认领要推送的项目并立即标记为已推送（未送达的消息保留在发件箱中，下次运行时重新投递），
+        # 认领在进程间锁内完成，并行运行的其他模式不会推送同一个项目（independent分片策略除外）
+        with deduplicator.batch():
+            selected_popular = deduplicator.claim_projects(new_popular_projects, 2)  # 前2个热门项目
+
+            # 趋势分数前2的项目：只取前k个候选，k留出刚认领的热门项目的余量，
+            # 被其他进程抢先认领导致不足2个时再加倍k，避免对全部候选排序
+            selected_trending = []
+            k = 2 + len(selected_popular)
+            while True:
+                ranked_trending = self.trend_analyzer.top_k(new_trending_projects, trend_timeframe, k, table=trend_table)
+                selected_trending += deduplicator.claim_projects(ranked_trending, 2 - len(selected_trending))
+                if len(selected_trending) >= 2 or k >= len(new_trending_projects):
+                    break
+                k *= 2
+
+        if not selected_popular and not selected_trending:
+            self.logger.info(f"没有发现新的{category}，今日不推送")
+            return
+
+        if reports is not None:
+            reports.append(self.notifier.build_report(mode, selected_popular, selected_trending, trend_timeframe))
+            self.logger.info(f"已将 {len(selected_popular)} 个{popular_label}和 {len(selected_trending)} 个{trending_label}加入汇总消息")
+            return
+
+        # 发送通知（商用模式使用专用格式）
+        if mode == 'commercial':
+            discord_success = self.notifier.send_commercial_notification(selected_popular, selected_trending, trend_timeframe)
+        else:
+            discord_success = self.notifier.send_notification(selected_popular, selected_trending, trend_timeframe)
+
+        if discord_success:
+            self.logger.info(f"✅ 成功推送 {len(selected_popular)} 个{popular_label}和 {len(selected_trending)} 个{trending_label}")
+        else:
+            self.logger.warning(f"⚠️ 通知消息未能全部送达，已记录 {len(selected_popular)} 个{popular_label}和 "
+                                f"{len(selected_trending)} 个{trending_label}，未送达的消息保留在发件箱中")
+
     def run_daily_tracking(self, trend_timeframe: str = 'lifetime'):
         """
         执行每日追踪任务
@@ -780,13 +3237,12 @@ class AIGitHubTracker:
         self.logger.info(f"开始执行AI GitHub项目每日追踪任务（趋势时间框架: {trend_timeframe}）")
 
         try:
-            # 1. 清理旧记录
+            # 1. 重新投递上次未送达的消息，清理旧记录
+            self.flush_outbox()
             self.deduplicator.clean_old_records()
 
             # 2. 获取项目数据
-            self.logger.info("正在获取GitHub项目数据...")
-            popular_repos = self.github_client.get_popular_ai_projects()
-            trending_repos = self.github_client.get_trending_ai_projects()
+            popular_repos, trending_repos = self._fetch_candidates()
 
             if not popular_repos and not trending_repos:
                 self.logger.error("未能获取到任何项目数据")
@@ -796,68 +3252,36 @@ class AIGitHubTracker:
             popular_ai_projects = self.ai_filter.filter_ai_projects(popular_repos)
             trending_ai_projects = self.ai_filter.filter_ai_projects(trending_repos)
 
-            # 4. 去重过滤
-            new_popular_projects = self.deduplicator.filter_new_projects(popular_ai_projects)
-            new_trending_projects = self.deduplicator.filter_new_projects(trending_ai_projects)
-
-            # 5. 趋势分析（使用指定的时间框架）
-            trending_sorted = self.trend_analyzer.sort_by_trend_score(new_trending_projects, trend_timeframe)
-
-            # 6. 选择要推送的项目
-            selected_popular = new_popular_projects[:2]  # 前2个热门项目
-            selected_trending = trending_sorted[:2]      # 前2个趋势项目
-
-            if not selected_popular and not selected_trending:
-                self.logger.info("没有发现新的AI项目，今日不推送")
-                return
-
-            # 7. 发送通知（传递时间框架信息）
-            discord_success = self.notifier.send_notification(selected_popular, selected_trending, trend_timeframe)
-
-            # 8. 标记项目为已推送（无论Discord是否成功）
-            for project in selected_popular + selected_trending:
-                self.deduplicator.mark_project_as_sent(project)
-
-            if discord_success:
-                self.logger.info(f"✅ 成功推送 {len(selected_popular)} 个热门项目和 {len(selected_trending)} 个趋势项目")
-            else:
-                self.logger.warning(f"⚠️ Discord消息发送失败，但已记录 {len(selected_popular)} 个热门项目和 {len(selected_trending)} 个趋势项目")
+            # 4. 去重、排序、推送并标记
+            self._push_mode('ai', popular_ai_projects, trending_ai_projects, trend_timeframe)
 
         except Exception as e:
             self.logger.error(f"执行追踪任务时发生错误: {e}")
             raise
 
     def run_multi_timeframe_tracking(self):
-        """执行多时间框架追踪，分别推送30天和7天趋势"""
+        """
+        执行多时间框架追踪，分别推送30天和7天趋势
+        与其他模式一样先认领再发送，未送达的消息由发件箱在下次运行时重新投递，不会重复选取
+        """
         timeframes = [
             ('30days', '📈 最近30天上升最快的AI项目'),
             ('7days', '🚀 最近7天上升最快的AI项目')
         ]
+        self.flush_outbox()
 
         for timeframe, description in timeframes:
             self.logger.info(f"执行{description}...")
             try:
                 # 获取数据
-                popular_repos = self.github_client.get_popular_ai_projects()
-                trending_repos = self.github_client.get_trending_ai_projects()
+                trending_repos = self.github_client.get_trending_ai_projects(take=self._take_unsent_candidates)
 
                 if not trending_repos:
                     continue
 
-                # 过滤和去重
+                # 过滤后去重、按指定时间框架排序、认领并推送（只推送趋势项目）
                 trending_ai_projects = self.ai_filter.filter_ai_projects(trending_repos)
-                new_trending_projects = self.deduplicator.filter_new_projects(trending_ai_projects)
-
-                # 按指定时间框架排序
-                trending_sorted = self.trend_analyzer.sort_by_trend_score(new_trending_projects, timeframe)
-                selected_trending = trending_sorted[:2]
-
-                if selected_trending:
-                    # 发送通知
-                    if self.notifier.send_notification([], selected_trending, timeframe):
-                        for project in selected_trending:
-                            self.deduplicator.mark_project_as_sent(project)
-                        self.logger.info(f"成功推送{timeframe}趋势项目")
+                self._push_mode('ai', [], trending_ai_projects, timeframe)
 
             except Exception as e:
                 self.logger.error(f"执行{timeframe}追踪时发生错误: {e}")
@@ -870,13 +3294,12 @@ class AIGitHubTracker:
         """
         self.logger.info(f"开始执行商用实用性AI项目追踪任务（趋势时间框架: {trend_timeframe}）")
         try:
-            # 1. 清理旧记录
+            # 1. 重新投递上次未送达的消息，清理旧记录
+            self.flush_outbox()
             self.deduplicator.clean_old_records()
 
             # 2. 获取项目数据
-            self.logger.info("正在获取GitHub项目数据...")
-            popular_repos = self.github_client.get_popular_ai_projects()
-            trending_repos = self.github_client.get_trending_ai_projects()
+            popular_repos, trending_repos = self._fetch_candidates()
 
             if not popular_repos and not trending_repos:
                 self.logger.error("未能获取到任何项目数据")
@@ -886,36 +3309,66 @@ class AIGitHubTracker:
             popular_commercial_projects = self.commercial_filter.filter_commercial_ai_projects(popular_repos)
             trending_commercial_projects = self.commercial_filter.filter_commercial_ai_projects(trending_repos)
 
-            # 4. 去重过滤
-            new_popular_projects = self.deduplicator.filter_new_projects(popular_commercial_projects)
-            new_trending_projects = self.deduplicator.filter_new_projects(trending_commercial_projects)
+            # 4. 去重、排序、推送并标记
+            self._push_mode('commercial', popular_commercial_projects, trending_commercial_projects, trend_timeframe)
+
+        except Exception as e:
+            self.logger.error(f"执行商用项目追踪任务时发生错误: {e}")
+            raise
 
-            # 5. 趋势分析（使用指定的时间框架）
-            trending_sorted = self.trend_analyzer.sort_by_trend_score(new_trending_projects, trend_timeframe)
+    def run_all_modes(self, timeframes: Tuple[str, ...] = ('lifetime', '30days', '7days')):
+        """
+        一次获取候选项目，依次执行普通AI和商用AI两种模式下各时间框架的推送
+        选取顺序与逐个进程执行时一致，前面模式标记的项目不会在后续模式中重复推送；
+        各模式的消息汇总后合并发送
+        """
+        self.logger.info("开始执行全模式追踪任务（共享同一份候选项目数据）")
 
-            # 6. 选择要推送的项目
-            selected_popular = new_popular_projects[:2]  # 前2个热门商用项目
-            selected_trending = trending_sorted[:2]      # 前2个商用趋势项目
+        # 1. 重新投递上次未送达的消息，清理旧记录
+        self.flush_outbox()
+        self.deduplicator.clean_old_records()
 
-            if not selected_popular and not selected_trending:
-                self.logger.info("没有发现新的商用实用性AI项目，今日不推送")
-                return
+        # 2. 获取项目数据（仅一次）
+        popular_repos, trending_repos = self._fetch_candidates()
 
-            # 7. 发送通知（使用商用项目专用格式）
-            discord_success = self.notifier.send_commercial_notification(selected_popular, selected_trending, trend_timeframe)
+        if not popular_repos and not trending_repos:
+            self.logger.error("未能获取到任何项目数据")
+            return
 
-            # 8. 标记项目为已推送（无论Discord是否成功）
-            for project in selected_popular + selected_trending:
-                self.deduplicator.mark_project_as_sent(project)
+        # 3. 每种模式只过滤一次，各时间框架共享过滤结果
+        filtered = {
+            'ai': (self.ai_filter.filter_ai_projects(popular_repos),
+                   self.ai_filter.filter_ai_projects(trending_repos)),
+            'commercial': (self.commercial_filter.filter_commercial_ai_projects(popular_repos),
+                           self.commercial_filter.filter_commercial_ai_projects(trending_repos)),
+        }
 
-            if discord_success:
-                self.logger.info(f"✅ 成功推送 {len(selected_popular)} 个热门商用项目和 {len(selected_trending)} 个商用趋势项目")
-            else:
-                self.logger.warning(f"⚠️ Discord消息发送失败，但已记录 {len(selected_popular)} 个热门商用项目和 {len(selected_trending)} 个商用趋势项目")
+        # 4. 一次计算全部趋势候选在各时间框架下的分数
+        trend_table = self.trend_analyzer.score_table(trending_repos, timeframes)
+
+        # 5. 依次选取各模式的项目并加入汇总，单个模式失败不影响后续模式
+        reports: List[Report] = []
+        failed_modes = []
+        for mode in ('ai', 'commercial'):
+            popular_projects, trending_projects = filtered[mode]
+            for timeframe in timeframes:
+                self.logger.info(f"执行{self.MODE_LABELS[mode][0]}推送（趋势时间框架: {timeframe}）")
+                try:
+                    self._push_mode(mode, popular_projects, trending_projects, timeframe, trend_table, reports)
+                except Exception as e:
+                    self.logger.error(f"执行{mode}/{timeframe}推送时发生错误: {e}")
+                    failed_modes.append(f'{mode}/{timeframe}')
+
+        # 6. 各模式的报告合并发送，各渠道自行装入尽量少的消息
+        if reports:
+            self.logger.info(f"汇总消息共 {len(reports)} 份报告，发送到 {len(self.notifier.sinks)} 个渠道")
+            if not self.notifier.send_reports(reports):
+                self.logger.warning("⚠️ 汇总消息未能全部送达，未送达的消息保留在发件箱中")
+        else:
+            self.logger.info("所有模式均没有新项目，今日不推送")
 
-        except Exception as e:
-            self.logger.error(f"执行商用项目追踪任务时发生错误: {e}")
-            raise
+        if failed_modes:
+            raise RuntimeError(f"以下模式推送失败: {', '.join(failed_modes)}")
 
 
 def main():
@@ -934,10 +3387,27 @@ def main():
                        help='执行多时间框架追踪（30天和7天趋势）')
     parser.add_argument('--commercial', action='store_true',
                        help='执行商用实用性AI项目追踪')
+    parser.add_argument('--all-modes', action='store_true',
+                       help='一次获取数据，执行普通AI和商用AI在全部时间框架下的推送')
+    parser.add_argument('--cache-ttl', type=int, default=3600,
+                       help='搜索结果缓存有效期（秒，默认: 3600）')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='禁用本地API缓存')
+    parser.add_argument('--dedup-backend', choices=ProjectDeduplicator.BACKENDS,
+                       help='已推送记录的存储后端 (默认: 环境变量DEDUP_BACKEND或json；sqlite/jsonl首次使用时自动从JSON迁移)')
+    parser.add_argument('--dedup-shards', choices=AIGitHubTracker.DEDUP_SHARD_MODES, default='off',
+                       help='按模式/时间框架分片记录已推送项目 (off: 共用一份记录; shared: 分片并检查全局记录; '
+                            'independent: 分片互相独立，可并行运行)')
+    parser.add_argument('--never-resend', action='store_true',
+                       help='长期记录已推送项目，30天记录过期后也不再重复推送')
+    parser.add_argument('--flush-outbox', action='store_true',
+                       help='只重新投递发件箱中未送达的消息（常规运行开始时也会自动执行）')
 
     args = parser.parse_args()
 
-    tracker = AIGitHubTracker()
+    tracker = AIGitHubTracker(cache_ttl=args.cache_ttl, use_cache=not args.no_cache,
+                              dedup_backend=args.dedup_backend, never_resend=args.never_resend,
+                              dedup_shards=args.dedup_shards)
 
     if args.reset:
         print("🔄 重置已推送项目记录...")
@@ -951,9 +3421,21 @@ def main():
         print(f"  已推送项目总数: {stats['total_sent']}")
         print(f"  最后推送时间: {stats['latest_sent'] or 'N/A'}")
         print(f"  存储文件: {stats['storage_file']}")
+        if 'lifetime_sent' in stats:
+            print(f"  长期记录项目数: {stats['lifetime_sent']}")
+        print(f"  发件箱待投递消息: {tracker.notifier.outbox.count()}")
+        return
+
+    if args.flush_outbox:
+        print("📮 重新投递发件箱中的消息...")
+        delivered, remaining = tracker.flush_outbox()
+        print(f"✅ 送达 {delivered} 条，仍待投递 {remaining} 条")
         return
 
-    if args.commercial:
+    if args.all_modes:
+        # 执行全部模式的推送
+        tracker.run_all_modes()
+    elif args.commercial:
         # 执行商用实用性AI项目追踪
         tracker.run_commercial_tracking(args.trend_timeframe)
     elif args.multi_timeframe:
@@ -3,9 +3,9 @@
 调试今天早上没有收到通知的原因
 """
 
-import json
 import os
 from datetime import datetime, timezone, timedelta
+from ai_tracker import ProjectDeduplicator
 
 def analyze_today_issue():
     """分析今天的问题"""
@@ -58,7 +58,7 @@ def analyze_today_issue():
     print("3️⃣ **权限问题导致git push失败**")
     print("   - 错误: Permission denied to github-actions[bot]")
     print("   - 403错误表示没有写入权限")
-    print("   - sent_projects.json文件没有成功更新到远程仓库")
+    print("   - 已推送项目记录文件没有成功更新到远程仓库")
     print()
 
     print("🔧 解决方案:")
@@ -68,25 +68,24 @@ def analyze_today_issue():
     print("4. 💡 可以手动触发测试新工作流")
     print()
 
-    # 检查当前sent_projects.json
-    if os.path.exists('sent_projects.json'):
-        with open('sent_projects.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            print(f"📊 当前sent_projects.json状态:")
-            print(f"   记录的项目数量: {len(data)}")
+    # 检查当前已推送项目记录（存储后端与追踪器相同，由环境变量DEDUP_BACKEND决定）
+    deduplicator = ProjectDeduplicator()
+    if os.path.exists(deduplicator.storage_file):
+        stats = deduplicator.get_stats()
+        print(f"📊 当前{os.path.basename(deduplicator.storage_file)}状态:")
+        print(f"   记录的项目数量: {stats['total_sent']}")
 
-            # 找最新的记录
-            latest_entries = []
-            for project_id, info in data.items():
-                if info.get('sent_date', '').startswith('2025-09-25'):
-                    latest_entries.append((project_id, info))
+        # 找最新的记录
+        latest_entries = [info for info in deduplicator.recent_projects(stats['total_sent'])
+                          if info.get('sent_date', '').startswith('2025-09-25')]
 
-            print(f"   今天的记录: {len(latest_entries)} 个项目")
-            if latest_entries:
-                print("   最新记录:")
-                for project_id, info in latest_entries[:3]:  # 显示前3个
-                    print(f"     - {info.get('name', project_id)}: {info.get('sent_date')}")
-            print()
+        print(f"   今天的记录: {len(latest_entries)} 个项目")
+        if latest_entries:
+            print("   最新记录:")
+            for info in latest_entries[:3]:  # 显示前3个
+                print(f"     - {info.get('name') or info.get('full_name')}: {info.get('sent_date')}")
+        print()
+    deduplicator.store.close()
 
     print("🎯 **重要**: 今天早上的执行使用了旧配置，所以只推送了一次")
     print("明天早上7点将使用新的6步配置，会推送6条不同的消息！")
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+测试共用的模拟GitHub仓库数据
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+
+def make_repo(repo_id: int, name: Optional[str] = None,
+              description: str = 'llm agent framework for workflow automation and customer service chatbots',
+              stars: int = 12345, forks: int = 678, topics: Optional[List[str]] = None,
+              days_old: Optional[int] = None) -> dict:
+    """构造模拟的GitHub仓库数据，name默认为repo-<id>，days_old为空时创建时间固定为2023-01-01"""
+    name = name or f'repo-{repo_id}'
+    if days_old is None:
+        created_at = '2023-01-01T00:00:00Z'
+    else:
+        created_at = (datetime.now() - timedelta(days=days_old)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return {
+        'id': repo_id,
+        'name': name,
+        'full_name': f'test/{name}',
+        'description': description,
+        'topics': ['llm', 'agent'] if topics is None else topics,
+        'language': 'Python',
+        'stargazers_count': stars,
+        'forks_count': forks,
+        'created_at': created_at,
+        'html_url': f'https://github.com/test/{name}'
+    }
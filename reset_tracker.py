@@ -4,33 +4,31 @@ AI Tracker Reset Script
 快速重置AI追踪器的已推送项目记录
 """
 
-import json
 import os
+import shutil
 from datetime import datetime
+from ai_tracker import ProjectDeduplicator
 
 def reset_tracker():
-    """重置追踪器记录"""
-    storage_file = 'sent_projects.json'
+    """重置追踪器记录（存储后端与追踪器相同，由环境变量DEDUP_BACKEND决定）"""
+    deduplicator = ProjectDeduplicator()
+    storage_file = deduplicator.storage_file
 
     if not os.path.exists(storage_file):
         print("📝 未找到已推送项目记录文件，无需重置")
         return
 
     # 备份原有记录
-    backup_file = f'sent_projects_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    root, ext = os.path.splitext(storage_file)
+    backup_file = f'{root}_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}{ext}'
     try:
-        with open(storage_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        # 创建备份
-        with open(backup_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-
-        print(f"📋 已备份 {len(data)} 条记录到: {backup_file}")
+        total = deduplicator.get_stats()['total_sent']
+        deduplicator.store.flush()
+        shutil.copy2(storage_file, backup_file)
+        print(f"📋 已备份 {total} 条记录到: {backup_file}")
 
         # 重置记录
-        with open(storage_file, 'w', encoding='utf-8') as f:
-            json.dump({}, f, ensure_ascii=False, indent=2)
+        deduplicator.reset_sent_projects()
 
         print("🔄 已重置推送记录")
         print("✅ 下次运行将推送最热门的AI项目")
@@ -38,53 +36,46 @@ def reset_tracker():
 
     except Exception as e:
         print(f"❌ 重置失败: {e}")
+    finally:
+        deduplicator.store.close()
 
 def show_stats():
     """显示统计信息"""
-    storage_file = 'sent_projects.json'
+    deduplicator = ProjectDeduplicator()
+    storage_file = deduplicator.storage_file
 
     if not os.path.exists(storage_file):
         print("📝 未找到已推送项目记录文件")
         return
 
     try:
-        with open(storage_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        stats = deduplicator.get_stats()
 
-        if not data:
+        if not stats['total_sent']:
             print("📊 当前没有已推送项目记录")
             return
 
         print("📊 推送统计信息:")
-        print(f"  已推送项目总数: {len(data)}")
+        print(f"  已推送项目总数: {stats['total_sent']}")
 
-        # 找到最新推送时间
-        latest_date = None
-        latest_project = None
-        for project in data.values():
-            if 'sent_date' in project:
-                if latest_date is None or project['sent_date'] > latest_date:
-                    latest_date = project['sent_date']
-                    latest_project = project
-
-        if latest_project:
-            print(f"  最后推送时间: {latest_date}")
-            print(f"  最后推送项目: {latest_project['name']}")
+        # 最近推送的项目，按推送时间倒序
+        recent_projects = deduplicator.recent_projects(5)
+        if recent_projects:
+            print(f"  最后推送时间: {recent_projects[0]['sent_date']}")
+            print(f"  最后推送项目: {recent_projects[0]['name']}")
 
         print(f"  存储文件: {storage_file}")
 
         # 显示最近5个推送的项目
         print("\n📋 最近推送的项目:")
-        sorted_projects = sorted(data.values(),
-                               key=lambda x: x.get('sent_date', ''),
-                               reverse=True)[:5]
-
-        for i, project in enumerate(sorted_projects, 1):
-            stars = project.get('stars', 0)
+        for i, project in enumerate(recent_projects, 1):
+            stars = project.get('stars') or 0
             print(f"  {i}. {project['name']} - ⭐{stars:,}")
 
     except Exception as e:
         print(f"❌ 读取统计信息失败: {e}")
+    finally:
+        deduplicator.store.close()
 
 def main():
     """主函数"""
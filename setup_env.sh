@@ -23,6 +23,9 @@ DISCORD_WEBHOOK_URL=your_discord_webhook_url_here
 
 # 自定义Webhook URL (可选)
 WEBHOOK_URL=your_custom_webhook_url_here
+
+# 已推送记录存储后端，与GitHub Actions一致（reset_tracker.py等脚本也读取此设置）
+DEDUP_BACKEND=jsonl
 EOF
     echo "✅ 已创建 .env 文件模板"
 else
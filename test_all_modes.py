@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+测试全模式追踪：一次获取数据，六种模式推送且互不重复（不访问真实网络）
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from ai_tracker import AIGitHubTracker, GitHubAPIClient, ProjectDeduplicator
+from repo_fixtures import make_repo
+from test_github_client import _make_response
+
+
+class FakeGitHubClient:
+    """模拟GitHub客户端，记录获取次数"""
+
+    def __init__(self, popular, trending):
+        self.popular = popular
+        self.trending = trending
+        self.fetch_count = 0
+        self.response_cache = None
+
+    def get_popular_ai_projects(self, take=None):
+        self.fetch_count += 1
+        return take(iter(self.popular)) if take else list(self.popular)
+
+    def get_trending_ai_projects(self, take=None):
+        self.fetch_count += 1
+        return take(iter(self.trending)) if take else list(self.trending)
+
+    def get_rate_limit_budget(self):
+        return {}
+
+
+def _candidates():
+    """热门和趋势候选项目各14个，全部同时满足普通AI和商用AI条件"""
+    popular = [make_repo(i, f'ml-automation-tool-{i}', 'machine learning workflow automation platform',
+                         10000 - i, 2000, topics=[], days_old=500) for i in range(1, 15)]
+    trending = [make_repo(100 + i, f'llm-agent-{i}', 'llm assistant tool for business automation',
+                          500 + i * 10, 100, topics=[], days_old=10 + i) for i in range(1, 15)]
+    return popular, trending
+
+
+@contextmanager
+def _tracker_in_tmp_dir(**kwargs):
+    """
+    在临时工作目录中创建追踪器，已推送记录、star快照和发件箱等工作文件都写在临时目录中，
+    测试不会读取、锁定或修改仓库目录下的文件
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            yield AIGitHubTracker(use_cache=False, **kwargs), tmp_dir
+        finally:
+            os.chdir(cwd)
+
+
+def _capture(tracker):
+    """记录各模式选中的项目和实际发送的报告（不访问网络）"""
+    sent_messages, sends = [], []
+    build_report = tracker.notifier.build_report
+
+    def record(mode, popular, trending, timeframe):
+        sent_messages.append((mode, timeframe, popular + trending))
+        return build_report(mode, popular, trending, timeframe)
+
+    tracker.notifier.build_report = record
+    tracker.notifier.send_reports = lambda reports, label_prefix='': sends.append(reports) or True
+    return sent_messages, sends
+
+
+def test_run_all_modes_fetches_once_without_duplicates():
+    """测试全模式只获取一次数据，各模式推送的项目互不重复"""
+    popular, trending = _candidates()
+
+    with _tracker_in_tmp_dir() as (tracker, tmp_dir):
+        tracker.github_client = FakeGitHubClient(popular, trending)
+        sent_messages, sends = _capture(tracker)
+        tracker.run_all_modes()
+
+        print(f"📡 数据获取次数: {tracker.github_client.fetch_count}")
+        for mode, timeframe, projects in sent_messages:
+            print(f"  {mode}/{timeframe}: {[p['name'] for p in projects]}")
+
+        assert tracker.github_client.fetch_count == 2  # 热门和趋势各获取一次
+        assert [(mode, tf) for mode, tf, _ in sent_messages] == [
+            ('ai', 'lifetime'), ('ai', '30days'), ('ai', '7days'),
+            ('commercial', 'lifetime'), ('commercial', '30days'), ('commercial', '7days')
+        ]
+
+        sent_ids = [p['id'] for _, _, projects in sent_messages for p in projects]
+        assert len(sent_ids) == len(set(sent_ids)) == 24
+        assert tracker.deduplicator.get_stats()['total_sent'] == 24
+        assert len(tracker.star_history) == 28  # 每个候选项目记录一次star快照
+        assert {'sent_projects.json', 'sent_projects.json.lock', 'star_history'} <= set(os.listdir(tmp_dir))
+
+        # 六个模式的报告在运行结束时一次性合并发送
+        assert len(sends) == 1
+        assert [(report.mode, report.timeframe) for report in sends[0]] == [(mode, tf) for mode, tf, _ in sent_messages]
+
+
+def test_run_all_modes_with_independent_shards():
+    """测试独立分片：各模式/时间框架各自去重，同一分片再次运行不会重复推送"""
+    popular, trending = _candidates()
+
+    with _tracker_in_tmp_dir(dedup_shards='independent') as (tracker, tmp_dir):
+        tracker.github_client = FakeGitHubClient(popular, trending)
+        sent_messages, sends = _capture(tracker)
+        tracker.run_all_modes()
+        tracker.run_all_modes()
+
+        first_run, second_run = sent_messages[:6], sent_messages[6:]
+        # 热门项目在各分片中都从第1名开始推送
+        assert all([p['id'] for p in projects[:2]] == [1, 2] for _, _, projects in first_run)
+        assert all([p['id'] for p in projects[:2]] == [3, 4] for _, _, projects in second_run)
+        assert tracker.deduplicator.get_stats()['total_sent'] == 0
+        assert sorted(os.listdir(os.path.join(tmp_dir, 'sent_projects', 'commercial'))) == [
+            '30days.json', '30days.json.lock', '7days.json', '7days.json.lock', 'lifetime.json', 'lifetime.json.lock'
+        ]
+
+
+def test_multi_timeframe_claims_before_sending():
+    """测试多时间框架追踪：发送失败时项目也已被认领（消息留在发件箱重发），下次运行不会再次选取"""
+    popular, trending = _candidates()
+
+    with _tracker_in_tmp_dir() as (tracker, tmp_dir):
+        tracker.github_client = FakeGitHubClient(popular, trending)
+        sent_messages = []
+        tracker.notifier.send_notification = lambda p, t, tf: sent_messages.append((tf, p + t)) and False
+        tracker.run_multi_timeframe_tracking()
+        tracker.run_multi_timeframe_tracking()
+
+        sent_ids = [p['id'] for _, projects in sent_messages for p in projects]
+        assert [tf for tf, _ in sent_messages] == ['30days', '7days', '30days', '7days']
+        assert all(repo_id > 100 for repo_id in sent_ids)  # 只推送趋势项目
+        assert len(sent_ids) == len(set(sent_ids)) == 8
+        assert tracker.deduplicator.get_stats()['total_sent'] == 8
+
+
+def test_push_mode_ranks_only_top_trending_candidates():
+    """测试趋势项目只取前k个候选，被其他进程抢先认领导致不足时才扩大k"""
+    popular, trending = _candidates()
+
+    with _tracker_in_tmp_dir() as (tracker, tmp_dir):
+        sent_messages, _ = _capture(tracker)
+        requested_k = []
+        top_k = tracker.trend_analyzer.top_k
+        tracker.trend_analyzer.top_k = lambda projects, timeframe, k, table=None: \
+            requested_k.append(k) or top_k(projects, timeframe, k, table=table)
+
+        tracker._push_mode('ai', popular, trending, reports=[])
+        assert requested_k == [4]
+        ranked = tracker.trend_analyzer.sort_by_trend_score(list(trending))
+        assert [p['id'] for p in sent_messages[0][2]] == [1, 2] + [p['id'] for p in ranked[:2]]
+
+        # 模拟其他进程在过滤之后、认领之前抢先认领了排名靠前的趋势项目
+        tracker.deduplicator.filter_new_projects = lambda projects: list(projects)
+        tracker.deduplicator.mark_projects_as_sent(ranked[2:6])
+        requested_k.clear()
+        tracker._push_mode('ai', popular, trending, reports=[])
+        assert requested_k == [4, 8]
+        assert [p['id'] for p in sent_messages[1][2]] == [3, 4] + [p['id'] for p in ranked[6:8]]
+
+
+def test_fetch_candidates_pages_until_enough_unsent():
+    """测试获取候选项目时流式翻页：第一页全部已推送时翻到第二页补足，取够后不再请求后续页面"""
+    base = 'https://api.github.com/search/repositories'
+    requested = []
+
+    def fake_request(method, url, **kwargs):
+        page = 1 if kwargs.get('params') else int(url.rsplit('page=', 1)[1])
+        requested.append(page)
+        items = [make_repo(page * 100 + i, topics=[], days_old=100) for i in range(100)]
+        headers = {'Link': f'<{base}?q=ai&per_page=100&page={page + 1}>; rel="next"'} if page < 5 else {}
+        return _make_response(200, headers, {'total_count': 500, 'items': items})
+
+    # 并发查询的各线程都会读取去重记录，各存储后端都需支持
+    for backend in ProjectDeduplicator.BACKENDS:
+        requested.clear()
+        with _tracker_in_tmp_dir(dedup_backend=backend) as (tracker, tmp_dir):
+            tracker.github_client = GitHubAPIClient(token='dummy', cache_dir='')
+            tracker.github_client.session.request = fake_request
+            tracker.deduplicator.mark_projects_as_sent([make_repo(100 + i) for i in range(100)])
+
+            popular_repos, trending_repos = tracker._fetch_candidates()
+            tracker.deduplicator.store.close()
+
+        print(f"📄 {backend}: 8个查询请求的页码 {sorted(requested)}")
+        assert sorted(requested) == [1] * 8 + [2] * 8, backend
+        assert [repo['id'] for repo in popular_repos] == list(range(200, 225)), backend
+        assert [repo['id'] for repo in trending_repos] == list(range(200, 225)), backend
+
+
+if __name__ == "__main__":
+    test_run_all_modes_fetches_once_without_duplicates()
+    test_run_all_modes_with_independent_shards()
+    test_multi_timeframe_claims_before_sending()
+    test_push_mode_ranks_only_top_trending_candidates()
+    test_fetch_candidates_pages_until_enough_unsent()
+    print("✅ 全模式追踪测试通过")
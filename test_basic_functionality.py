@@ -5,6 +5,7 @@
 
 import os
 import sys
+import tempfile
 import traceback
 
 def test_basic_import():
@@ -16,8 +17,14 @@ def test_basic_import():
         from ai_tracker import AIGitHubTracker, GitHubAPIClient, AIProjectFilter
         print("✅ 核心类导入成功")
 
-        # 测试实例化
-        tracker = AIGitHubTracker()
+        # 测试实例化（在临时目录中进行，不读取或锁定仓库中的已推送记录）
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                tracker = AIGitHubTracker()
+            finally:
+                os.chdir(cwd)
         print("✅ AIGitHubTracker 实例化成功")
 
         # 测试方法存在
@@ -3,7 +3,7 @@
 测试商用实用性AI项目功能
 """
 
-from ai_tracker import CommercialAIProjectFilter, DiscordNotifier, ProjectSummarizer
+from ai_tracker import CommercialAIProjectFilter, DiscordNotifier, ProjectSummarizer, RepoRecord
 
 def test_commercial_filter():
     """测试商用项目过滤器"""
@@ -176,11 +176,40 @@ def test_commercial_keywords():
     print(f"  商业指标词: {len(filter_obj.BUSINESS_INDICATORS)} 个")
     print(f"  总覆盖: {len(filter_obj.COMMERCIAL_KEYWORDS) + len(filter_obj.BUSINESS_INDICATORS)} 个关键词")
 
+def test_commercial_scoring_engine():
+    """测试评分引擎：批量评分返回得分和命中的关键词，结果与逐个判定一致"""
+    filter_obj = CommercialAIProjectFilter()
+    projects = [
+        RepoRecord.from_github({'id': 1, 'name': 'llm-crm-assistant', 'description': 'LLM powered CRM automation',
+                                'topics': ['saas'], 'stargazers_count': 800, 'forks_count': 10}),
+        {'id': 2, 'name': 'gpt-research', 'description': 'Research code for GPT experiments',
+         'topics': [], 'stargazers_count': 200, 'forks_count': 5},
+        {'id': 3, 'name': 'email-crm', 'description': 'Maintain email lists', 'topics': [],
+         'stargazers_count': 9000, 'forks_count': 3000},
+    ]
+
+    scores = filter_obj.score_projects(projects)
+    for project, score in zip(projects, scores):
+        print(f"  {project['name']}: {score.score}分 {score.matched_terms}")
+
+    assert [score.is_ai for score in scores] == [True, True, False]
+    assert scores[0].is_commercial and scores[0].matched_terms['crm'] == 2
+    assert scores[0].score == sum(scores[0].matched_terms.values())
+    assert not scores[1].is_commercial
+    assert scores[2] == (False, False, 0, {})
+    assert [filter_obj.is_commercial_ai_project(project) for project in projects] == [s.is_commercial for s in scores]
+    assert filter_obj.filter_commercial_ai_projects(projects) == projects[:1]
+
+    # 规范化文本缓存在记录上，不会进入序列化结果
+    assert projects[0].search_text is not None
+    assert 'search_text' not in projects[0].to_dict()
+
 if __name__ == "__main__":
     # 运行所有测试
     commercial_projects = test_commercial_filter()
     test_commercial_discord_format()
     test_commercial_keywords()
+    test_commercial_scoring_engine()
 
     print("\n🎉 商用实用性AI项目功能测试完成！")
     print(f"✅ 成功识别出具有商用价值的AI项目")
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+测试已推送项目去重器的存储
+"""
+
+import os
+import json
+import time
+import tempfile
+import multiprocessing
+from datetime import datetime, timedelta
+from unittest import mock
+from ai_tracker import ProjectDeduplicator
+from repo_fixtures import make_repo
+
+
+def test_batch_marks_write_once():
+    """测试批量标记只写一次文件，且不留下临时文件"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage_file = os.path.join(tmp_dir, 'sent.json')
+        deduplicator = ProjectDeduplicator(storage_file)
+
+        with mock.patch('ai_tracker.os.replace', wraps=os.replace) as replace:
+            deduplicator.mark_projects_as_sent([make_repo(i) for i in range(1, 5)])
+            assert replace.call_count == 1
+
+            with deduplicator.batch():
+                for i in range(5, 10):
+                    deduplicator.mark_project_as_sent(make_repo(i))
+                deduplicator.clean_old_records()
+                assert replace.call_count == 1  # 批量期间不写文件
+            assert replace.call_count == 2
+
+        with open(storage_file, 'r', encoding='utf-8') as f:
+            assert sorted(json.load(f), key=int) == [str(i) for i in range(1, 10)]
+        assert sorted(os.listdir(tmp_dir)) == ['sent.json', 'sent.json.lock']
+
+
+def test_batch_flushes_on_error():
+    """测试批量期间抛出异常时已做的标记仍会保存"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage_file = os.path.join(tmp_dir, 'sent.json')
+        deduplicator = ProjectDeduplicator(storage_file)
+
+        try:
+            with deduplicator.batch():
+                deduplicator.mark_project_as_sent(make_repo(1))
+                raise RuntimeError("推送失败")
+        except RuntimeError:
+            pass
+
+        assert ProjectDeduplicator(storage_file).is_project_sent(1)
+
+
+def test_backends_share_public_api():
+    """测试JSON和SQLite后端的标记、过滤、清理、统计和重置行为一致"""
+    for backend in ProjectDeduplicator.BACKENDS:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            deduplicator = ProjectDeduplicator(os.path.join(tmp_dir, 'sent.json'), backend=backend)
+            deduplicator.mark_projects_as_sent([make_repo(1), make_repo(2)])
+            deduplicator.store.add_many({'3': {'sent_date': (datetime.now() - timedelta(days=40)).isoformat()}})
+            deduplicator.store.flush()
+
+            reopened = ProjectDeduplicator(os.path.join(tmp_dir, 'sent.json'), backend=backend)
+            assert [p['id'] for p in reopened.filter_new_projects([make_repo(i) for i in range(1, 5)])] == [4]
+            reopened.clean_old_records(days=30)
+            assert [p['id'] for p in reopened.filter_new_projects([make_repo(i) for i in range(1, 5)])] == [3, 4]
+            stats = reopened.get_stats()
+            assert stats['total_sent'] == 2, backend
+            assert stats['latest_sent'][:10] == datetime.now().date().isoformat()
+
+            reopened.reset_sent_projects()
+            assert ProjectDeduplicator(os.path.join(tmp_dir, 'sent.json'), backend=backend).get_stats()['total_sent'] == 0
+            reopened.store.close()
+
+
+def test_backend_defaults_to_environment():
+    """测试未指定后端时读取DEDUP_BACKEND，所有入口共用同一份记录"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = os.path.join(tmp_dir, 'sent_projects.json')
+        with mock.patch.dict(os.environ, {'DEDUP_BACKEND': 'jsonl'}):
+            deduplicator = ProjectDeduplicator(json_file)
+            deduplicator.mark_projects_as_sent([make_repo(1), make_repo(2, stars=99)])
+            assert deduplicator.storage_file == os.path.join(tmp_dir, 'sent_projects.jsonl')
+            assert ProjectDeduplicator(json_file).get_stats()['total_sent'] == 2
+        assert ProjectDeduplicator(json_file, backend='json').get_stats()['total_sent'] == 0
+
+        for backend in ProjectDeduplicator.BACKENDS:
+            recent = ProjectDeduplicator(os.path.join(tmp_dir, f'{backend}.json'), backend=backend)
+            recent.mark_project_as_sent(make_repo(1))
+            time.sleep(0.01)
+            recent.mark_project_as_sent(make_repo(2, stars=99))
+            assert [(p['name'], p['stars']) for p in recent.recent_projects(5)] == [('repo-2', 99), ('repo-1', 12345)], backend
+            recent.store.close()
+
+
+def test_sqlite_migrates_json_once():
+    """测试SQLite后端首次使用时从JSON文件迁移，之后不再重复导入"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = os.path.join(tmp_dir, 'sent_projects.json')
+        legacy = ProjectDeduplicator(json_file)
+        legacy.mark_projects_as_sent([make_repo(i) for i in range(1, 4)])
+
+        deduplicator = ProjectDeduplicator(json_file, backend='sqlite')
+        assert deduplicator.storage_file == os.path.join(tmp_dir, 'sent_projects.db')
+        assert deduplicator.get_stats()['total_sent'] == 3
+        deduplicator.reset_sent_projects()
+        deduplicator.store.close()
+
+        # 已迁移过的数据库不会再次导入JSON记录
+        assert ProjectDeduplicator(json_file, backend='sqlite').get_stats()['total_sent'] == 0
+
+
+def test_sqlite_startup_and_cleanup_with_large_history():
+    """测试大量历史记录下SQLite后端的启动、查询和过期清理耗时"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, 'sent.db')
+        deduplicator = ProjectDeduplicator(db_file, backend='sqlite')
+        now = datetime.now()
+        deduplicator.store.add_many({
+            str(i): {'sent_date': (now - timedelta(days=i % 1000)).isoformat()} for i in range(50000)
+        })
+        deduplicator.store.flush()
+        deduplicator.store.close()
+
+        start = time.perf_counter()
+        reopened = ProjectDeduplicator(db_file, backend='sqlite')
+        assert reopened.is_project_sent(49999) and not reopened.is_project_sent(50000)
+        startup_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        reopened.clean_old_records(days=30)
+        cleanup_ms = (time.perf_counter() - start) * 1000
+        print(f"⚡ 5万条历史: 启动+查询 {startup_ms:.1f}ms，过期清理 {cleanup_ms:.1f}ms")
+        assert reopened.get_stats()['total_sent'] == 50 * 30
+        reopened.store.close()
+
+
+def test_sqlite_cleanup_releases_write_lock():
+    """测试SQLite后端没有过期记录时清理也不会占着写事务，其他连接可以立即认领"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_file = os.path.join(tmp_dir, 'sent.db')
+        deduplicator = ProjectDeduplicator(db_file, backend='sqlite')
+        deduplicator.mark_project_as_sent(make_repo(1))
+        deduplicator.clean_old_records(days=30)
+        assert not deduplicator.store._conn.in_transaction
+
+        other = ProjectDeduplicator(db_file, backend='sqlite')
+        other.store._connect().execute('PRAGMA busy_timeout = 100')
+        assert [repo['id'] for repo in other.claim_projects([make_repo(i) for i in range(1, 4)], 2)] == [2, 3]
+        other.store.close()
+        deduplicator.store.close()
+
+
+def test_journal_appends_and_compacts():
+    """测试JSONL日志：只追加新行，回放时跳过损坏的末行，超过阈值后压缩为快照"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = os.path.join(tmp_dir, 'sent_projects.json')
+        ProjectDeduplicator(json_file).mark_projects_as_sent([make_repo(1), make_repo(2)])
+
+        deduplicator = ProjectDeduplicator(json_file, backend='jsonl')
+        journal = deduplicator.storage_file
+        assert journal == os.path.join(tmp_dir, 'sent_projects.jsonl')
+        assert deduplicator.get_stats()['total_sent'] == 2
+
+        with open(journal, 'r', encoding='utf-8') as f:
+            before = f.read()
+        deduplicator.mark_projects_as_sent([make_repo(3), make_repo(4)])
+        deduplicator.store.add_many({'5': {'sent_date': (datetime.now() - timedelta(days=40)).isoformat()}})
+        deduplicator.store.flush()
+        deduplicator.clean_old_records(days=30)
+        with open(journal, 'r', encoding='utf-8') as f:
+            after = f.read()
+        assert after.startswith(before)
+        assert [json.loads(line)['op'] for line in after[len(before):].splitlines()] == ['mark', 'mark', 'mark', 'expire']
+
+        # 模拟追加中途崩溃留下半行
+        with open(journal, 'a', encoding='utf-8') as f:
+            f.write('{"op": "mark", "id": "6"')
+        replayed = ProjectDeduplicator(json_file, backend='jsonl')
+        assert replayed.get_stats()['total_sent'] == 4
+        assert not replayed.is_project_sent(5)
+        replayed.mark_project_as_sent(make_repo(6))
+        replayed = ProjectDeduplicator(json_file, backend='jsonl')
+        assert replayed.get_stats()['total_sent'] == 5
+
+        replayed.store.compact_bytes = 1
+        replayed.mark_project_as_sent(make_repo(7))
+        with open(journal, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 6 and all(json.loads(line)['op'] == 'mark' for line in lines)
+        assert ProjectDeduplicator(json_file, backend='jsonl').get_stats()['total_sent'] == 6
+
+
+def test_never_resend_survives_expiry():
+    """测试长期记录：详细记录过期后仍不重复推送，记录以每个id 8字节保存"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage_file = os.path.join(tmp_dir, 'sent.json')
+        ProjectDeduplicator(storage_file).mark_projects_as_sent([make_repo(1)])
+
+        # 首次启用时从现有详细记录初始化
+        deduplicator = ProjectDeduplicator(storage_file, never_resend=True)
+        assert deduplicator.get_stats()['lifetime_sent'] == 1
+        deduplicator.mark_projects_as_sent([make_repo(i) for i in (9, 3, 5)])
+        deduplicator.store.clear()
+        deduplicator.store.flush()
+
+        reopened = ProjectDeduplicator(storage_file, never_resend=True)
+        assert reopened.get_stats()['total_sent'] == 0
+        assert list(reopened.history.ids) == [1, 3, 5, 9]
+        assert [p['id'] for p in reopened.filter_new_projects([make_repo(i) for i in range(1, 8)])] == [2, 4, 6, 7]
+        assert os.path.getsize(os.path.join(tmp_dir, 'sent_history.bin')) == 4 * 8
+
+        # 未启用时只看详细记录
+        assert ProjectDeduplicator(storage_file).filter_new_projects([make_repo(3)])
+
+        reopened.history.add_many(range(100, 200100, 2))
+        start = time.perf_counter()
+        for repo_id in range(100, 10100):
+            reopened.is_project_sent(repo_id)
+        print(f"⚡ 10万条长期记录下单次查询耗时: {(time.perf_counter() - start) * 1000 / 10000:.4f}ms")
+
+        reopened.reset_sent_projects()
+        assert ProjectDeduplicator(storage_file, never_resend=True).get_stats()['lifetime_sent'] == 0
+
+
+def _claim_worker(storage_file: str, backend: str, rounds: int) -> list:
+    """子进程：反复从同一批候选项目中认领"""
+    deduplicator = ProjectDeduplicator(storage_file, backend=backend)
+    claimed = []
+    for _ in range(rounds):
+        claimed.extend(repo['id'] for repo in deduplicator.claim_projects([make_repo(i) for i in range(1, 200)], 2))
+    return claimed
+
+
+def test_parallel_processes_never_claim_same_project():
+    """测试多个进程并行认领时不会重复认领，也不会丢失其他进程的标记"""
+    for backend in ProjectDeduplicator.BACKENDS:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            storage_file = os.path.join(tmp_dir, 'sent.json')
+            with multiprocessing.get_context('spawn').Pool(4) as pool:
+                results = pool.starmap(_claim_worker, [(storage_file, backend, 10)] * 4)
+
+            claimed = [repo_id for result in results for repo_id in result]
+            assert len(claimed) == len(set(claimed)) == 80, backend
+            assert ProjectDeduplicator(storage_file, backend=backend).get_stats()['total_sent'] == 80
+
+
+def test_namespaced_shards():
+    """测试命名空间分片：独立分片互不影响，共享分片同时检查和标记全局记录"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = ProjectDeduplicator(os.path.join(tmp_dir, 'sent_projects.json'))
+        ai_lifetime = root.shard('ai/lifetime', shared=False)
+        ai_weekly = root.shard('ai/7days', shared=False)
+        assert ai_lifetime.storage_file == os.path.join(tmp_dir, 'sent_projects', 'ai', 'lifetime.json')
+
+        assert [r['id'] for r in ai_lifetime.claim_projects([make_repo(i) for i in range(1, 5)], 2)] == [1, 2]
+        assert [r['id'] for r in ai_weekly.claim_projects([make_repo(i) for i in range(1, 5)], 2)] == [1, 2]
+        assert root.get_stats()['total_sent'] == 0
+
+        commercial = root.shard('commercial/lifetime')
+        root.mark_project_as_sent(make_repo(3))
+        assert [r['id'] for r in commercial.claim_projects([make_repo(i) for i in range(1, 6)], 2)] == [1, 2]
+        assert root.is_project_sent(1) and not ai_weekly.is_project_sent(3)
+        assert ProjectDeduplicator(os.path.join(tmp_dir, 'sent_projects.json')).get_stats()['total_sent'] == 3
+        assert commercial.get_stats()['total_sent'] == 2
+
+        # 长期记录：独立分片使用各自的长期记录文件，共享分片通过全局长期记录判断，详细记录过期后都不重复推送
+        lifetime_root = ProjectDeduplicator(os.path.join(tmp_dir, 'lifetime', 'sent_projects.json'), never_resend=True)
+        independent = lifetime_root.shard('ai/lifetime', shared=False)
+        shared = lifetime_root.shard('commercial/lifetime')
+        assert independent.history is not None
+        assert independent.history.path == os.path.join(tmp_dir, 'lifetime', 'sent_projects', 'ai', 'lifetime.history.bin')
+        independent.mark_project_as_sent(make_repo(7))
+        shared.mark_project_as_sent(make_repo(8))
+        for deduplicator in (independent, shared, lifetime_root):
+            deduplicator.store.clear()
+            deduplicator.store.flush()
+        reopened = ProjectDeduplicator(os.path.join(tmp_dir, 'lifetime', 'sent_projects.json'), never_resend=True)
+        assert reopened.shard('ai/lifetime', shared=False).is_project_sent(7)
+        assert reopened.shard('commercial/lifetime').is_project_sent(8)
+        assert not reopened.shard('ai/7days', shared=False).is_project_sent(7)
+
+        for namespace in ('../escape', 'ai//lifetime', '/abs'):
+            try:
+                root.shard(namespace)
+                assert False, namespace
+            except ValueError:
+                pass
+
+
+if __name__ == "__main__":
+    test_batch_marks_write_once()
+    test_batch_flushes_on_error()
+    test_backends_share_public_api()
+    test_backend_defaults_to_environment()
+    test_sqlite_migrates_json_once()
+    test_sqlite_startup_and_cleanup_with_large_history()
+    test_sqlite_cleanup_releases_write_lock()
+    test_journal_appends_and_compacts()
+    test_never_resend_survives_expiry()
+    test_parallel_processes_never_claim_same_project()
+    test_namespaced_shards()
+    print("✅ 去重器存储测试通过")
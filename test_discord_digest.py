@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+测试Discord汇总消息：按10个embed、6000字符、字段1024字符的限制装箱
+"""
+
+from ai_tracker import DiscordDigest, DiscordNotifier, DiscordSink
+from repo_fixtures import make_repo
+
+
+def _check_limits(payloads):
+    for payload in payloads:
+        assert len(payload['embeds']) <= DiscordDigest.MAX_EMBEDS
+        assert sum(DiscordDigest.embed_length(embed) for embed in payload['embeds']) <= DiscordDigest.MAX_MESSAGE_CHARS
+        for embed in payload['embeds']:
+            assert len(embed.get('title', '')) <= DiscordDigest.MAX_TITLE_CHARS
+            assert len(embed.get('description', '')) <= DiscordDigest.MAX_DESCRIPTION_CHARS
+            assert len(embed['fields']) <= DiscordDigest.MAX_FIELDS
+            assert all(len(field['name']) <= DiscordDigest.MAX_FIELD_NAME_CHARS for field in embed['fields'])
+            assert all(len(field['value']) <= DiscordDigest.MAX_FIELD_CHARS for field in embed['fields'])
+
+
+def test_pack_fields_splits_on_project_boundaries():
+    """测试字段超长时在项目边界处拆分，拆分后能还原全部项目"""
+    blocks = [f"{i}. **project-{i}** - " + 'x' * 280 for i in range(1, 8)]
+    fields = DiscordDigest.pack_fields('⭐ 收藏最多的AI项目', blocks)
+
+    print(f"✂️ {len(blocks)} 个项目拆分为 {len(fields)} 个字段")
+    assert len(fields) == 3
+    assert fields[0]['name'] == '⭐ 收藏最多的AI项目'
+    assert all(field['name'] == '⭐ 收藏最多的AI项目（续）' for field in fields[1:])
+    assert all(len(field['value']) <= 1024 for field in fields)
+    assert [block for field in fields for block in field['value'].split('\n\n')] == blocks
+
+    # 单个项目本身超长时截断
+    assert len(DiscordDigest.pack_fields('name', ['y' * 2000])[0]['value']) == 1024
+
+
+def test_digest_packs_embeds_within_limits():
+    """测试按embed数量和总字符数装箱，超长embed拆成续篇"""
+    small = [{'title': f'mode-{i}', 'description': 'd', 'fields': [{'name': 'n', 'value': 'v' * 100}]} for i in range(12)]
+    digest = DiscordDigest(small)
+    payloads = digest.payloads()
+    assert [len(payload['embeds']) for payload in payloads] == [10, 2]
+
+    # 按顺序装箱：当前消息放不下时才开始下一条，后面较小的embed不会插到前面的消息中
+    sized = [{'title': f'e{i}', 'description': 'd' * (size - 2), 'fields': []}
+             for i, size in enumerate([3000, 3500, 2000, 500])]
+    payloads = DiscordDigest(sized).payloads()
+    _check_limits(payloads)
+    assert [[embed['title'] for embed in payload['embeds']] for payload in payloads] == [['e0'], ['e1', 'e2', 'e3']]
+
+    # 单个embed超过6000字符或25个字段时拆成同标题的续篇
+    huge = {'title': '汇总', 'color': 1, 'fields': [{'name': f'n{i}', 'value': 'v' * 1000} for i in range(30)]}
+    digest = DiscordDigest([huge])
+    assert len(digest) == 6
+    assert digest.embeds[1]['title'] == '汇总（续）' and digest.embeds[1]['color'] == 1
+    assert [field['name'] for embed in digest.embeds for field in embed['fields']] == [f'n{i}' for i in range(30)]
+    _check_limits(digest.payloads())
+
+
+def test_digest_fits_field_and_description_limits():
+    """测试未经pack_fields构建的embed：超长字段值按项目边界拆分，超长描述、标题和单个项目截断"""
+    blocks = [f'{i}. **project-{i}** ' + 'x' * 580 for i in range(1, 6)]
+    embed = {
+        'title': 't' * 300,
+        'description': 'd' * 5000,
+        'fields': [{'name': '⭐ 项目', 'value': '\n\n'.join(blocks), 'inline': False},
+                   {'name': '说明', 'value': 'y' * 3000, 'inline': False}],
+    }
+    digest = DiscordDigest([embed])
+    payloads = digest.payloads()
+    _check_limits(payloads)
+
+    fields = [field for payload in payloads for embed in payload['embeds'] for field in embed['fields']]
+    print(f"✂️ 3000+字符的字段拆分为: {[field['name'] for field in fields]}")
+    assert [field['name'] for field in fields] == ['⭐ 项目'] + ['⭐ 项目（续）'] * 4 + ['说明']
+    assert [block for field in fields[:5] for block in field['value'].split('\n\n')] == blocks
+    assert fields[-1]['value'].endswith('...') and len(fields[-1]['value']) == 1024
+    assert len(digest.embeds[0]['description']) == 4096 and len(digest.embeds[0]['title']) == 256
+    assert len(embed['description']) == 5000  # 不修改传入的embed
+
+
+def test_notifier_digest_from_all_modes():
+    """测试六个模式的真实embed合并后的请求数"""
+    notifier = DiscordNotifier(webhook_urls=[], sinks=[])
+    reports = []
+    repo_id = 0
+    for mode in ('ai', 'commercial'):
+        for timeframe in ('lifetime', '30days', '7days'):
+            repos = [make_repo(repo_id + i, f'llm-agent-{repo_id + i}') for i in range(4)]
+            repo_id += 4
+            reports.append(notifier.build_report(mode, repos[:2], repos[2:], timeframe))
+
+    digest = DiscordDigest(DiscordSink.render_embed(report) for report in reports)
+    payloads = DiscordSink([]).render(reports)
+    print(f"📨 {len(digest)} 个embed合并为 {len(payloads)} 条webhook消息")
+    _check_limits(payloads)
+    assert len(digest) == 6
+    assert len(payloads) < 6
+
+
+if __name__ == "__main__":
+    test_pack_fields_splits_on_project_boundaries()
+    test_digest_packs_embeds_within_limits()
+    test_digest_fits_field_and_description_limits()
+    test_notifier_digest_from_all_modes()
+    print("✅ Discord汇总消息测试通过")
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+测试GitHub API客户端的并发查询、限额调度、缓存、分页和分片功能（不访问真实网络）
+"""
+
+import re
+import json
+import time
+import tempfile
+import threading
+import requests
+import os
+from datetime import date, timedelta
+from ai_tracker import GitHubAPIClient, ProjectDeduplicator, RateLimitScheduler, RateLimitExceededError, ResponseCache
+
+
+def _make_response(status_code: int = 200, headers: dict = None, body: dict = None) -> requests.Response:
+    """构造带指定响应头的Response对象"""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = json.dumps(body or {'total_count': 0, 'items': []}).encode('utf-8')
+    return response
+
+
+def _fake_search_factory(delay: float, in_flight: list, lock: threading.Lock):
+    """构造模拟的search_repositories，记录同时在途的请求数"""
+    current = [0]
+
+    def fake_search(query, sort='stars', order='desc', per_page=50):
+        with lock:
+            current[0] += 1
+            in_flight.append(current[0])
+        time.sleep(delay)
+        with lock:
+            current[0] -= 1
+        # 每个查询返回两个项目，其中id=0为所有查询共有的重复项目
+        return [
+            {'id': 0, 'name': 'shared'},
+            {'id': hash(query) % 100000 + 1, 'name': query}
+        ]
+
+    return fake_search
+
+
+def test_search_many_concurrent():
+    """测试并发查询：总耗时接近单个请求耗时，结果按查询顺序去重"""
+    client = GitHubAPIClient(token='dummy', max_concurrency=4, cache_dir='')
+    in_flight = []
+    client.search_repositories = _fake_search_factory(0.2, in_flight, threading.Lock())
+
+    queries = ['q1', 'q2', 'q3', 'q4']
+    start = time.time()
+    projects = client.search_many(queries)
+    elapsed = time.time() - start
+
+    print(f"🚀 并发查询耗时: {elapsed:.2f}s, 最大并发: {max(in_flight)}")
+    assert elapsed < 0.6
+    assert [p['name'] for p in projects] == ['shared', 'q1', 'q2', 'q3', 'q4']
+
+
+def test_search_many_respects_cap():
+    """测试并发上限"""
+    client = GitHubAPIClient(token='dummy', max_concurrency=2, cache_dir='')
+    in_flight = []
+    client.search_repositories = _fake_search_factory(0.05, in_flight, threading.Lock())
+
+    projects = client.search_many(['a', 'b', 'c', 'd', 'e'])
+
+    print(f"🔒 并发上限2时最大在途请求数: {max(in_flight)}")
+    assert max(in_flight) <= 2
+    assert len(projects) == 6
+
+
+def test_rate_limit_scheduler_waits_for_reset():
+    """测试配额耗尽时等待到重置时间，配额充足时不等待"""
+    scheduler = RateLimitScheduler(max_wait=5)
+
+    start = time.time()
+    scheduler.acquire('search')
+    assert time.time() - start < 0.05
+
+    reset = time.time() + 0.3
+    scheduler.update('search', _make_response(headers={
+        'X-RateLimit-Limit': '30', 'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(reset)}))
+    assert scheduler.get_budget()['search']['remaining'] == 0
+
+    start = time.time()
+    scheduler.acquire('search')
+    waited = time.time() - start
+    print(f"⏳ search配额耗尽后等待: {waited:.2f}s")
+    assert 0.2 < waited < 1.0
+
+    # core配额不受search影响
+    start = time.time()
+    scheduler.acquire('core')
+    assert time.time() - start < 0.05
+
+
+def test_rate_limit_scheduler_retry_after():
+    """测试Retry-After响应头和等待上限"""
+    scheduler = RateLimitScheduler(max_wait=1)
+    retry_after = scheduler.update('search', _make_response(403, {'Retry-After': '30'}))
+    assert retry_after == 30
+
+    try:
+        scheduler.acquire('search')
+        assert False, "等待时间超过上限时应抛出异常"
+    except RateLimitExceededError as e:
+        print(f"🛑 超过等待上限: {e}")
+
+
+def test_request_retries_after_rate_limit():
+    """测试触发限流后按Retry-After重试"""
+    client = GitHubAPIClient(token='dummy', cache_dir='')
+    responses = [
+        _make_response(429, {'Retry-After': '0.1'}),
+        _make_response(200, {'X-RateLimit-Limit': '30', 'X-RateLimit-Remaining': '28',
+                             'X-RateLimit-Reset': str(time.time() + 60)}),
+    ]
+    calls = []
+
+    def fake_request(method, url, **kwargs):
+        calls.append(url)
+        return responses[len(calls) - 1]
+
+    client.session.request = fake_request
+    projects = client.search_repositories('machine learning')
+
+    assert projects == []
+    assert len(calls) == 2
+    assert client.get_rate_limit_budget()['search']['remaining'] == 28
+
+
+def test_etag_cache_replays_body_on_304():
+    """测试ETag条件请求：第二次请求带If-None-Match，304时复用缓存"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        body = {'total_count': 1, 'items': [{'id': 42, 'name': 'cached-project'}]}
+        responses = [
+            _make_response(200, {'ETag': 'W/"abc"'}, body),
+            _make_response(304, {'ETag': 'W/"abc"'}, {}),
+        ]
+        sent_headers = []
+
+        def fake_request(method, url, **kwargs):
+            sent_headers.append(kwargs.get('headers') or {})
+            return responses[len(sent_headers) - 1]
+
+        client = GitHubAPIClient(token='dummy', cache_dir=cache_dir, cache_ttl=0)
+        client.session.request = fake_request
+        first = client.search_repositories('llm')
+
+        # 新建客户端，验证缓存已持久化到磁盘
+        client = GitHubAPIClient(token='dummy', cache_dir=cache_dir, cache_ttl=0)
+        client.session.request = fake_request
+        second = client.search_repositories('llm')
+
+        print(f"📦 第二次请求头: {sent_headers[1]}")
+        assert 'If-None-Match' not in sent_headers[0]
+        assert sent_headers[1]['If-None-Match'] == 'W/"abc"'
+        assert [p.to_dict() for p in first] == [p.to_dict() for p in second]
+        assert [(p['id'], p['name']) for p in second] == [(42, 'cached-project')]
+
+
+def test_response_cache_ttl_and_lru():
+    """测试响应缓存的TTL过期和LRU淘汰"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ResponseCache(os.path.join(cache_dir, 'responses.sqlite'), ttl=60, max_entries=2)
+        key_a = ResponseCache.make_key('Machine  Learning', 'stars', 'desc', 25)
+        assert key_a == ResponseCache.make_key('machine learning', 'stars', 'desc', 25)
+
+        cache.put(key_a, [{'id': 1}])
+        cache.put('b', [{'id': 2}])
+        assert cache.get(key_a) == [{'id': 1}]  # 访问a，使b成为最久未访问
+        time.sleep(0.01)
+        cache.put('c', [{'id': 3}])
+
+        assert cache.get('b') is None
+        assert cache.get('c') == [{'id': 3}]
+        assert cache.get_stats() == {'hits': 2, 'misses': 1}
+
+        cache.ttl = 0
+        time.sleep(0.01)
+        assert cache.get(key_a) is None
+        cache.close()
+
+
+def test_search_served_from_response_cache():
+    """测试相同查询第二次直接由缓存返回，不发送请求"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        calls = []
+
+        def fake_request(method, url, **kwargs):
+            calls.append(kwargs.get('params'))
+            return _make_response(200, {}, {'total_count': 1, 'items': [{'id': 7, 'name': 'p'}]})
+
+        client = GitHubAPIClient(token='dummy', cache_dir=cache_dir, cache_ttl=600)
+        client.session.request = fake_request
+        first = client.search_repositories('llm agent', per_page=25)
+        second = client.search_repositories('llm   agent', per_page=25)
+
+        print(f"💾 缓存统计: {client.get_cache_stats()}")
+        assert len(calls) == 1
+        assert [p.to_dict() for p in first] == [p.to_dict() for p in second]
+        assert client.get_cache_stats() == {'hits': 1, 'misses': 1}
+
+        client = GitHubAPIClient(token='dummy', cache_dir='')
+        assert client.response_cache is None and client.etag_cache is None
+
+
+def test_iter_search_follows_link_header_and_stops_early():
+    """测试分页流式搜索跟随Link头，调用方取够后不再请求后续页面"""
+    base = 'https://api.github.com/search/repositories'
+    requested = []
+
+    def fake_request(method, url, **kwargs):
+        page = 1 if kwargs.get('params') else int(url.rsplit('page=', 1)[1])
+        requested.append(page)
+        items = [{'id': page * 100 + i, 'name': f'p{page}-{i}'} for i in range(100)]
+        headers = {}
+        if page < 5:
+            headers['Link'] = f'<{base}?q=llm&per_page=100&page={page + 1}>; rel="next", <{base}?page=5>; rel="last"'
+        return _make_response(200, headers, {'total_count': 500, 'items': items})
+
+    client = GitHubAPIClient(token='dummy', cache_dir='')
+    client.session.request = fake_request
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        deduplicator = ProjectDeduplicator(os.path.join(tmp_dir, 'sent.json'))
+        # 第一页全部已推送，需要第二页补足
+        deduplicator.store.add_many({str(100 + i): {'sent_date': '2025-01-01T00:00:00'} for i in range(100)})
+        new_projects = deduplicator.take_new_projects(client.iter_search('llm'), limit=10)
+
+    print(f"📄 请求的页码: {requested}")
+    assert requested == [1, 2]
+    assert [p['id'] for p in new_projects] == list(range(200, 210))
+
+    requested.clear()
+    assert len(list(client.iter_search('llm', max_results=250))) == 250
+    assert requested == [1, 2, 3]
+
+
+def test_search_sharded_bisects_windows_over_cap():
+    """测试分片规划：超过上限的日期窗口被二分，合并结果覆盖全部项目且不重复"""
+    start, end = date(2024, 1, 1), date(2024, 1, 31)
+    # 每天创建3个项目，1月15日集中创建40个
+    repos_by_day = {}
+    next_id = 1
+    for offset in range(31):
+        day = start + timedelta(days=offset)
+        count = 40 if day == date(2024, 1, 15) else 3
+        repos_by_day[day] = [{'id': next_id + i, 'name': f'{day}-{i}'} for i in range(count)]
+        next_id += count
+
+    def fake_request(method, url, **kwargs):
+        params = kwargs.get('params') or {}
+        match = re.search(r'created:(\d{4}-\d{2}-\d{2})\.\.(\d{4}-\d{2}-\d{2})', params.get('q', ''))
+        window_start, window_end = date.fromisoformat(match.group(1)), date.fromisoformat(match.group(2))
+        items = [repo for day, repos in repos_by_day.items() if window_start <= day <= window_end for repo in repos]
+        return _make_response(200, {}, {'total_count': len(items), 'items': items[:params.get('per_page', 100)]})
+
+    client = GitHubAPIClient(token='dummy', cache_dir='')
+    client.search_result_cap = 50
+    client.session.request = fake_request
+
+    shards = client.plan_query_shards('llm', start, end)
+    projects = client.search_sharded('llm', start, end)
+
+    print(f"🧩 分片数: {len(shards)}, 获取项目数: {len(projects)}")
+    assert len(shards) > 1
+    assert all(shard.startswith('llm created:') for shard in shards)
+    assert len(projects) == next_id - 1
+    assert len({p['id'] for p in projects}) == len(projects)
+
+
+if __name__ == "__main__":
+    test_search_many_concurrent()
+    test_search_many_respects_cap()
+    test_rate_limit_scheduler_waits_for_reset()
+    test_rate_limit_scheduler_retry_after()
+    test_request_retries_after_rate_limit()
+    test_etag_cache_replays_body_on_304()
+    test_response_cache_ttl_and_lru()
+    test_search_served_from_response_cache()
+    test_iter_search_follows_link_header_and_stops_early()
+    test_search_sharded_bisects_windows_over_cap()
+    print("✅ GitHub客户端测试通过")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+测试GraphQL批量补充仓库详情（使用本地桩服务器回放响应，不访问真实网络）
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from ai_tracker import GitHubAPIClient, GitHubGraphQLClient
+
+
+class StubGraphQLHandler(BaseHTTPRequestHandler):
+    """按请求变量回放仓库详情的GraphQL桩服务"""
+
+    requests_received = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        StubGraphQLHandler.requests_received.append(body)
+        variables = body['variables']
+
+        data = {'rateLimit': {'cost': 1, 'remaining': 4990, 'resetAt': '2030-01-01T00:00:00Z'}}
+        errors = []
+        index = 0
+        while f'o{index}' in variables:
+            owner, name = variables[f'o{index}'], variables[f'n{index}']
+            if name == 'missing':
+                data[f'r{index}'] = None
+                errors.append({'type': 'NOT_FOUND', 'message': f'Could not resolve to a Repository {owner}/{name}'})
+            else:
+                data[f'r{index}'] = {
+                    'databaseId': index + 1,
+                    'nameWithOwner': f'{owner}/{name}',
+                    'releases': {'totalCount': 3},
+                    'latestRelease': {'tagName': 'v1.0.0', 'publishedAt': '2025-01-01T00:00:00Z'},
+                    'defaultBranchRef': {'target': {'history': {'totalCount': 1200}}},
+                    'mentionableUsers': {'totalCount': 42},
+                    'readme': {'byteSize': 2048}
+                }
+            index += 1
+
+        payload = json.dumps({'data': data, 'errors': errors} if errors else {'data': data}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('X-RateLimit-Limit', '5000')
+        self.send_header('X-RateLimit-Remaining', '4990')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_enrich_repositories_in_batches():
+    """测试批量补充详情：7个仓库按每批3个分3次请求，不存在的仓库被跳过"""
+    server = HTTPServer(('127.0.0.1', 0), StubGraphQLHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubGraphQLHandler.requests_received = []
+
+    try:
+        endpoint = f'http://127.0.0.1:{server.server_port}/graphql'
+        client = GitHubGraphQLClient(GitHubAPIClient(token='dummy', cache_dir=''), endpoint=endpoint, batch_size=3)
+        repos = [{'full_name': f'org/repo-{i}'} for i in range(6)] + [{'full_name': 'org/missing'}]
+
+        details = client.enrich_repositories(repos)
+
+        print(f"📡 GraphQL请求次数: {len(StubGraphQLHandler.requests_received)}")
+        print(f"📦 org/repo-0 详情: {details['org/repo-0']}")
+        assert len(StubGraphQLHandler.requests_received) == 3
+        assert len(details) == 6
+        assert 'org/missing' not in details
+        assert details['org/repo-0']['commit_count'] == 1200
+        assert details['org/repo-0']['latest_release'] == 'v1.0.0'
+        assert client.total_cost == 3
+        assert client.remaining == 4990
+        assert client.api_client.get_rate_limit_budget()['graphql']['remaining'] == 4990
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_build_query_uses_variables():
+    """测试查询语句通过变量传入仓库名，包含rateLimit字段"""
+    client = GitHubGraphQLClient(GitHubAPIClient(token='dummy', cache_dir=''), endpoint='http://127.0.0.1/graphql')
+    query, variables = client.build_query(['a/b', 'c/d"e'])
+
+    assert 'rateLimit { cost remaining resetAt }' in query
+    assert 'r1: repository(owner: $o1, name: $n1)' in query
+    assert variables == {'o0': 'a', 'n0': 'b', 'o1': 'c', 'n1': 'd"e'}
+
+
+if __name__ == "__main__":
+    test_enrich_repositories_in_batches()
+    test_build_query_uses_variables()
+    print("✅ GraphQL批量查询测试通过")
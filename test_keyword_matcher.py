@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+测试预编译的多关键词匹配器
+"""
+
+import time
+from ai_tracker import KeywordMatcher, AIProjectFilter, CommercialAIProjectFilter
+
+
+def test_find_all_matches_substring_scan():
+    """测试不要求单词边界时，结果与逐个关键词子串扫描一致（包括重叠和前缀关键词）"""
+    keywords = CommercialAIProjectFilter.COMMERCIAL_KEYWORDS + CommercialAIProjectFilter.BUSINESS_INDICATORS
+    matcher = KeywordMatcher(keywords)
+    texts = [
+        'social media management tool with api automation and workflow automation',
+        'web scraping toolkit: scrapy + selenium for price tracking dashboards',
+        'no code drag and drop chatbot builder for customer service on wechat',
+        'an unrelated library for parsing yaml files',
+    ]
+
+    for text in texts:
+        expected = {keyword for keyword in keywords if keyword in text}
+        assert matcher.find_all(text) == expected, text
+
+
+def test_word_boundary_keywords():
+    """测试边界关键词：'ai'不再匹配'email'或'maintain'，但能匹配独立单词"""
+    ai_filter = AIProjectFilter()
+
+    assert not ai_filter.is_ai_project({'name': 'email-maintainer', 'description': 'Maintain email lists', 'topics': []})
+    assert ai_filter.is_ai_project({'name': 'ai-agents', 'description': '', 'topics': []})
+    assert ai_filter.is_ai_project({'name': 'awesome-chatgpt-prompts', 'description': '', 'topics': []})
+    assert ai_filter.match_ai_keywords({'name': 'openai-cookbook', 'description': 'Examples for the OpenAI API',
+                                        'topics': ['ai', 'gpt']}) == {'openai', 'ai', 'gpt'}
+
+    assert not ai_filter.is_ai_project({'name': 'robert-shanghai', 'description': 'Vegan recipes', 'topics': []})
+
+    matcher = KeywordMatcher(['api', 'rest api'], boundary_keywords=['api'])
+    assert matcher.find_all('rapid capital') == set()
+    assert not matcher.search('xapi') and matcher.search('xapi api')
+    assert matcher.find_all('a rest api server') == {'rest api', 'api'}
+
+
+def _best_time(func, corpus, repeat: int = 3) -> float:
+    """多次运行取最短耗时，减少偶发抖动的影响"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(corpus)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_classification_speed():
+    """测试分类耗时：不慢于逐个关键词的子串扫描，边界关键词的相似词也不会退回逐个位置检查"""
+    keywords = [keyword.lower() for keyword in AIProjectFilter.AI_KEYWORDS]
+    matcher = AIProjectFilter.get_matcher()
+    plain = [f'project-{i} a small utility for formatting dates and strings utility formatting'
+             for i in range(20000)]
+    # 包含'ai'、'bert'、'gan'等边界关键词作为单词一部分的文本，全部不应命中
+    lookalike = [f"project-{i} robert's vegan cafe in shanghai: email, maintain, rapid delivery"
+                 for i in range(20000)]
+    assert not any(matcher.search(text) for text in lookalike)
+
+    def substring_scan(corpus):
+        return [any(keyword in text for keyword in keywords) for text in corpus]
+
+    def matcher_scan(corpus):
+        return [matcher.search(text) for text in corpus]
+
+    baseline = _best_time(substring_scan, plain)
+    elapsed = _best_time(matcher_scan, plain)
+    lookalike_elapsed = _best_time(matcher_scan, lookalike)
+    print(f"⚡ 分类 {len(plain)} 个项目耗时: {elapsed * 1000:.1f}ms（子串扫描 {baseline * 1000:.1f}ms，"
+          f"边界相似词 {lookalike_elapsed * 1000:.1f}ms）")
+    assert elapsed <= baseline
+    assert lookalike_elapsed < elapsed * 2
+
+
+if __name__ == "__main__":
+    test_find_all_matches_substring_scan()
+    test_word_boundary_keywords()
+    test_classification_speed()
+    print("✅ 关键词匹配器测试通过")
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+测试多渠道推送：中间模型、Slack/通用webhook/邮件/文件渠道、渠道并发发送（使用本地桩服务，不访问真实网络）
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+import socketserver
+from email import message_from_bytes
+from email.policy import default as default_policy
+from unittest import mock
+from ai_tracker import (DiscordNotifier, NotificationSink, SlackSink, JSONWebhookSink, EmailSink, FileSink,
+                        DiscordSink, render_markdown)
+from test_webhook_delivery import StubWebhookHandler, _start_server
+from repo_fixtures import make_repo
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """只实现发信所需命令的SMTP桩服务，收到的邮件保存在messages中"""
+
+    messages = []
+
+    def _reply(self, line: str):
+        self.wfile.write(f'{line}\r\n'.encode('ascii'))
+
+    def handle(self):
+        self._reply('220 localhost stub')
+        envelope = {'from': None, 'to': []}
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self._reply('250 localhost')
+            elif verb == 'MAIL':
+                envelope['from'] = command.split(':', 1)[1].strip()
+                self._reply('250 OK')
+            elif verb == 'RCPT':
+                envelope['to'].append(command.split(':', 1)[1].strip())
+                self._reply('250 OK')
+            elif verb == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                data = b''
+                while not data.endswith(b'\r\n.\r\n'):
+                    data += self.rfile.readline()
+                StubSMTPHandler.messages.append((dict(envelope), data[:-5]))
+                self._reply('250 OK queued')
+            elif verb == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                self._reply('250 OK')
+
+
+class SlowSink(NotificationSink):
+    """模拟耗时的渠道"""
+
+    name = 'Slow'
+
+    def __init__(self, delay: float, ok: bool = True):
+        self.delay = delay
+        self.ok = ok
+        self.received = []
+
+    def send(self, reports, label):
+        time.sleep(self.delay)
+        if not self.ok:
+            raise OSError('channel down')
+        self.received.append((label, reports))
+        return True
+
+
+def _reports(notifier):
+    repos = [make_repo(i, f'llm-agent-{i}') for i in range(1, 5)]
+    return [notifier.build_report('ai', repos[:2], repos[2:], '7days'),
+            notifier.build_report('commercial', repos[:2], repos[2:], 'lifetime')]
+
+
+def test_report_model_renders_for_every_channel():
+    """测试同一份中间模型在各渠道中包含相同的项目"""
+    notifier = DiscordNotifier(webhook_urls=[], sinks=[])
+    reports = _reports(notifier)
+    assert [section.title for section in reports[1].sections] == [
+        '🏆 收藏最多的商用AI项目', '💼 商用趋势上升最快的AI项目', '💡 商用价值说明'
+    ]
+    assert reports[0].sections[0].projects[0].summary  # 总结只生成一次，保存在模型中
+
+    embed = DiscordSink.render_embed(reports[0])
+    slack = SlackSink([]).render(reports)
+    data = JSONWebhookSink([]).render(reports)[0]
+    markdown = render_markdown(reports)
+
+    assert len(slack) == 1 and slack[0]['blocks'][0]['type'] == 'header'
+    assert slack[0]['text'] == '🤖 AI项目日报 | 💼 商用实用性AI项目日报'
+    slack_text = json.dumps(slack, ensure_ascii=False)
+    assert SlackSink._escape('R&D <beta>') == 'R&amp;D &lt;beta&gt;'
+    for i in range(1, 5):
+        name = f'llm-agent-{i}'
+        assert name in json.dumps(embed, ensure_ascii=False) and name in slack_text and name in markdown
+    assert data['reports'][1]['sections'][0]['projects'][0]['full_name'] == 'test/llm-agent-1'
+
+    # 超过50个block时拆成多条Slack消息
+    payloads = SlackSink([]).render(reports * 6)
+    assert len(payloads) > 1 and all(len(payload['blocks']) <= SlackSink.MAX_BLOCKS for payload in payloads)
+
+
+def test_webhook_sinks_against_stub_server():
+    """测试Discord、Slack、通用webhook三个渠道都收到同一次推送"""
+    server, base = _start_server()
+    try:
+        notifier = DiscordNotifier(webhook_urls=[f'{base}/discord'], sinks=[])
+        notifier.sinks += [SlackSink([f'{base}/slack'], notifier.delivery),
+                           JSONWebhookSink([f'{base}/json'], notifier.delivery)]
+        assert notifier.send_reports(_reports(notifier))
+
+        bodies = {path: body for path, _, _, body in StubWebhookHandler.received}
+        assert sorted(bodies) == ['/discord', '/json', '/slack']
+        assert len(bodies['/discord']['embeds']) == 2
+        assert bodies['/slack']['blocks'][0]['text']['text'] == '🤖 AI项目日报'
+        assert [report['mode'] for report in bodies['/json']['reports']] == ['ai', 'commercial']
+        assert len(notifier.last_results) == 3
+
+        # 从环境变量启用渠道
+        env = {'SLACK_WEBHOOK_URLS': f'{base}/slack', 'NOTIFY_WEBHOOK_URLS': f'{base}/json'}
+        with mock.patch.dict(os.environ, env):
+            notifier = DiscordNotifier(webhook_urls=[])
+        assert [type(sink) for sink in notifier.sinks] == [SlackSink, JSONWebhookSink]
+
+        # 单个渠道配置有误时跳过该渠道，其他渠道照常启用
+        for bad in ({'SMTP_PORT': 'smtp'}, {'SMTP_SECURITY': 'tls1.3'}):
+            env = {'SLACK_WEBHOOK_URLS': f'{base}/slack', 'SMTP_HOST': '127.0.0.1', 'SMTP_TO': 'team@example.com',
+                   'REPORT_DIR': 'reports', 'REPORT_FORMATS': 'pdf', **bad}
+            with mock.patch.dict(os.environ, env):
+                notifier = DiscordNotifier(webhook_urls=[f'{base}/discord'])
+            assert [type(sink) for sink in notifier.sinks] == [DiscordSink, SlackSink]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_email_sink_with_local_smtp_stub():
+    """测试通过本地SMTP桩服务发送邮件"""
+    StubSMTPHandler.messages = []
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), StubSMTPHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        sink = EmailSink('127.0.0.1', ['team@example.com', 'ops@example.com'], port=server.server_address[1],
+                         sender='tracker@example.com', security='none', timeout=5)
+        notifier = DiscordNotifier(webhook_urls=[], sinks=[sink])
+        assert notifier.send_reports(_reports(notifier))
+
+        envelope, data = StubSMTPHandler.messages[0]
+        message = message_from_bytes(data, policy=default_policy)
+        print(f"📧 邮件主题: {message['Subject']}")
+        assert envelope['to'] == ['<team@example.com>', '<ops@example.com>']
+        assert message['Subject'].startswith('🤖 AI项目日报 / 💼 商用实用性AI项目日报')
+        assert '**[test/llm-agent-1](https://github.com/test/llm-agent-1)**' in message.get_content()
+
+        # 连接失败时返回False而不是抛出异常
+        assert not EmailSink('127.0.0.1', ['team@example.com'], port=1, security='none', timeout=1).send([], '邮件消息')
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_file_sink_writes_json_and_markdown():
+    """测试文件渠道：markdown按天追加，json保存报告列表"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sink = FileSink(os.path.join(tmp_dir, 'reports'), ['markdown', 'json'])
+        notifier = DiscordNotifier(webhook_urls=[], sinks=[sink])
+        reports = _reports(notifier)
+        assert notifier.send_reports(reports[:1])
+        assert notifier.send_reports(reports[1:])
+
+        with open(sink.path('json'), 'r', encoding='utf-8') as f:
+            assert [report['mode'] for report in json.load(f)] == ['ai', 'commercial']
+        with open(sink.path('markdown'), 'r', encoding='utf-8') as f:
+            content = f.read()
+        assert content.count('# 🤖 AI项目日报') == 1 and content.count('# 💼 商用实用性AI项目日报') == 1
+        assert sorted(os.listdir(os.path.join(tmp_dir, 'reports'))) == sorted(
+            os.path.basename(sink.path(fmt)) for fmt in ('markdown', 'json'))
+
+
+def test_sinks_run_concurrently():
+    """测试多个渠道并发发送，单个渠道失败不影响其他渠道"""
+    sinks = [SlowSink(0.2), SlowSink(0.2), SlowSink(0.2, ok=False)]
+    notifier = DiscordNotifier(webhook_urls=[], sinks=sinks)
+    reports = _reports(notifier)
+
+    start = time.time()
+    assert not notifier.send_reports(reports, '商用项目')
+    elapsed = time.time() - start
+    print(f"📡 3个渠道并发发送耗时 {elapsed:.2f}s")
+    assert elapsed < 0.5  # 串行需要0.6秒以上
+    assert all(sink.received == [('商用项目Slow消息', reports)] for sink in sinks[:2])
+
+    assert not DiscordNotifier(webhook_urls=[], sinks=[]).send_reports(reports)
+
+
+if __name__ == "__main__":
+    test_report_model_renders_for_every_channel()
+    test_webhook_sinks_against_stub_server()
+    test_email_sink_with_local_smtp_stub()
+    test_file_sink_writes_json_and_markdown()
+    test_sinks_run_concurrently()
+    print("✅ 多渠道推送测试通过")
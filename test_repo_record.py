@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+测试精简仓库记录RepoRecord及其在各处理阶段的兼容性
+"""
+
+import os
+import time
+import tempfile
+from datetime import datetime, timedelta, timezone
+from ai_tracker import (parse_github_timestamp, RepoRecord, AIProjectFilter, CommercialAIProjectFilter, ProjectDeduplicator,
+                        TrendAnalyzer, DiscordNotifier)
+
+
+def _github_item(repo_id: int = 1) -> dict:
+    """模拟GitHub搜索API返回的完整仓库数据（包含大量无用的URL模板字段）"""
+    item = {
+        'id': repo_id,
+        'name': 'llm-workflow',
+        'full_name': 'test/llm-workflow',
+        'description': 'LLM workflow automation platform',
+        'html_url': 'https://github.com/test/llm-workflow',
+        'language': None,
+        'topics': ['llm', 'automation'],
+        'stargazers_count': 3000,
+        'forks_count': 600,
+        'created_at': '2024-01-01T00:00:00Z',
+        'updated_at': '2025-01-01T00:00:00Z',
+        'pushed_at': '2025-01-02T00:00:00Z',
+        'owner': {'login': 'test', 'avatar_url': 'https://avatars.githubusercontent.com/u/1'},
+    }
+    for i in range(60):
+        item[f'unused_url_{i}'] = f'https://api.github.com/repos/test/llm-workflow/{{template_{i}}}'
+    return item
+
+
+def test_repo_record_from_github():
+    """测试从GitHub数据构建记录：只保留必要字段，时间戳解析为epoch秒"""
+    record = RepoRecord.from_github(_github_item())
+
+    assert not hasattr(record, '__dict__')
+    assert record.created_ts == 1704067200.0
+    assert record.pushed_ts == 1735776000.0
+    assert record['full_name'] == 'test/llm-workflow'
+    assert record.get('language', 'Unknown') == 'Unknown'
+    assert 'owner' not in record
+    try:
+        record['owner']
+        assert False, "未保留的字段应抛出KeyError"
+    except KeyError:
+        pass
+
+    # to_dict的输出可以重新构建出相同的记录
+    assert RepoRecord.from_github(record.to_dict()).to_dict() == record.to_dict()
+
+
+def test_pipeline_accepts_repo_records():
+    """测试过滤、去重、趋势排序和消息格式化都能处理RepoRecord"""
+    records = [RepoRecord.from_github(_github_item(i)) for i in range(1, 4)]
+
+    assert len(AIProjectFilter().filter_ai_projects(records)) == 3
+    assert len(CommercialAIProjectFilter().filter_commercial_ai_projects(records)) == 3
+
+    sorted_records = TrendAnalyzer().sort_by_trend_score(records, '30days')
+    assert all(record.trend_score > 0 for record in sorted_records)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        deduplicator = ProjectDeduplicator(os.path.join(tmp_dir, 'sent.json'))
+        deduplicator.mark_project_as_sent(records[0])
+        assert [r.id for r in deduplicator.filter_new_projects(records)] == [2, 3]
+
+    embed = DiscordNotifier(webhook_url='http://localhost').create_discord_embed(records[:2], records[2:])
+    print(f"📨 消息字段: {embed['embeds'][0]['fields'][0]['value'][:60]}...")
+    assert 'llm-workflow' in embed['embeds'][0]['fields'][0]['value']
+
+
+def test_parse_github_timestamp():
+    """测试时间戳解析：统一返回UTC时间，不带时区的时间按本地时间处理，无法解析时返回None"""
+    assert parse_github_timestamp('2024-01-01T00:00:00Z') == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert parse_github_timestamp('2024-01-01T08:00:00+08:00') == datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert parse_github_timestamp('Mon, 01 Jan 2024 00:00:00 GMT') == datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    local = datetime(2024, 1, 1, 12, 30)
+    assert parse_github_timestamp(local.isoformat()).timestamp() == local.timestamp()
+
+    for value in (None, '', 'not a date', 12345):
+        assert parse_github_timestamp(value) is None
+
+    start = time.perf_counter()
+    for day in range(20000):
+        parse_github_timestamp(f'2024-01-01T00:00:{day % 60:02d}Z')
+    print(f"⚡ 解析20000个时间戳耗时: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+def test_clean_old_records_mixed_timezones():
+    """测试清理旧记录：本地时间和带时区的记录统一比较，无效日期被清理"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        deduplicator = ProjectDeduplicator(os.path.join(tmp_dir, 'sent.json'))
+        now = datetime.now()
+        deduplicator.store.add_many({
+            '1': {'sent_date': (now - timedelta(days=1)).isoformat()},
+            '2': {'sent_date': (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()},
+            '3': {'sent_date': (now - timedelta(days=40)).isoformat()},
+            '4': {'sent_date': 'garbage'},
+        })
+        deduplicator.store.flush()
+        deduplicator.clean_old_records(days=30)
+        assert sorted(deduplicator.store.records) == ['1', '2']
+
+
+if __name__ == "__main__":
+    test_repo_record_from_github()
+    test_parse_github_timestamp()
+    test_clean_old_records_mixed_timezones()
+    test_pipeline_accepts_repo_records()
+    print("✅ RepoRecord测试通过")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+测试本地star历史快照存储和基于真实增量的趋势分数
+"""
+
+import os
+import time
+import tempfile
+import multiprocessing
+from ai_tracker import StarHistoryStore, TrendAnalyzer
+
+DAY = 86400
+
+
+def test_snapshot_store_append_and_delta():
+    """测试快照追加、同日去重、重新加载后的增量计算"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        directory = os.path.join(tmp_dir, 'star_history')
+        store = StarHistoryStore(directory)
+        start = 1_700_000_000
+
+        # 40天的每日快照：项目1每天+10 star，项目2每天+1 star
+        for day in range(40):
+            added = store.record_snapshot([
+                {'id': 1, 'stargazers_count': 1000 + day * 10, 'forks_count': 100 + day},
+                {'id': 2, 'stargazers_count': 50000 + day, 'forks_count': 9000},
+            ], timestamp=start + day * DAY)
+            assert added == 2
+
+        # 同一天重复记录会被忽略
+        assert store.record_snapshot([{'id': 1, 'stargazers_count': 9999, 'forks_count': 0}],
+                                     timestamp=start + 39 * DAY + 60) == 0
+
+        reloaded = StarHistoryStore(directory)
+        assert len(reloaded) == 80
+        assert reloaded.get_delta(1, 7) == (70, 7, 7.0)
+        assert reloaded.get_delta(1, 30) == (300, 30, 30.0)
+        assert reloaded.get_delta(2, 7) == (7, 0, 7.0)
+        assert reloaded.get_delta(3, 7) is None
+
+        lookup_start = time.perf_counter()
+        for _ in range(1000):
+            reloaded.get_delta(1, 30)
+        per_lookup_ms = (time.perf_counter() - lookup_start) * 1000 / 1000
+        print(f"⚡ 单次增量查询耗时: {per_lookup_ms:.4f}ms")
+        assert per_lookup_ms < 1
+
+
+def test_trend_score_uses_history_with_fallback():
+    """测试有历史时使用真实增量，无历史时退回估算"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = StarHistoryStore(os.path.join(tmp_dir, 'star_history'))
+        now = time.time()
+        old_giant = {'id': 1, 'stargazers_count': 100000, 'forks_count': 20000,
+                     'created_at': '2015-01-01T00:00:00Z'}
+        rising = {'id': 2, 'stargazers_count': 3000, 'forks_count': 300,
+                  'created_at': '2023-01-01T00:00:00Z'}
+
+        store.record_snapshot([
+            {'id': 1, 'stargazers_count': 99990, 'forks_count': 20000},
+            {'id': 2, 'stargazers_count': 1000, 'forks_count': 100},
+        ], timestamp=now - 7 * DAY)
+        store.record_snapshot([old_giant, rising], timestamp=now)
+
+        estimating = TrendAnalyzer()
+        with_history = TrendAnalyzer(history=store)
+
+        # 估算逻辑会把老牌大项目排在前面，真实增量则反映出近期增长更快的项目
+        assert estimating.calculate_trend_score(old_giant, '7days') > estimating.calculate_trend_score(rising, '7days')
+        assert with_history.calculate_trend_score(rising, '7days') > with_history.calculate_trend_score(old_giant, '7days')
+        assert abs(with_history.calculate_trend_score(rising, '7days') - (2000 / 7 * 0.7 + 200 / 7 * 0.3)) < 1e-6
+
+        # 没有历史的项目退回估算逻辑
+        unknown = dict(rising, id=3)
+        assert with_history.calculate_trend_score(unknown, '7days') == estimating.calculate_trend_score(unknown, '7days')
+
+
+def test_torn_columns_are_truncated_before_append():
+    """测试写入中断导致各列长度不一致时，下次追加前先把列文件截断到最短列，之后的行不会错位"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        directory = os.path.join(tmp_dir, 'star_history')
+        start = 1_700_000_000
+        StarHistoryStore(directory).record_snapshot(
+            [{'id': 1, 'stargazers_count': 1000, 'forks_count': 10}], timestamp=start)
+        # 模拟上次运行只写了一部分列：repo_ids多一行，stars多半个值
+        with open(os.path.join(directory, 'repo_ids.bin'), 'ab') as f:
+            f.write((2).to_bytes(8, 'little'))
+        with open(os.path.join(directory, 'stars.bin'), 'ab') as f:
+            f.write(b'\x01\x02\x03')
+
+        store = StarHistoryStore(directory)
+        assert len(store) == 1
+        assert store.record_snapshot([{'id': 1, 'stargazers_count': 1070, 'forks_count': 17}], timestamp=start + 7 * DAY) == 1
+        assert {os.path.getsize(os.path.join(directory, f'{column}.bin')) for column, _ in StarHistoryStore.COLUMNS} == {16}
+        assert StarHistoryStore(directory).get_delta(1, 7) == (70, 7, 7.0)
+
+
+def _snapshot_worker(directory: str, worker: int) -> int:
+    """子进程：同一天内反复记录同一批项目的快照"""
+    store = StarHistoryStore(directory)
+    added = 0
+    for round_number in range(20):
+        added += store.record_snapshot([{'id': i, 'stargazers_count': 100 * i, 'forks_count': worker}
+                                        for i in range(1, 30)], timestamp=1_700_000_000 + round_number)
+    return added
+
+
+def test_parallel_processes_keep_columns_aligned():
+    """测试多个进程并行追加快照时，同一项目同一天只记录一次，各列长度一致"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        directory = os.path.join(tmp_dir, 'star_history')
+        with multiprocessing.get_context('spawn').Pool(4) as pool:
+            added = pool.starmap(_snapshot_worker, [(directory, worker) for worker in range(4)])
+
+        assert sum(added) == 29
+        assert len(StarHistoryStore(directory)) == 29
+        assert len({os.path.getsize(os.path.join(directory, f'{column}.bin')) for column, _ in StarHistoryStore.COLUMNS}) == 1
+
+
+if __name__ == "__main__":
+    test_snapshot_store_append_and_delta()
+    test_trend_score_uses_history_with_fallback()
+    test_torn_columns_are_truncated_before_append()
+    test_parallel_processes_keep_columns_aligned()
+    print("✅ star历史快照测试通过")
@@ -4,7 +4,7 @@
 """
 
 from ai_tracker import TrendAnalyzer
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import json
 
 def test_trend_timeframes():
@@ -104,6 +104,49 @@ def test_discord_message_formats():
             print(f"  字段名: {embed['embeds'][0]['fields'][0]['name']}")
         print()
 
+def _reference_score(project, timeframe, now):
+    """逐个项目计算趋势分数的原始估算公式，用于校验批量计算结果"""
+    # created_at是UTC时间，按UTC换算时间戳，结果与运行环境的时区无关
+    created = datetime.strptime(project['created_at'], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+    days = max(int((now - created.timestamp()) // 86400), 1)
+    stars, forks = project['stargazers_count'], project['forks_count']
+    window, share = {'lifetime': (None, 1), '30days': (30, 0.3), '7days': (7, 0.15)}[timeframe]
+    if window is not None and days > window:
+        days, stars, forks = window, int(stars * share), int(forks * share)
+    return stars / days * 0.7 + forks / days * 0.3
+
+def test_batch_scores_match_per_project_formula():
+    """测试批量计算三个时间框架的分数与逐个计算一致，top_k与完整排序的前k个一致"""
+    import random
+    import time
+    random.seed(7)
+    now = time.time()
+    projects = [{
+        'id': i,
+        'name': f'project-{i}',
+        'stargazers_count': random.randint(0, 50000),
+        'forks_count': random.randint(0, 5000),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now - random.randint(0, 2000) * 86400)),
+    } for i in range(2000)]
+    projects.append({'id': 9999, 'name': 'broken', 'stargazers_count': 10, 'forks_count': 1, 'created_at': None})
+
+    analyzer = TrendAnalyzer()
+    start = time.perf_counter()
+    scores = analyzer.score_all_timeframes(projects, now=now)
+    print(f"⚡ 批量计算 {len(projects)} 个项目三个时间框架耗时: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    for timeframe in ('lifetime', '30days', '7days'):
+        for project, score in zip(projects[:-1], scores[timeframe]):
+            assert abs(score - _reference_score(project, timeframe, now)) < 1e-9
+        assert scores[timeframe][-1] == 0.0
+
+        table = analyzer.score_table(projects, now=now)
+        subset = projects[::3]
+        expected = sorted(subset, key=lambda p: _reference_score(p, timeframe, now) if p['created_at'] else 0.0,
+                          reverse=True)[:5]
+        assert analyzer.top_k(subset, timeframe, 5, table=table) == expected
+
 if __name__ == "__main__":
     test_trend_timeframes()
-    test_discord_message_formats()
\ No newline at end of file
+    test_discord_message_formats()
+    test_batch_scores_match_per_project_formula()
\ No newline at end of file
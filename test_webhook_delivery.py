@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+测试webhook投递：连接复用、限额桶、429和5xx重试（使用本地桩服务器，不访问真实网络）
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ai_tracker import WebhookDeliveryClient, DiscordNotifier, NotificationOutbox
+
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    """按路径回放预设响应序列的webhook桩服务"""
+
+    protocol_version = 'HTTP/1.1'
+    scripts = {}
+    received = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.path.startswith('/slow'):
+            time.sleep(0.2)
+        StubWebhookHandler.received.append((self.path, self.client_address[1], time.time(), body))
+        script = StubWebhookHandler.scripts.get(self.path) or []
+        status, headers, payload = script.pop(0) if script else (204, {}, None)
+
+        data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_server():
+    StubWebhookHandler.scripts = {}
+    StubWebhookHandler.received = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubWebhookHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def test_retries_429_and_5xx():
+    """测试429按retry_after等待后重试，5xx退避重试，其他4xx不重试"""
+    server, base = _start_server()
+    try:
+        StubWebhookHandler.scripts = {
+            '/rate-limited': [(429, {}, {'message': 'You are being rate limited.', 'retry_after': 0.2, 'global': False})],
+            '/flaky': [(502, {}, None), (503, {}, None)],
+            '/bad': [(400, {}, {'message': 'Cannot send an empty message'})],
+        }
+        client = WebhookDeliveryClient(backoff=0.01)
+
+        result = client.deliver(f'{base}/rate-limited', {'content': 'hi'})
+        times = [t for path, _, t, _ in StubWebhookHandler.received if path == '/rate-limited']
+        print(f"⏱️ 429后重试间隔: {times[1] - times[0]:.2f}s，总耗时 {result.latency:.2f}s")
+        assert result.ok and result.attempts == 2
+        assert times[1] - times[0] >= 0.19
+
+        result = client.deliver(f'{base}/flaky', {'content': 'hi'})
+        assert result.ok and result.attempts == 3 and result.status == 204
+
+        result = client.deliver(f'{base}/bad', {'content': ''})
+        assert not result.ok and result.attempts == 1 and result.status == 400
+        assert 'empty message' in result.error
+
+        # 等待时间超过上限时直接放弃
+        StubWebhookHandler.scripts['/throttled'] = [(429, {}, {'retry_after': 30, 'global': False})]
+        result = WebhookDeliveryClient(max_wait=1).deliver(f'{base}/throttled', {'content': 'hi'})
+        assert not result.ok and result.attempts == 1 and '等待' in result.error
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_network_errors_only_retry_before_sending():
+    """测试连接失败时退避重试；读取响应超时时服务器可能已收到消息，不立即重试"""
+    server, base = _start_server()
+    try:
+        client = WebhookDeliveryClient(timeout=0.05, max_retries=2, backoff=0.01)
+        result = client.deliver(f'{base}/slow', {'content': 'hi'})
+        time.sleep(0.3)  # 等桩服务处理完被超时放弃的请求
+        assert not result.ok and result.attempts == 1 and '未知' in result.error
+        assert len([path for path, _, _, _ in StubWebhookHandler.received if path == '/slow']) == 1
+
+        # 端口上没有服务时连接被拒绝，消息一定没有发出，可以重试
+        result = client.deliver('http://127.0.0.1:1/refused', {'content': 'hi'})
+        assert not result.ok and result.attempts == 3 and result.status is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_rate_limit_bucket_and_connection_reuse():
+    """测试限额桶耗尽时等待重置，连续投递复用同一个连接"""
+    server, base = _start_server()
+    try:
+        StubWebhookHandler.scripts = {
+            '/hook': [(204, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': '0.3'}, None)],
+        }
+        notifier = DiscordNotifier(webhook_url=f'{base}/hook')
+        start = time.time()
+        for _ in range(4):
+            assert notifier.send_notification([], [], '7days')
+        elapsed = time.time() - start
+
+        ports = {port for _, port, _, _ in StubWebhookHandler.received}
+        print(f"📡 4条消息耗时 {elapsed:.2f}s，使用连接数: {len(ports)}")
+        assert len(StubWebhookHandler.received) == 4
+        assert elapsed >= 0.29  # 第二条消息等待限额桶重置
+        assert len(ports) == 1
+        assert StubWebhookHandler.received[0][3]['embeds'][0]['title'] == '🤖 AI项目日报'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_fan_out_to_multiple_destinations():
+    """测试多目标并发投递：总耗时接近单个目标，部分失败时返回各目标的结果"""
+    server, base = _start_server()
+    try:
+        StubWebhookHandler.scripts = {'/slow-bad': [(404, {}, {'message': 'Unknown Webhook'})]}
+        urls = [f'{base}/slow-{i}' for i in range(4)] + [f'{base}/slow-bad']
+        notifier = DiscordNotifier(webhook_urls=urls, delivery=WebhookDeliveryClient(max_concurrency=5))
+
+        start = time.time()
+        assert not notifier.send_commercial_notification([], [], 'lifetime')
+        elapsed = time.time() - start
+
+        print(f"📡 5个目标并发投递耗时 {elapsed:.2f}s")
+        for result in notifier.last_results:
+            print(f"  {result.url[len(base):]}: ok={result.ok} status={result.status} latency={result.latency:.2f}s")
+        assert elapsed < 0.6  # 串行需要1秒以上
+        assert [result.url for result in notifier.last_results] == urls
+        assert [result.ok for result in notifier.last_results] == [True] * 4 + [False]
+        assert all(result.latency >= 0.19 for result in notifier.last_results)
+        assert len({json.dumps(body) for _, _, _, body in StubWebhookHandler.received}) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_load_webhook_urls_from_env_and_file():
+    """测试从环境变量和配置文件读取目标列表并去重"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_file = os.path.join(tmp_dir, 'webhooks.txt')
+        with open(config_file, 'w', encoding='utf-8') as f:
+            f.write('# 团队频道\nhttps://example.com/hook/3\n\nhttps://example.com/hook/1\n')
+        env = {
+            'DISCORD_WEBHOOK_URL': 'https://example.com/hook/1',
+            'DISCORD_WEBHOOK_URLS': 'https://example.com/hook/2, https://example.com/hook/1',
+            'DISCORD_WEBHOOKS_FILE': config_file,
+        }
+        with mock.patch.dict(os.environ, env):
+            notifier = DiscordNotifier()
+        assert notifier.webhook_urls == [f'https://example.com/hook/{i}' for i in (1, 2, 3)]
+        assert notifier.webhook_url == 'https://example.com/hook/1'
+
+        with open(config_file, 'w', encoding='utf-8') as f:
+            json.dump(['https://example.com/hook/4'], f)
+        assert DiscordNotifier.load_webhook_urls(config_file)[-1] == 'https://example.com/hook/4'
+
+
+def test_outbox_redelivers_failed_destinations():
+    """测试发件箱：送达的目标立即删除，失败的目标保留并在下次重新投递，过期消息被丢弃"""
+    server, base = _start_server()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            outbox = NotificationOutbox(os.path.join(tmp_dir, 'cache', 'outbox.sqlite'))
+            assert outbox.pending() == [] and not os.path.exists(outbox.db_path)
+
+            StubWebhookHandler.scripts = {'/down': [(503, {}, None)]}
+            notifier = DiscordNotifier(webhook_urls=[f'{base}/up', f'{base}/down'], outbox=outbox,
+                                       delivery=WebhookDeliveryClient(max_retries=0))
+            assert not notifier.send_notification([], [], '7days')
+
+            pending = outbox.pending()
+            assert [(url, label) for _, url, label, _ in pending] == [(f'{base}/down', 'Discord消息')]
+            assert pending[0][3]['embeds'][0]['title'] == '🤖 AI项目日报'
+
+            # 模拟下一次运行：新的发件箱实例读取同一个数据库，webhook已恢复
+            StubWebhookHandler.received = []
+            outbox = NotificationOutbox(outbox.db_path)
+            notifier = DiscordNotifier(webhook_urls=[f'{base}/up'], outbox=outbox)
+            assert notifier.flush_outbox() == (1, 0)
+            assert [(path, body) for path, _, _, body in StubWebhookHandler.received] == [('/down', pending[0][3])]
+            assert outbox.count() == 0
+
+            outbox.enqueue([f'{base}/up'], {'content': 'stale'}, 'Discord消息')
+            assert outbox.expire(now=time.time() + 8 * 86400) == 1
+            assert notifier.flush_outbox() == (0, 0)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    test_retries_429_and_5xx()
+    test_network_errors_only_retry_before_sending()
+    test_rate_limit_bucket_and_connection_reuse()
+    test_fan_out_to_multiple_destinations()
+    test_load_webhook_urls_from_env_and_file()
+    test_outbox_redelivers_failed_destinations()
+    print("✅ webhook投递测试通过")